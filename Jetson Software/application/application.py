@@ -1,15 +1,44 @@
 import logging
+import threading
 import time
 from datetime import datetime
 import os
 import pathlib
 import xml.etree.ElementTree as ElementTree
+from typing import Optional
 import gxipy as gx
 from PIL import Image
-from random import randint
+
+from application.camera import CameraSession
+from application.capture import CapturedFrame, FrameQueue
+from application.classifier import RandomClassifier, create_classifier
+from application.crop import FlyCropper
+from application.deadline import DeadlineScheduler, FrameClock
+from application.inference import InferencePool
+from application.presence import PresenceDetector
+from application.pyramid import ImagePyramid
+from application.storage import StorageManager
+from application.encoders import create_encoder
+from application.writer import ImageWriter
 
 CLOSE_ALL_VALVES = bytes(str(0) + '\n', 'utf-8')
 BAUD_RATE=115200
+FRAME_TIMEOUT_SECONDS = 1.0
+# size of the image shown in the UI
+PREVIEW_SIZE = (549, 367)
+# microseconds and the frame id keep flies captured within the same second apart
+CAPTURE_TIME_FORMAT = '%Y-%m-%d_%Hh%Mm%Ss_%f'
+# camera pixel formats selectable with <pixelformat> in the settings, the packed formats need 25% less
+# USB bandwidth than Mono10/Mono12
+PIXEL_FORMATS = {
+    'Mono8': gx.GxPixelFormatEntry.MONO8,
+    'Mono10': gx.GxPixelFormatEntry.MONO10,
+    'Mono12': gx.GxPixelFormatEntry.MONO12,
+    'Mono10Packed': gx.GxPixelFormatEntry.MONO10_PACKED,
+    'Mono12Packed': gx.GxPixelFormatEntry.MONO12_PACKED,
+    'Mono10p': gx.GxPixelFormatEntry.MONO10_P,
+    'Mono12p': gx.GxPixelFormatEntry.MONO12_P,
+}
 
 class Cage:
 
@@ -20,6 +49,7 @@ class Cage:
         self.capacity = 20000
         self.numberMales: int = 0
         self.numberFemales: int = 0
+        self.numberUncertain: int = 0  # flies classified with too little confidence
         self.requiredMales = 5
         self.requiredFemales = 20000
         self.malesComplete = False
@@ -28,6 +58,7 @@ class Cage:
         self.male_percentage = 30
         self.maleLabel = None
         self.femaleLabel = None
+        self.uncertainLabel = None
 
     def add_male(self):
         self.numberMales += 1
@@ -43,6 +74,11 @@ class Cage:
         if self.femaleLabel is not None:
             self.femaleLabel.set(self.numberFemales)
 
+    def add_uncertain(self):
+        self.numberUncertain += 1
+        if self.uncertainLabel is not None:
+            self.uncertainLabel.set(self.numberUncertain)
+
     def set_required_numbers(self):
         self.requiredMales = round(self.capacity * self.male_percentage / 100)
         self.requiredFemales = round(self.capacity * (1 - self.male_percentage / 100))
@@ -72,6 +108,8 @@ class Camera:
         self.roiy: int = 1
         self.roiwidth: int = 5000 #TODO: check maximum width
         self.roiheight: int = 3000 #TODO: check maximum heigth
+        self.acquisition: str = 'callback'  # 'callback': frames pushed by GxIAPI, 'stream': DQBuf polling
+        self.pixel_format: str = 'Mono8'  # key of PIXEL_FORMATS
 
 
 class Application:
@@ -79,18 +117,102 @@ class Application:
     def __init__(self, serial_service, file_name: str, async_loop):
         self.serial_service = serial_service
         self.camera = Camera()
-        self.cam = None
         self.cages = []
         self.capture_time = None
+        self.capture_datetime = None
+        self.received_time = None  # time.monotonic() when the frame was taken from the camera
         self.save_directory = "/media/entoq/41DB-88AA/Output"
+        self.write_queue_size = 16
+        self.write_policy = 'drop_newest'
+        self.encoder = 'jpeg'
+        self.encoder_options = {}
+        self.encoder_processes = 0
+        self.crop_options = None  # {option tag: text} of the <crop> block, no cropping without one
+        self.storage_options = {}
+        self.classifier_backend = 'random'
+        self.classifier_options = {}
+        self.classifier_processes = 0  # 0 classifies in this process, more in a pool of worker processes
+        self.classifier_slots = 4
+        # a fly goes to a cage only when the classifier is at least this confident, misrouted males cost more
+        self.male_threshold: float = 0.5
+        self.female_threshold: float = 0.5
+        self.uncertain_cage_name = None  # name of the cage for uncertain flies, the last (trash) cage without one
+        # travel time from the camera to the valves, a fly not classified within it goes to the fallback cage
+        self.deadline_ms: float = 0  # 0 for no deadline
+        self.fallback_cage_name = None  # the uncertain cage without one
+        self.deadline_misses: int = 0
+        self.presence_options = None  # {option tag: text} of the <presence> block, every frame is used without one
         self._load_settings(file_name)
         self.rawImage = None
         self.processedImg = None
         self.newImage = False
         self.async_loop = async_loop
         self.ui = None
-        self.device_manager = None
         self.update_function = None
+        self.frame_queue = FrameQueue()
+        # frames waiting in the queue plus the one being processed and the one being copied
+        # the writer holds a buffer until its frame is written, when it holds more a frame gets a buffer of its own
+        self.session = CameraSession(self.camera.serial_number, buffer_num=self.frame_queue.maxsize + 2)
+        # images are encoded and written in the background, the valve decision never waits for the disk
+        try:
+            encoder = create_encoder(self.encoder, self.encoder_options)
+        except ValueError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: {err}, using the default encoder')
+            encoder = None
+        self.writer = ImageWriter(self.write_queue_size, self.write_policy, encoder=encoder,
+                                  processes=self.encoder_processes)
+        # only the padded bounding box of the fly is written when cropping is enabled
+        try:
+            self.cropper = FlyCropper.from_options(self.crop_options) if self.crop_options is not None \
+                else FlyCropper(enabled=False)
+        except ValueError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: {err}, cropping disabled')
+            self.cropper = FlyCropper(enabled=False)
+        self.last_classification = None
+        # frames of a trigger on noise are neither saved, classified nor routed
+        try:
+            self.presence = PresenceDetector.from_options(self.presence_options) \
+                if self.presence_options is not None else PresenceDetector(enabled=False)
+        except ValueError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: {err}, empty frame detection disabled')
+            self.presence = PresenceDetector(enabled=False)
+        # free space and retention of save_directory are checked in the background
+        try:
+            self.storage = StorageManager.from_options(self.save_directory, self.storage_options)
+        except ValueError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: {err}, using the default storage settings')
+            self.storage = StorageManager(self.save_directory)
+        self.storage.start()
+        # the model is loaded and warmed up once, classification is on the path from image to valve
+        self.classifier = None
+        self.inference = None
+        # flies waiting for their classification by the pool as {frame id: (pixels, metadata, deadline, release)}
+        self._pending = {}
+        self._route_lock = threading.Lock()
+        self.frame_clock = FrameClock()
+        self.deadlines = DeadlineScheduler(self._on_deadline)
+        if self.classifier_processes > 0:
+            # results are routed on the result thread of the pool while acquisition goes on
+            self.inference = InferencePool(self.classifier_backend, self.classifier_options,
+                                           self.classifier_processes, self.classifier_slots,
+                                           on_result=self._on_classified)
+            try:
+                self.inference.start()
+            except RuntimeError as err:
+                logging.error(f'{self.__class__.__name__.upper()}: {err}, classifying in this process')
+                self.inference = None
+        if self.inference is None:
+            try:
+                self.classifier = create_classifier(self.classifier_backend, self.classifier_options)
+                self.classifier.load()
+            except Exception as err:
+                logging.error(f'{self.__class__.__name__.upper()}: Unable to load the {self.classifier_backend} '
+                              f'classifier: {err}, sorting at random')
+                self.classifier = RandomClassifier()
+        # input size of the model, the classifier gets the coarsest pyramid level at least that large
+        sizing = self.classifier if self.classifier is not None else \
+            create_classifier(self.classifier_backend, self.classifier_options)
+        self.classifier_size = (sizing.width, sizing.height)
 
     def set_ui(self, ui):
         self.ui = ui
@@ -98,27 +220,23 @@ class Application:
     def set_communication_device(self, device):
         self.serial_service.open(device, BAUD_RATE, False)
 
+    def close(self):
+        try:
+            self.session.close()
+        finally:
+            if self.inference is not None:
+                # routes and saves the flies still being classified
+                self.inference.close()
+            self.deadlines.close()
+            self.writer.close()
+            self.storage.close()
+
     def trigger(self):
         try:
-            self.device_manager = gx.DeviceManager()
-            dev_num, dev_info_list = self.device_manager.update_device_list()
-            if dev_num == 0:
-                raise RuntimeError('No camera connected?')
-
-            self.cam = self.device_manager.open_device_by_index(1)
-            self.cam.TriggerMode.set(gx.GxSwitchEntry.ON)  # set trigger mode ON
-            self.cam.TriggerSource.set(gx.GxTriggerSourceEntry.SOFTWARE)  # Software trigger
-            # cam.TriggerDelay.set(0) #No additional trigger delay required. Take picture as fast as possible
-            self.cam.ExposureTime.set(self.camera.exposure)  # set exposure
-            logging.debug(self.cam.ExposureTime.get())
-            logging.debug(self.camera.exposure)
-            
-            self.cam.PixelFormat.set(17301505)  # TODO: check pixel format
-            self.cam.Gain.set(self.camera.gain)  # sensor gain
-            #self.cam.RegionMode.set(gx.GxRegionSendModeEntry.SINGLE_ROI)
-            #self.cam.RegionSelector.set(gx.GxRegionSelectorEntry.REGION0)
-            self.cam.stream_on()
-            self.cam.TriggerSoftware.send_command()
+            self._configure_camera(gx.GxTriggerSourceEntry.SOFTWARE)  # Software trigger
+            self.session.start_acquisition(self.camera.acquisition, self._on_capture)
+            self._start_frame_clock()
+            self.session.cam.TriggerSoftware.send_command()
             self.acquire_images()
             self.stop_camera()
 
@@ -130,19 +248,9 @@ class Application:
 
     def activate_camera(self):
         try:
-            self.device_manager = gx.DeviceManager()
-            dev_num, dev_info_list = self.device_manager.update_device_list()
-
-            self.cam = self.device_manager.open_device_by_index(1)
-            self.cam.TriggerMode.set(gx.GxSwitchEntry.ON)  # set trigger mode ON
-            self.cam.TriggerSource.set(gx.GxTriggerSourceEntry.LINE0)  # Hardware trigger on Line 0 of camera
-            # cam.TriggerDelay.set(0) #No additional trigger delay required. Take picture as fast as possible
-            self.cam.ExposureTime.set(self.camera.exposure)  # set exposure
-            logging.debug(self.camera.exposure)
-            logging.debug(self.cam.ExposureTime.get())
-            self.cam.PixelFormat.set(17301505)  # TODO: Mono8 17301505 Mono12 17825797
-            self.cam.Gain.set(self.camera.gain)  # sensor gain
-            
+            self._configure_camera(gx.GxTriggerSourceEntry.LINE0)  # Hardware trigger on Line 0 of camera
+            self.session.start_acquisition(self.camera.acquisition, self._on_capture)
+            self._start_frame_clock()
 
         except Exception as err:
             logging.warning(f'{self.__class__.__name__.upper()}: An error occured while communicating with camera '
@@ -150,40 +258,241 @@ class Application:
                             f'{err.args[0]}')
             raise RuntimeError(f'An error occurred while trying to communicate with camera')
 
+    def _configure_camera(self, trigger_source):
+        # the device stays open, only settings that changed since the last call are written
+        self.session.configure({
+            'TriggerMode': gx.GxSwitchEntry.ON,  # set trigger mode ON
+            'TriggerSource': trigger_source,
+            # 'TriggerDelay': 0, No additional trigger delay required. Take picture as fast as possible
+            'ExposureTime': self.camera.exposure,  # set exposure
+            'PixelFormat': PIXEL_FORMATS[self.camera.pixel_format],
+            'Gain': self.camera.gain,  # sensor gain
+        })
+        logging.debug(self.camera.exposure)
+
+    def _start_frame_clock(self):
+        """
+        Synchronise the frame timestamps with this host, the fly deadlines count from the exposure
+        """
+        if self.deadline_ms <= 0:
+            return
+        try:
+            self.frame_clock = FrameClock(self.session.cam.TimestampTickFrequency.get())
+            self._calibrate_frame_clock()
+        except Exception as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: Camera timestamps not available: {err}, '
+                            f'deadlines count from receiving the frame')
+            self.frame_clock = FrameClock()
+
+    def _calibrate_frame_clock(self):
+        cam = self.session.cam
+        before = time.monotonic()
+        cam.TimestampLatch.send_command()
+        after = time.monotonic()
+        self.frame_clock.calibrate(cam.TimestampLatchValue.get(), (before + after) / 2)
+
+    def _deadline(self):
+        """
+        :return: time.monotonic() by which the fly of the current frame has to be routed, None without deadline
+        """
+        if self.deadline_ms <= 0:
+            return None
+        if self.frame_clock.needs_calibration():
+            # the clocks drift apart, latched again every calibration_age seconds
+            try:
+                self._calibrate_frame_clock()
+            except Exception as err:
+                logging.warning(f'{self.__class__.__name__.upper()}: Unable to latch the camera timestamp: {err}')
+                self.frame_clock.calibrated_at = time.monotonic()
+        exposure = self.frame_clock.exposure_time(self.rawImage.frame_data.timestamp, self.received_time)
+        return exposure + self.deadline_ms / 1000
+
+    def _on_capture(self, image):
+        # stamped on delivery, the sorting loop may take the frame off the queue much later
+        received_time = time.monotonic()
+        capture_datetime = datetime.now()
+        # the SDK reuses the buffer as soon as the callback returns, so the queue gets a copy
+        # in a preallocated buffer, it goes back to the pool when the frame is released
+        self.frame_queue.put(CapturedFrame(image.copy(self.session.cam.data_stream[0].buffer_pool),
+                                           received_time, capture_datetime))
+
     def acquire_images(self):
         try:
-            if self.cam is None:
+            if self.session.cam is None:
                 logging.error('Camera does not exist')
-            self.cam.stream_on()
-            self.rawImage = self.cam.data_stream[0].get_image()  # acquire image
-            self.capture_time = datetime.now().strftime('%Y-%m-%d_%Hh%Mm%Ss')
+            if self.camera.acquisition == 'callback':
+                self._take_frame(self.frame_queue.get(FRAME_TIMEOUT_SECONDS))
+            else:
+                self.rawImage = self.session.cam.data_stream[0].dequeue_buffer()  # acquire image, stays in the SDK buffer
+                self._stamp_capture()
         except Exception as err:
+            if isinstance(err, gx.OffLine):
+                self.session.notify_offline()
             logging.warning(f'{self.__class__.__name__.upper()}: An error occured while trying to take a picture '
                             f'due to: '
                             f'{err.args[0]}')
             raise RuntimeError(f'An error occurred while trying to communicate with camera')
+        self._process_image()
+
+    async def acquire_images_async(self):
+        if self.camera.acquisition != 'callback':
+            return self.acquire_images()
+        # wait for the capture callback without blocking the event loop
+        self._take_frame(await self.frame_queue.get_async(FRAME_TIMEOUT_SECONDS))
+        self._process_image()
+
+    def _take_frame(self, frame: Optional[CapturedFrame]):
+        if frame is None:
+            self.rawImage = None
+            self._stamp_capture()
+        else:
+            self.rawImage = frame.image
+            self._stamp_capture(frame.received_time, frame.capture_datetime)
+
+    def _stamp_capture(self, received_time: Optional[float] = None, capture_datetime: Optional[datetime] = None):
+        """
+        :param received_time: time.monotonic() when the frame was delivered, now by default
+        """
+        self.received_time = time.monotonic() if received_time is None else received_time
+        self.capture_datetime = datetime.now() if capture_datetime is None else capture_datetime
+        self.capture_time = self.capture_datetime.strftime(CAPTURE_TIME_FORMAT)
+
+    def _process_image(self):
         # create numpy array with data from raw image
         if self.rawImage is not None:
-            numpy_image = self.rawImage.get_numpy_array()
-            self.processedImg = Image.fromarray(numpy_image, 'L')
-            self.async_loop.run_until_complete(self._async_save_images(
-                self.processedImg))  # TODO: for now store the image, later determine sex and send to cage
-            logging.debug('Reached update function')
-            fly_sex = self.determine_sex()
-            self.determine_destination(fly_sex)
-            if self.acquire_images is not None and self.update_function is not None:
-                self.update_function()
-            self.newImage = True
+            try:
+                numpy_image = self.rawImage.get_numpy_array()
+                if numpy_image.dtype == 'uint8':
+                    mono8 = numpy_image
+                else:
+                    # keep the full bit depth on disk, show the image scaled to 8 bit
+                    mono8 = self.rawImage.get_display_array()
+                # downscaled once, shared by the presence detector, the preview, the crop and the classifier
+                pyramid = ImagePyramid(mono8)
+                if self.presence.enabled and not self.presence.is_present(mono8, pyramid):
+                    logging.debug(f'{self.__class__.__name__.upper()}: No fly in frame '
+                                  f'{self.rawImage.frame_data.frame_id} ({self.presence.empty} empty frames)')
+                    self.newImage = False
+                    return
+                self.processedImg = Image.fromarray(pyramid.for_size(*PREVIEW_SIZE), 'L')
+                deadline = self._deadline()
+                # the classifier gets the fly only when cropping is enabled
+                box = self.cropper.locate(mono8, pyramid) if self.cropper.enabled else None
+                fly = pyramid.region(box, *self.classifier_size)
+                metadata = {
+                    'frame_id': self.rawImage.frame_data.frame_id,
+                    'timestamp': self.rawImage.frame_data.timestamp,
+                    'capture_time': self.capture_datetime.timestamp(),
+                }
+                # called once the fly is written, None when numpy_image owns its data
+                release = None
+                if box is not None:
+                    # a copy, so the full frame is freed while the fly waits in the write queue
+                    numpy_image = FlyCropper.cut(numpy_image, box).copy()
+                    metadata['x'], metadata['y'] = box[0], box[1]
+                elif self.cropper.enabled:
+                    logging.debug(f'{self.__class__.__name__.upper()}: No fly found, saving the whole frame')
+                if box is None and not numpy_image.flags.owndata:
+                    if self.camera.acquisition == 'callback':
+                        # already a copy in a pool buffer, the writer gives it back once the frame is written
+                        release = self.rawImage.detach()
+                    else:
+                        # the writer holds on to the image after the buffer went back to the camera
+                        numpy_image = numpy_image.copy()
+                if deadline is not None and time.monotonic() > deadline:
+                    # waited too long in the frame queue, not worth classifying
+                    self._route(numpy_image, metadata, None, deadline, release)
+                elif self.inference is not None:
+                    self._classify_in_background(fly, numpy_image, metadata, deadline, release)
+                else:
+                    self.determine_sex(fly)
+                    self._route(numpy_image, metadata, self.last_classification, deadline, release)
+                logging.debug('Reached update function')
+                if self.acquire_images is not None and self.update_function is not None:
+                    self.update_function()
+                self.newImage = True
+            finally:
+                # hand the buffer back to the acquisition queue unless the writer took it over
+                self.rawImage.release()
         else:
             self.newImage = False
             logging.debug('No picture taken')
 
+    def _classify_in_background(self, fly, pixels, metadata: dict, deadline: Optional[float] = None, release=None):
+        frame_id = metadata['frame_id']
+        with self._route_lock:
+            self._pending[frame_id] = (pixels, metadata, deadline, release)
+        if deadline is not None:
+            self.deadlines.add(frame_id, deadline)
+        # the fly is copied into shared memory, the sorting loop goes on with the next frame
+        timeout = FRAME_TIMEOUT_SECONDS if deadline is None else max(deadline - time.monotonic(), 0)
+        if not self.inference.submit(frame_id, fly, timeout):
+            logging.warning(f'{self.__class__.__name__.upper()}: Classifier busy, frame {frame_id} is uncertain')
+            with self._route_lock:
+                pending = self._pending.pop(frame_id, None)
+            if pending is not None:
+                pixels, metadata, deadline, release = pending
+                self._route(pixels, metadata, None, deadline, release)
+
+    def _on_classified(self, frame_id: int, classification):
+        """
+        Called on the result thread of the inference pool
+        """
+        with self._route_lock:
+            pending = self._pending.pop(frame_id, None)
+        if pending is None:
+            # routed to the fallback cage when its deadline passed
+            logging.debug(f'{self.__class__.__name__.upper()}: Classification of frame {frame_id} arrived late')
+            return
+        self.last_classification = classification
+        pixels, metadata, deadline, release = pending
+        self._route(pixels, metadata, classification, deadline, release)
+
+    def _on_deadline(self, frame_id: int, expires: float):
+        """
+        Called on the deadline thread, routes a fly still being classified to the fallback cage
+        """
+        with self._route_lock:
+            pending = self._pending.get(frame_id)
+            # the frame id may be reused by a later fly with a later deadline
+            if pending is None or pending[2] != expires:
+                return
+            del self._pending[frame_id]
+        pixels, metadata, deadline, release = pending
+        self._route(pixels, metadata, None, deadline, release)
+
+    def _route(self, pixels, metadata: dict, classification, deadline: Optional[float] = None, release=None):
+        """
+        Fire the fly to its cage and store it, stored after the valve decision so the sex and cage go along
+        :param classification: None when the fly could not be classified, it goes to the uncertain cage
+        :param deadline: time.monotonic() after which the fly goes to the fallback cage
+        :param release: gives the frame buffer of pixels back to its pool once pixels is written
+        """
+        sex, confidence = (-1, 0.0) if classification is None else classification
+        with self._route_lock:
+            if deadline is not None and time.monotonic() > deadline:
+                cage = self.route_fallback(metadata['frame_id'])
+            else:
+                cage = self.determine_destination(sex, confidence)
+        metadata.update({'sex': sex, 'confidence': confidence, 'cage': -1 if cage is None else cage.ID})
+        self.save_image(pixels, metadata, release)
+
     def stop_camera(self):
         try:
-            # stop data acquisition
-            self.cam.stream_off()
-            # close device
-            self.cam.close_device()
+            # stop data acquisition, the device stays open for the next run
+            self.session.stop_acquisition()
+            self.frame_queue.clear()
+            if self.session.cam is not None:
+                logging.debug(f'{self.__class__.__name__.upper()}: Frame buffer pool: '
+                              f'{self.session.cam.data_stream[0].buffer_pool.get_statistics()}')
+            logging.debug(f'{self.__class__.__name__.upper()}: Image writer: {self.writer.get_statistics()}')
+            logging.debug(f'{self.__class__.__name__.upper()}: Storage: {self.storage.get_statistics()}')
+            logging.debug(f'{self.__class__.__name__.upper()}: Presence: {self.presence.get_statistics()}')
+            logging.debug(f'{self.__class__.__name__.upper()}: Deadline misses: {self.deadline_misses}')
+            if self.inference is not None:
+                logging.debug(f'{self.__class__.__name__.upper()}: Inference pool: {self.inference.get_statistics()}')
+            else:
+                logging.debug(f'{self.__class__.__name__.upper()}: Classifier: {self.classifier.get_statistics()}')
         except Exception as err:
             logging.warning(f'{self.__class__.__name__.upper()}: An error occured while communicating with camera '
                             f'due to: '
@@ -191,15 +500,23 @@ class Application:
             raise RuntimeError(f'An error occurred while trying to communicate with camera')
         time.sleep(0.01)
 
-    def save_image(self, img):
+    def save_image(self, pixels, metadata=None, release=None):
         sep = os.path.sep
-        logging.info("Write to director {}".format(self.save_directory))
-        path = pathlib.Path(self.save_directory)
-        path.mkdir(parents=True, exist_ok=True)
-
-        outfile = self.save_directory + sep + self.capture_time + ".jpg"
-        logging.info("Writing file to {}".format(outfile))
-        img.save(outfile, compress_level=3)
+        # the encoder adds the extension, images of more than 8 bit go to PNG unless it holds 16 bit
+        if metadata is not None:
+            # the fly may be routed on the result thread of the pool, when capture_time is of a later frame
+            capture_time = datetime.fromtimestamp(metadata['capture_time']).strftime(CAPTURE_TIME_FORMAT)
+            outfile = self.save_directory + sep + capture_time + '_{}'.format(metadata['frame_id'])
+        else:
+            outfile = self.save_directory + sep + self.capture_time
+        if not self.storage.admit(pixels.nbytes, metadata):
+            # sampled out or the drive is full, the sorting goes on
+            logging.info("Not saving file {}: {}".format(outfile, metadata))
+            if release is not None:
+                release()
+            return
+        logging.info("Queueing file {} ({} waiting)".format(outfile, self.writer.depth))
+        self.writer.submit(pixels, outfile, metadata, release)
 
     def fire_to_cage(self, cage):
         message={
@@ -245,55 +562,104 @@ class Application:
 
         logging.debug("Setting ROI:")
         logging.debug("%s, %s, %s, %s", self.camera.roix, self.camera.roiy, self.camera.roiwidth, self.camera.roiheight)
-        self.activate_camera()
+        # the ROI can only be changed while the camera is not acquiring
+        resume = self.session.acquiring
+        self.stop_camera()
         try:
-            self.cam.Width.set(16)
-            self.cam.Height.set(2)
-            self.cam.OffsetX.set(0)
-            self.cam.OffsetY.set(0)
-            self.cam.OffsetX.set(int(self.camera.roix))
-            self.cam.OffsetY.set(int(self.camera.roiy))
-            self.cam.Width.set(int(self.camera.roiwidth))
-            self.cam.Height.set(int(self.camera.roiheight))
-            logging.debug(self.cam.OffsetX)
+            self.session.configure({
+                'OffsetX': int(self.camera.roix),
+                'OffsetY': int(self.camera.roiy),
+                'Width': int(self.camera.roiwidth),
+                'Height': int(self.camera.roiheight),
+            })
+            # the background learned for the old ROI does not apply
+            self.presence.reset()
+            if resume:
+                self.session.start_acquisition(self.camera.acquisition, self._on_capture)
         except Exception as err:
             logging.warning(f'{self.__class__.__name__.upper()}: An error occured while communicating with camera '
                             f'due to: '
                             f'{err.args[0]}')
             raise RuntimeError(f'An error occurred while trying to communicate with camera')
-        self.stop_camera()
 
     @staticmethod
     def round_to_multiple(number, multiple):
         return multiple * round(number / multiple)
 
-    @staticmethod
-    def determine_sex():
-        # TODO: send image to AI and get feedback
-        sex = randint(0, 1)
-        return sex
+    def determine_sex(self, frame):
+        """
+        :param frame: 2-D uint8 image of the fly
+        :return: 1 for a male, 0 for a female
+        """
+        self.last_classification = self.classifier.classify(frame)
+        logging.debug(f'{self.__class__.__name__.upper()}: Classified as {self.last_classification} in '
+                      f'{self.classifier.last_seconds * 1000:.1f} ms')
+        return self.last_classification.sex
+
+    def _cage_by_name(self, name: Optional[str]):
+        """
+        :return: the cage called name, the last (trash) cage when there is none
+        """
+        for cage in self.cages:
+            if cage.name == name:
+                return cage
+        return self.cages[-1] if self.cages else None
+
+    def uncertain_cage(self):
+        return self._cage_by_name(self.uncertain_cage_name)
+
+    def route_fallback(self, frame_id: int):
+        """
+        Fire a fly that missed its deadline to the fallback cage
+        :return: the fallback cage
+        """
+        self.deadline_misses += 1
+        cage = self._cage_by_name(self.fallback_cage_name or self.uncertain_cage_name)
+        if cage is not None:
+            self.fire_to_cage(cage)
+            cage.add_uncertain()
+            logging.warning(f'{self.__class__.__name__.upper()}: Frame {frame_id} missed its deadline, fly added '
+                            f'to Cage {cage.ID} ({self.deadline_misses} misses so far)')
+        return cage
+
+    def determine_destination(self, sex: int, confidence: float = 1.0):
+        """
+        :param sex: 1 for a male, 0 for a female, -1 when the fly could not be classified
+        :param confidence: probability of sex given by the classifier
+        :return: the cage the fly was fired to, None when there are no cages
+        """
+        threshold = self.male_threshold if sex == 1 else self.female_threshold
+        if sex not in (0, 1) or confidence < threshold:
+            cage = self.uncertain_cage()
+            if cage is not None:
+                self.fire_to_cage(cage)
+                cage.add_uncertain()
+                logging.info("Uncertain fly ({} with confidence {:.2f}) added to Cage {}".format(
+                    {1: 'male', 0: 'female'}.get(sex, 'unclassified'), confidence, cage.ID))
+            return cage
 
-    def determine_destination(self, sex: int):
         cage_selected = False
         for cage in self.cages:
-            if sex == 1 and not cage.malesComplete:  # TODO: what with flies with low probability of being correct?
+            if sex == 1 and not cage.malesComplete:
                 self.fire_to_cage(cage)
                 cage_selected = True
                 cage.add_male()
                 logging.info("Male fly added to Cage {}".format(cage.ID))
                 logging.info("Total number of male flies in cage {} is {}".format(cage.ID, cage.numberMales))
-                break
+                return cage
             elif sex == 0 and not cage.femalesComplete:
                 self.fire_to_cage(cage)
                 cage_selected = True
                 cage.add_female()
                 logging.info("Female fly added to Cage {}".format(cage.ID))
                 logging.info("Total number of female flies in cage {} is {}".format(cage.ID, cage.numberFemales))
-                break
+                return cage
 
             if not cage_selected and cage.ID == len(self.cages):
                 self.fire_to_cage(cage)
                 logging.info("All full, firing to trash")
+                return cage
+        return None
 
     def _load_settings(self, file_name: str):
         logging.debug(f'{self.__class__.__name__.upper()}: Start loading settings')
@@ -328,9 +694,68 @@ class Application:
                             self.camera.roiwidth = float(childchild.text)
                         elif childchild.tag == 'roiheight':
                             self.camera.roiheight = float(childchild.text)
+                        elif childchild.tag == 'acquisition':
+                            self.camera.acquisition = childchild.text
+                        elif childchild.tag == 'pixelformat':
+                            if childchild.text in PIXEL_FORMATS:
+                                self.camera.pixel_format = childchild.text
+                            else:
+                                logging.warning(f'{self.__class__.__name__.upper()}: Unknown pixel format '
+                                                f'{childchild.text}, using {self.camera.pixel_format}')
 
                 elif child.tag == 'savedirectory':
                     self.save_directory = child.text
+                elif child.tag == 'writequeue':
+                    self.write_queue_size = int(child.text)
+                elif child.tag == 'encoder':
+                    for childchild in child:
+                        if childchild.tag == 'format':
+                            self.encoder = childchild.text
+                        elif childchild.tag == 'processes':
+                            self.encoder_processes = int(childchild.text)
+                        else:
+                            self.encoder_options[childchild.tag] = childchild.text
+                elif child.tag == 'classifier':
+                    for childchild in child:
+                        if childchild.tag == 'backend':
+                            self.classifier_backend = childchild.text
+                        elif childchild.tag == 'processes':
+                            self.classifier_processes = int(childchild.text)
+                        elif childchild.tag == 'slots':
+                            self.classifier_slots = int(childchild.text)
+                        else:
+                            self.classifier_options[childchild.tag] = childchild.text
+                elif child.tag == 'routing':
+                    for childchild in child:
+                        if childchild.tag == 'malethreshold':
+                            self.male_threshold = float(childchild.text)
+                        elif childchild.tag == 'femalethreshold':
+                            self.female_threshold = float(childchild.text)
+                        elif childchild.tag == 'uncertaincage':
+                            self.uncertain_cage_name = childchild.text
+                elif child.tag == 'deadline':
+                    for childchild in child:
+                        if childchild.tag == 'budgetms':
+                            self.deadline_ms = float(childchild.text)
+                        elif childchild.tag == 'fallbackcage':
+                            self.fallback_cage_name = childchild.text
+                elif child.tag == 'presence':
+                    self.presence_options = {}
+                    for childchild in child:
+                        self.presence_options[childchild.tag] = childchild.text
+                elif child.tag == 'storage':
+                    for childchild in child:
+                        self.storage_options[childchild.tag] = childchild.text
+                elif child.tag == 'crop':
+                    self.crop_options = {}
+                    for childchild in child:
+                        self.crop_options[childchild.tag] = childchild.text
+                elif child.tag == 'writepolicy':
+                    if child.text in ImageWriter.POLICIES:
+                        self.write_policy = child.text
+                    else:
+                        logging.warning(f'{self.__class__.__name__.upper()}: Unknown write policy {child.text}, '
+                                        f'using {self.write_policy}')
                 elif child.tag == 'logdirectory':
                     self.log_directory = child.text
                     sep = os.path.sep
@@ -363,7 +788,7 @@ class Application:
                 f' {err.strerror}')
             exit()
 
+        for kind, name in (('uncertain', self.uncertain_cage_name), ('fallback', self.fallback_cage_name)):
+            if name is not None and name not in [cage.name for cage in self.cages]:
+                logging.warning(f'{self.__class__.__name__.upper()}: Unknown {kind} cage {name}, using the last cage')
         logging.debug(f'{self.__class__.__name__.upper()}: Settings loaded')
-
-    async def _async_save_images(self, img):
-        return self.save_image(img)
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy
+
+INDEX_MAGIC = b'FLYIDX01'
+INDEX_FILE = 'index.bin'
+CHUNK_FILE = 'chunk-{:06d}.bin'
+# frames start on block boundaries, so they are written in whole flash pages and can be memory-mapped
+BLOCK_SIZE = 4096
+# FAT32 formatted drives do not take files of 4 GiB
+DEFAULT_CHUNK_SIZE = 1 << 30
+
+INDEX_DTYPE = numpy.dtype([
+    ('frame_id', '<u8'),
+    ('timestamp', '<u8'),       # camera timestamp
+    ('capture_time', '<f8'),    # seconds since the epoch
+    ('sex', '<i1'),             # -1 unknown
+    ('confidence', '<f4'),      # of the classification of sex, 0 unknown
+    ('cage', '<i2'),            # -1 none
+    ('bits', '<u1'),            # 8 (uint8) or 16 (uint16 pixels)
+    ('chunk', '<u4'),
+    ('offset', '<u8'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('x', '<u4'),               # position of a cropped frame in the camera image
+    ('y', '<u4'),
+])
+
+
+class FrameArchive:
+    """
+    Append-only archive of raw frames. Frames are written one after the other into chunk files of at most
+    chunk_size bytes, every frame gets a fixed-size record in index.bin with its location and metadata.
+    Writing is purely sequential, reading maps the chunks and returns frames by their position in the index.
+    """
+
+    def __init__(self, directory: str, mode: str = 'a', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 sync: bool = False) -> None:
+        """
+        :param mode: 'a' to append (the archive is created when missing), 'r' to read only
+        :param sync: fsync after every frame, survives power loss at the cost of write speed
+        """
+        if mode not in ('a', 'r'):
+            raise ValueError(f'Unknown archive mode {mode}')
+        self.directory = directory
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._chunk_file = None
+        self._index_path = os.path.join(directory, INDEX_FILE)
+
+        if mode == 'a':
+            os.makedirs(directory, exist_ok=True)
+            if not os.path.exists(self._index_path):
+                with open(self._index_path, 'wb') as index_file:
+                    index_file.write(INDEX_MAGIC)
+        # records live in _index[:_count], _index grows by doubling
+        self._index = self._read_index()
+        self._count = len(self._index)
+        records = self._index[:self._count]
+        self._chunk = int(records['chunk'].max()) if self._count else 0
+        self._offset = self._chunk_end(self._chunk)
+        self._index_file = None
+        if mode == 'a':
+            self._index_file = open(self._index_path, 'r+b')
+            # drop a record cut off by a crash
+            self._index_file.truncate(len(INDEX_MAGIC) + self._count * INDEX_DTYPE.itemsize)
+            self._index_file.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def records(self):
+        """
+        Index of all frames as numpy structured array of INDEX_DTYPE
+        """
+        with self._lock:
+            return self._index[:self._count].copy()
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes of the chunks written so far, the unused tails of full chunks included
+        """
+        with self._lock:
+            return self._chunk * self.chunk_size + self._offset
+
+    def append(self, pixels, frame_id: int = 0, timestamp: int = 0, sex: int = -1, cage: int = -1,
+               capture_time: Optional[float] = None, x: int = 0, y: int = 0, confidence: float = 0.0) -> int:
+        """
+        Append a 2-D uint8 or uint16 frame
+        :param x: column of the left edge of a cropped frame in the camera image
+        :param y: row of the top edge of a cropped frame in the camera image
+        :return: position of the frame in the index
+        """
+        if self.mode != 'a':
+            raise IOError('Archive is opened read only')
+        if pixels.dtype not in (numpy.uint8, numpy.uint16) or pixels.ndim != 2:
+            raise ValueError(f'Expected a 2-D uint8 or uint16 frame, not {pixels.ndim}-D {pixels.dtype}')
+        pixels = numpy.ascontiguousarray(pixels)
+        size = _aligned(pixels.nbytes)
+
+        with self._lock:
+            if self._offset > 0 and self._offset + size > self.chunk_size:
+                if self._chunk_file is not None:
+                    self._chunk_file.close()
+                    self._chunk_file = None
+                self._chunk += 1
+                self._offset = 0
+            if self._chunk_file is None:
+                self._open_chunk()
+            self._chunk_file.write(memoryview(pixels).cast('B'))
+            padding = size - pixels.nbytes
+            if padding:
+                self._chunk_file.write(bytes(padding))
+
+            record = numpy.zeros(1, dtype=INDEX_DTYPE)
+            record[0] = (frame_id, timestamp, time.time() if capture_time is None else capture_time, sex,
+                         confidence, cage,
+                         pixels.dtype.itemsize * 8, self._chunk, self._offset, pixels.shape[0], pixels.shape[1], x, y)
+            self._offset += size
+            # the frame is on disk before its index record
+            self._chunk_file.flush()
+            self._index_file.write(record.tobytes())
+            self._index_file.flush()
+            if self.sync:
+                os.fsync(self._chunk_file.fileno())
+                os.fsync(self._index_file.fileno())
+            if self._count == len(self._index):
+                self._index = numpy.resize(self._index, max(2 * self._count, 1024))
+            self._index[self._count] = record[0]
+            self._count += 1
+            return self._count - 1
+
+    def read(self, position: int):
+        """
+        :return: (pixels, record), pixels is a read only view of the mapped chunk
+        """
+        with self._lock:
+            if not -self._count <= position < self._count:
+                raise IndexError(f'Frame {position} is not in the archive of {self._count} frames')
+            record = self._index[:self._count][position]
+            chunk = int(record['chunk'])
+            dtype = numpy.uint8 if record['bits'] == 8 else numpy.uint16
+            size = int(record['height']) * int(record['width']) * numpy.dtype(dtype).itemsize
+            end = int(record['offset']) + size
+            chunk_map = self._maps.get(chunk)
+            if chunk_map is None or len(chunk_map) < end:
+                if self._chunk_file is not None and chunk == self._chunk:
+                    self._chunk_file.flush()
+                chunk_map = numpy.memmap(self._chunk_path(chunk), dtype=numpy.uint8, mode='r')
+                self._maps[chunk] = chunk_map
+        pixels = chunk_map[int(record['offset']):end].view(dtype).reshape(int(record['height']), int(record['width']))
+        return pixels, record
+
+    def close(self):
+        with self._lock:
+            for open_file in (self._chunk_file, self._index_file):
+                if open_file is not None:
+                    open_file.close()
+            self._chunk_file = None
+            self._index_file = None
+            self._maps = {}
+
+    def _read_index(self):
+        with open(self._index_path, 'rb') as index_file:
+            if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise IOError(f'{self._index_path} is not a frame archive index')
+            data = index_file.read()
+        # a record cut off by a crash is ignored
+        count = len(data) // INDEX_DTYPE.itemsize
+        return numpy.frombuffer(data, dtype=INDEX_DTYPE, count=count).copy()
+
+    def _chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.directory, CHUNK_FILE.format(chunk))
+
+    def _chunk_end(self, chunk: int) -> int:
+        """
+        End of the last indexed frame of chunk, anything behind it was not indexed and is overwritten
+        """
+        records = self._index[:self._count]
+        records = records[records['chunk'] == chunk]
+        if not len(records):
+            return 0
+        last = records[-1]
+        return int(last['offset']) + _aligned(int(last['height']) * int(last['width']) * int(last['bits']) // 8)
+
+    def _open_chunk(self):
+        path = self._chunk_path(self._chunk)
+        self._chunk_file = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        self._chunk_file.seek(self._offset)
+        self._chunk_file.truncate()
+
+
+def _aligned(size: int) -> int:
+    return -(-size // BLOCK_SIZE) * BLOCK_SIZE
@@ -0,0 +1,215 @@
+"""
+Measure accuracy and latency of a sex classifier on a labeled image set:
+
+    python3 -m application.benchmark <images> --settings settings.xml --output benchmark.json
+
+Images are labeled by a male or female directory in their path, only those count for the accuracy. The sex
+stored with an image (frame archive index or EXIF description) is the prediction of the production classifier,
+so it is reported separately as agreement. The classifier runs in this process like determine_sex, after a
+warm-up at every batch size. The results are written as JSON, so runs of different models and machines can
+be compared.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy
+
+from application.classifier import FEMALE, MALE, create_classifier
+from application.reclassify import DEFAULT_BITS, find_images, load_classifier_settings, load_image, to_mono8
+
+LABEL_DIRECTORIES = {'female': FEMALE, 'male': MALE}
+SEX_NAMES = {FEMALE: 'female', MALE: 'male'}
+
+
+def label_of(source: str):
+    """
+    :return: FEMALE or MALE of a male or female directory in the path, None for an unlabeled image
+    """
+    for part in reversed(os.path.normpath(source).split(os.sep)):
+        if part.lower() in LABEL_DIRECTORIES:
+            return LABEL_DIRECTORIES[part.lower()]
+    return None
+
+
+def load_labeled_images(root: str, bits: int = DEFAULT_BITS, limit: int = 0):
+    """
+    :return: (frames, labels, stored), frames are 2-D uint8 arrays held in memory, so reading is not measured.
+             labels are the directory labels and stored the sexes stored with the images, -1 where there is none.
+    """
+    frames, labels, stored = [], [], []
+    for source, position in find_images(root):
+        pixels, metadata = load_image(source, position)
+        label = label_of(source)
+        stored_sex = metadata.get('sex')
+        stored_sex = stored_sex if stored_sex in (FEMALE, MALE) else None
+        if label is None and stored_sex is None:
+            continue
+        frames.append(numpy.ascontiguousarray(to_mono8(pixels, bits)))
+        labels.append(-1 if label is None else label)
+        stored.append(-1 if stored_sex is None else stored_sex)
+        if limit and len(frames) >= limit:
+            break
+    return frames, numpy.array(labels, dtype=numpy.int8), numpy.array(stored, dtype=numpy.int8)
+
+
+def measure_accuracy(classifier, frames, labels, stored) -> dict:
+    """
+    :return: accuracy against the directory labels and agreement with the stored sexes
+    """
+    predictions = numpy.array([classifier.classify(frame).sex for frame in frames], dtype=numpy.int8)
+    labeled = labels >= 0
+    # rows are the labels, columns the predictions, both in the order female, male
+    confusion = numpy.zeros((2, 2), dtype=int)
+    numpy.add.at(confusion, (labels[labeled], predictions[labeled]), 1)
+    compared = stored >= 0
+    result = {
+        'images': int(numpy.count_nonzero(labeled)),
+        'accuracy': float(numpy.trace(confusion) / confusion.sum()) if confusion.sum() else None,
+        'confusion': {'labels': [SEX_NAMES[FEMALE], SEX_NAMES[MALE]], 'matrix': confusion.tolist()},
+        # with the production classifier, not a measure of correctness
+        'stored_sex': {
+            'images': int(numpy.count_nonzero(compared)),
+            'agreement': float(numpy.mean(predictions[compared] == stored[compared])) if compared.any() else None,
+        },
+    }
+    for sex, name in SEX_NAMES.items():
+        predicted, actual = confusion[:, sex].sum(), confusion[sex, :].sum()
+        result[name] = {
+            'precision': float(confusion[sex, sex] / predicted) if predicted else None,
+            'recall': float(confusion[sex, sex] / actual) if actual else None,
+        }
+    return result
+
+
+def measure_latency(classifier, frames, batch_size: int, warmup: int, repeat: int) -> dict:
+    """
+    :return: latency per classify_batch call in ms and throughput in images per second
+    """
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames) - batch_size + 1, batch_size)]
+    if not batches:
+        return {}
+    for i in range(warmup):
+        classifier.classify_batch(batches[i % len(batches)])
+    seconds = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for batch in batches:
+            before = time.perf_counter()
+            classifier.classify_batch(batch)
+            seconds.append(time.perf_counter() - before)
+    total = time.perf_counter() - start
+    milliseconds = numpy.array(seconds) * 1000
+    p50, p95, p99 = numpy.percentile(milliseconds, (50, 95, 99))
+    return {
+        'calls': len(seconds),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'mean_ms': float(milliseconds.mean()),
+        'max_ms': float(milliseconds.max()),
+        'p50_ms_per_image': float(p50 / batch_size),
+        'images_per_second': len(seconds) * batch_size / total,
+    }
+
+
+def benchmark(root: str, backend: str, options: dict, batch_sizes=(1,), warmup: int = 10, repeat: int = 3,
+              bits: int = DEFAULT_BITS, limit: int = 0) -> dict:
+    frames, labels, stored = load_labeled_images(root, bits, limit)
+    if not frames:
+        raise ValueError(f'No labeled images or images with a stored sex in {root}')
+    logging.info(f'BENCHMARK: {len(frames)} images, {numpy.count_nonzero(labels >= 0)} labeled, '
+                 f'{numpy.count_nonzero(labels == MALE)} males')
+
+    classifier = create_classifier(backend, options)
+    start = time.perf_counter()
+    classifier.load()
+    load_seconds = time.perf_counter() - start
+    for _ in range(warmup):
+        classifier.classify(frames[0])
+
+    results = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'host': {'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+                 'python': platform.python_version(), 'node': platform.node()},
+        'classifier': {'backend': backend, 'options': options},
+        'dataset': {'directory': os.path.abspath(root), 'images': len(frames),
+                    'males': int(numpy.count_nonzero(labels == MALE)),
+                    'females': int(numpy.count_nonzero(labels == FEMALE)),
+                    'stored_sex': int(numpy.count_nonzero(stored >= 0))},
+        'load_seconds': load_seconds,
+        'accuracy': measure_accuracy(classifier, frames, labels, stored),
+        'latency': {},
+    }
+    for batch_size in batch_sizes:
+        latency = measure_latency(classifier, frames, batch_size, warmup, repeat)
+        if not latency:
+            logging.warning(f'BENCHMARK: Batch size {batch_size} is larger than the image set')
+            continue
+        results['latency'][str(batch_size)] = latency
+        logging.info(f'BENCHMARK: Batch size {batch_size}: p50 {latency["p50_ms"]:.2f} ms, '
+                     f'p99 {latency["p99_ms"]:.2f} ms, {latency["images_per_second"]:.1f} images/s')
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure accuracy and latency of a sex classifier')
+    parser.add_argument('directory', help='images labeled by male/female directories, or with a stored sex')
+    parser.add_argument('--settings', default='settings.xml', help='settings.xml with the <classifier> block')
+    parser.add_argument('--backend', help='classifier backend instead of the one in the settings')
+    parser.add_argument('--model', help='model file instead of the one in the settings')
+    parser.add_argument('--option', action='append', default=[], metavar='TAG=VALUE',
+                        help='further classifier option, may be repeated')
+    parser.add_argument('--batch-sizes', default='1,2,4,8', help='comma separated batch sizes')
+    parser.add_argument('--warmup', type=int, default=10, help='inferences before measuring')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the image set per batch size')
+    parser.add_argument('--limit', type=int, default=0, help='use at most this many images, 0 for all')
+    parser.add_argument('--bits', type=int, default=DEFAULT_BITS,
+                        help='bit depth of the camera pixel format of 16 bit images')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random backend')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file for the results')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    random.seed(args.seed)
+
+    backend, options = load_classifier_settings(args.settings) if os.path.exists(args.settings) else ('random', {})
+    if args.backend:
+        backend = args.backend
+    if args.model:
+        options['model'] = args.model
+    for option in args.option:
+        tag, _, value = option.partition('=')
+        options[tag] = value
+
+    try:
+        batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+        results = benchmark(args.directory, backend, options, batch_sizes, args.warmup, args.repeat, args.bits,
+                            args.limit)
+    except Exception as err:
+        logging.critical(f'BENCHMARK: {err}')
+        return 1
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    accuracy = results['accuracy']
+    if accuracy['accuracy'] is not None:
+        print(f"accuracy {accuracy['accuracy']:.4f} on {accuracy['images']} labeled images, "
+              f"confusion (female, male) {accuracy['confusion']['matrix']}")
+    else:
+        print('accuracy not measured, no images in male/female directories')
+    if accuracy['stored_sex']['agreement'] is not None:
+        print(f"agreement {accuracy['stored_sex']['agreement']:.4f} with the stored sex of "
+              f"{accuracy['stored_sex']['images']} images")
+    for batch_size, latency in results['latency'].items():
+        print(f"batch {batch_size}: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+              f"p99 {latency['p99_ms']:.2f} ms, {latency['images_per_second']:.1f} images/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import logging
+import threading
+
+import gxipy as gx
+from retry.api import retry_call
+
+
+class CameraSession:
+    """
+    Keeps one GxIAPI device open across sorting runs. Settings are written with Device.apply, which skips
+    values that did not change, and the device is reopened automatically when it goes offline.
+    """
+    _RECONNECT_RETRIES = 10
+
+    def __init__(self, serial_number: str = '', buffer_num: int = 8) -> None:
+        """
+        :param buffer_num: number of preallocated frame buffers of the data stream
+        """
+        self.serial_number = serial_number
+        self.buffer_num = buffer_num
+        self.device_manager = None
+        self.cam = None
+        self.acquiring = False
+        self._settings = {}
+        self._acquisition_mode = None
+        self._on_capture = None
+        self._offline = False
+        self._lock = threading.RLock()
+
+    def open(self):
+        """
+        :raises RuntimeError when no camera is connected, gxipy exceptions when opening fails
+        """
+        with self._lock:
+            if self.cam is None or self._offline:
+                self._connect()
+            return self.cam
+
+    def configure(self, settings: dict):
+        """
+        Write feature values given as {feature name: value} in one Device.apply call
+        :raises gx.FeatureApplyError listing every feature that could not be written
+        """
+        with self._lock:
+            self._settings.update(settings)
+            cam = self.open()
+            cam.apply(settings)
+
+    def start_acquisition(self, mode: str, on_capture=None):
+        """
+        :param mode: 'callback' to have GxIAPI push frames to on_capture, 'stream' for DQBuf streaming
+        """
+        with self._lock:
+            if self.acquiring:
+                return
+            cam = self.open()
+            if mode == 'callback':
+                cam.register_capture_callback(on_capture)
+                cam.stream_on()
+            else:
+                cam.data_stream[0].start_streaming()
+            self._acquisition_mode = mode
+            self._on_capture = on_capture
+            self.acquiring = True
+
+    def stop_acquisition(self):
+        with self._lock:
+            if not self.acquiring:
+                return
+            self.acquiring = False
+            if self._offline:
+                return
+            if self._acquisition_mode == 'callback':
+                self.cam.stream_off()
+                self.cam.unregister_capture_callback()
+            else:
+                self.cam.data_stream[0].stop_streaming()
+
+    def notify_offline(self):
+        """
+        Called by the offline callback or when a camera call raised gx.OffLine
+        """
+        with self._lock:
+            if self._offline:
+                return
+            self._offline = True
+        logging.warning(f'{self.__class__.__name__.upper()}: Camera went offline, reconnecting')
+        threading.Thread(target=self._reconnect_in_background, daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.stop_acquisition()
+            finally:
+                self._release_device()
+                self._settings = {}
+
+    def _connect(self):
+        if self.cam is not None:
+            self._release_device()
+        if self.device_manager is None:
+            self.device_manager = gx.DeviceManager()
+        dev_num, dev_info_list = self.device_manager.update_device_list()
+        if dev_num == 0:
+            raise RuntimeError('No camera connected?')
+
+        if self.serial_number and self.serial_number in [info['sn'] for info in dev_info_list]:
+            self.cam = self.device_manager.open_device_by_sn(self.serial_number)
+        else:
+            if self.serial_number:
+                logging.warning(f'{self.__class__.__name__.upper()}: Camera {self.serial_number} not found, '
+                                f'opening the first camera')
+            self.cam = self.device_manager.open_device_by_index(1)
+        self._offline = False
+        self.cam.data_stream[0].buffer_pool.set_buffer_number(self.buffer_num)
+
+        try:
+            self.cam.register_device_offline_callback(self.notify_offline)
+        except Exception as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: Offline notification not available: {err}')
+        logging.info(f'{self.__class__.__name__.upper()}: Camera opened')
+
+    def _release_device(self):
+        if self.cam is None:
+            return
+        try:
+            self.cam.unregister_device_offline_callback()
+            self.cam.close_device()
+        except Exception as err:
+            # the handle of an offline device can not be closed cleanly
+            logging.debug(f'{self.__class__.__name__.upper()}: Error while closing camera: {err}')
+        self.cam = None
+
+    def _reconnect(self):
+        with self._lock:
+            resume = self.acquiring
+            self.acquiring = False
+            self._connect()
+            self.configure(dict(self._settings))
+            if resume:
+                self.start_acquisition(self._acquisition_mode, self._on_capture)
+        logging.info(f'{self.__class__.__name__.upper()}: Camera reconnected')
+
+    def _reconnect_in_background(self):
+        try:
+            retry_call(self._reconnect, delay=1, backoff=2, max_delay=10, tries=self._RECONNECT_RETRIES, logger=None)
+        except Exception as err:
+            logging.error(f'{self.__class__.__name__.upper()}: Unable to reconnect camera: {err}')
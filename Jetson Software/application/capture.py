@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class CapturedFrame(NamedTuple):
+    """
+    Frame of the capture callback with the time it was delivered, the sorting loop may take it much later
+    """
+    image: object               # RawImage owning its buffer
+    received_time: float        # time.monotonic() when GxIAPI delivered the frame
+    capture_datetime: datetime
+
+    def release(self):
+        self.image.release()
+
+
+class FrameQueue:
+    """
+    Bounded hand-off between the camera capture callback (GxIAPI thread) and the sorting loop.
+    Frames are CapturedFrame or RawImage objects owning their buffer, the oldest frame is released and dropped
+    when the queue is full.
+    """
+
+    def __init__(self, maxsize: int = 8) -> None:
+        self.maxsize = maxsize
+        self.dropped: int = 0
+        self._frames = deque()
+        self._condition = threading.Condition()
+        self._waiters = []
+
+    def __len__(self):
+        with self._condition:
+            return len(self._frames)
+
+    def put(self, frame):
+        with self._condition:
+            if len(self._frames) >= self.maxsize:
+                self._frames.popleft().release()
+                self.dropped += 1
+                logging.warning(f'{self.__class__.__name__.upper()}: Queue full, dropped oldest frame '
+                                f'({self.dropped} dropped so far)')
+            self._frames.append(frame)
+            self._condition.notify()
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(self._wake, waiter)
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Blocking get, returns None when no frame arrived within timeout seconds
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: len(self._frames) > 0, timeout):
+                return None
+            return self._frames.popleft()
+
+    async def get_async(self, timeout: Optional[float] = None):
+        """
+        Awaitable get, returns None when no frame arrived within timeout seconds
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._condition:
+                if self._frames:
+                    return self._frames.popleft()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    return None
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def clear(self):
+        with self._condition:
+            while self._frames:
+                self._frames.popleft().release()
+
+    @staticmethod
+    def _wake(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
@@ -0,0 +1,209 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from random import randint
+from typing import NamedTuple
+
+import cv2
+import numpy
+
+from application.options import flag, parse_options
+
+FEMALE = 0
+MALE = 1
+
+
+class Classification(NamedTuple):
+    sex: int            # FEMALE or MALE
+    confidence: float   # probability of sex, 0.5 to 1
+
+
+class Classifier(ABC):
+    """
+    Sex classifier plugin. A classifier is created from its settings.xml options, load() reads the model and
+    runs a warm-up inference, so the first fly does not pay for the initialisation. Frames are 2-D uint8
+    images of any size, they are resized to the model input and scaled to (frame / 255 - mean) / std.
+    Backends implement _load and _infer.
+    """
+    name = None
+    OPTIONS = {'model': str, 'width': int, 'height': int, 'channels': int, 'mean': float, 'std': float,
+               'maleindex': int, 'softmax': flag}
+
+    def __init__(self, model: str = None, width: int = 224, height: int = 224, channels: int = 1,
+                 mean: float = 0.0, std: float = 1.0, maleindex: int = 1, softmax: bool = True) -> None:
+        """
+        :param model: path of the model file
+        :param channels: 3 for models trained on gray images stored as RGB
+        :param maleindex: output of the model holding the male score, the other one is female
+        :param softmax: apply softmax to the outputs, False when the model outputs probabilities
+        """
+        self.model = model
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.mean = mean
+        self.std = std
+        self.maleindex = maleindex
+        self.softmax = softmax
+        self.inferences: int = 0
+        self.last_seconds: float = 0.0
+        self.total_seconds: float = 0.0
+        self.max_seconds: float = 0.0
+
+    def load(self):
+        """
+        Load the model and run a warm-up inference
+        """
+        start = time.perf_counter()
+        self._load()
+        self._infer(numpy.zeros((1, self.channels, self.height, self.width), dtype=numpy.float32))
+        logging.info(f'{self.__class__.__name__.upper()}: Loaded {self.model} in '
+                     f'{time.perf_counter() - start:.2f} s')
+
+    def classify(self, frame) -> Classification:
+        return self.classify_batch([frame])[0]
+
+    def classify_batch(self, frames) -> list:
+        """
+        :param frames: 2-D uint8 frames
+        :return: a Classification per frame
+        """
+        start = time.perf_counter()
+        scores = self._infer(self.preprocess(frames))
+        if self.softmax:
+            scores = numpy.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+        male = scores[:, self.maleindex]
+        results = [Classification(MALE, float(p)) if p >= 0.5 else Classification(FEMALE, float(1 - p))
+                   for p in male]
+        self._count(time.perf_counter() - start)
+        return results
+
+    def preprocess(self, frames):
+        """
+        :return: float32 batch of shape (frames, channels, height, width)
+        """
+        batch = numpy.empty((len(frames), self.channels, self.height, self.width), dtype=numpy.float32)
+        for i, frame in enumerate(frames):
+            resized = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            batch[i, :] = (resized / 255.0 - self.mean) / self.std
+        return batch
+
+    def get_statistics(self) -> dict:
+        return {
+            'inferences': self.inferences,
+            'last_ms': self.last_seconds * 1000,
+            'mean_ms': self.total_seconds * 1000 / self.inferences if self.inferences else 0.0,
+            'max_ms': self.max_seconds * 1000,
+        }
+
+    def _count(self, seconds: float):
+        self.inferences += 1
+        self.last_seconds = seconds
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @abstractmethod
+    def _load(self):
+        """
+        Read the model
+        """
+
+    @abstractmethod
+    def _infer(self, batch):
+        """
+        :param batch: output of preprocess
+        :return: scores of shape (frames, 2)
+        """
+
+
+class RandomClassifier(Classifier):
+    """
+    Placeholder without a model, sorts the flies at random
+    """
+    name = 'random'
+
+    def load(self):
+        pass
+
+    def classify_batch(self, frames) -> list:
+        start = time.perf_counter()
+        results = [Classification(randint(FEMALE, MALE), 0.5) for _ in frames]
+        self._count(time.perf_counter() - start)
+        return results
+
+    def _load(self):
+        pass
+
+    def _infer(self, batch):
+        # no preference, classify_batch draws the sex
+        return numpy.zeros((len(batch), 2), dtype=numpy.float32)
+
+
+class OnnxClassifier(Classifier):
+    """
+    Runs an ONNX model with ONNX Runtime on the CPU
+    """
+    name = 'onnx'
+    OPTIONS = dict(Classifier.OPTIONS, threads=int)
+
+    def __init__(self, threads: int = 0, **options) -> None:
+        """
+        :param threads: threads of one inference, 0 lets ONNX Runtime decide
+        """
+        super().__init__(**options)
+        self.threads = threads
+        self._session = None
+        self._input = None
+        self._batch = None
+
+    def _load(self):
+        # optional, only needed for this backend
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = self.threads
+        self._session = onnxruntime.InferenceSession(self.model, session_options,
+                                                     providers=['CPUExecutionProvider'])
+        model_input = self._session.get_inputs()[0]
+        self._input = model_input.name
+        # models exported with a fixed batch size of 1 get the frames one by one
+        self._batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+    def _infer(self, batch):
+        if self._batch == 1 and len(batch) > 1:
+            return numpy.concatenate([self._infer(batch[i:i + 1]) for i in range(len(batch))])
+        return self._session.run(None, {self._input: batch})[0].reshape(len(batch), -1)
+
+
+class OpenCvDnnClassifier(Classifier):
+    """
+    Runs a model with the OpenCV DNN module, takes every format cv2.dnn.readNet reads (ONNX, TensorFlow, Caffe)
+    """
+    name = 'opencv'
+
+    def __init__(self, **options) -> None:
+        super().__init__(**options)
+        self._net = None
+
+    def _load(self):
+        self._net = cv2.dnn.readNet(self.model)
+        self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def _infer(self, batch):
+        self._net.setInput(batch)
+        return self._net.forward().reshape(len(batch), -1)
+
+
+CLASSIFIERS = {classifier.name: classifier for classifier in (RandomClassifier, OnnxClassifier, OpenCvDnnClassifier)}
+
+
+def create_classifier(name: str, options: dict = None) -> Classifier:
+    """
+    Create a classifier from its settings.xml backend name and {option tag: text} options
+    :raises ValueError for unknown backends or options
+    """
+    if name not in CLASSIFIERS:
+        raise ValueError(f'Unknown classifier {name}, expected one of {sorted(CLASSIFIERS)}')
+    classifier_class = CLASSIFIERS[name]
+    return classifier_class(**parse_options(classifier_class.OPTIONS, options, f'{name} classifier'))
@@ -0,0 +1,92 @@
+from typing import Optional
+
+import cv2
+import imutils
+
+from application.options import flag, parse_options
+from application.pyramid import ImagePyramid
+
+
+class FlyCropper:
+    """
+    Locates the fly in a frame and cuts out its padded bounding box, so only the part of the ROI that shows
+    the fly is written. The fly is found as the largest contour of the thresholded frame, searched on a
+    frame downscaled by scale to keep the valve decision fast.
+    """
+    OPTIONS = {'enabled': flag, 'padding': int, 'threshold': int, 'minarea': int, 'scale': int, 'darkfly': flag}
+
+    def __init__(self, enabled: bool = True, padding: int = 32, threshold: int = 0, minarea: int = 400,
+                 scale: int = 4, darkfly: bool = True) -> None:
+        """
+        :param padding: pixels added around the bounding box on every side
+        :param threshold: gray value separating fly and background, 0 to determine it per frame (Otsu)
+        :param minarea: smallest contour in full resolution pixels taken for a fly, smaller ones are dust
+        :param scale: downscaling factor of the frame the fly is searched in
+        :param darkfly: True when the fly is darker than the background
+        """
+        self.enabled = enabled
+        self.padding = padding
+        self.threshold = threshold
+        self.minarea = minarea
+        self.scale = max(scale, 1)
+        self.darkfly = darkfly
+
+    @classmethod
+    def from_options(cls, options: dict = None):
+        """
+        Create a cropper from the {option tag: text} options of the <crop> settings
+        :raises ValueError for unknown options
+        """
+        return cls(**parse_options(cls.OPTIONS, options, 'crop'))
+
+    def locate(self, mono8, pyramid: Optional[ImagePyramid] = None) -> Optional[tuple]:
+        """
+        :param mono8: 2-D uint8 frame the fly is searched in
+        :param pyramid: pyramid of mono8, the fly is searched in its level of the scale
+        :return: padded bounding box (x, y, width, height) inside the frame, None when no fly was found
+        """
+        height, width = mono8.shape
+        small, factor = pyramid.for_scale(self.scale) if pyramid is not None else (mono8, 1)
+        if factor < self.scale:
+            small = cv2.resize(small, (max(width // self.scale, 1), max(height // self.scale, 1)),
+                               interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        mode = cv2.THRESH_BINARY_INV if self.darkfly else cv2.THRESH_BINARY
+        if self.threshold <= 0:
+            mode |= cv2.THRESH_OTSU
+        _, mask = cv2.threshold(small, self.threshold, 255, mode)
+        contours = imutils.grab_contours(cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE))
+        if not contours:
+            return None
+        contour = max(contours, key=cv2.contourArea)
+        if cv2.contourArea(contour) * self.scale ** 2 < self.minarea:
+            return None
+
+        x, y, w, h = cv2.boundingRect(contour)
+        left = max(x * self.scale - self.padding, 0)
+        top = max(y * self.scale - self.padding, 0)
+        right = min((x + w) * self.scale + self.padding, width)
+        bottom = min((y + h) * self.scale + self.padding, height)
+        return left, top, right - left, bottom - top
+
+    def crop(self, pixels, mono8=None):
+        """
+        :param pixels: frame to cut the fly out of, uint8 or uint16
+        :param mono8: 8 bit version of pixels to search the fly in, defaults to pixels
+        :return: (fly, box), fly is a copy of the padded bounding box (x, y, width, height) of pixels.
+                 When no fly was found the whole frame is returned with box None.
+        """
+        box = self.locate(pixels if mono8 is None else mono8)
+        if box is None:
+            return pixels, None
+        # a copy, so the full frame is freed while the fly waits in the write queue
+        return self.cut(pixels, box).copy(), box
+
+    @staticmethod
+    def cut(pixels, box: tuple):
+        """
+        :param box: (x, y, width, height) as returned by locate
+        :return: view of the box in pixels
+        """
+        x, y, w, h = box
+        return pixels[y:y + h, x:x + w]
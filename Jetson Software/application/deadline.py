@@ -0,0 +1,123 @@
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+class FrameClock:
+    """
+    Converts camera frame timestamps to time.monotonic() seconds of this host. The offset between the two
+    clocks is the smallest (received - timestamp) of the last window frames: a frame can arrive late but not
+    before it was exposed, and the window follows the drift between the clocks. An exact pair of camera and
+    host time (calibrate) is kept apart from the window and counts until it is calibration_age seconds old.
+    Without a tick frequency the time a frame was received is taken as its exposure time.
+    """
+
+    def __init__(self, tick_frequency: int = 0, window: int = 64, calibration_age: float = 60.0) -> None:
+        """
+        :param tick_frequency: camera timestamp ticks per second, TimestampTickFrequency of the device
+        :param calibration_age: seconds a calibration is used, the clocks drift apart after it
+        """
+        self.tick_frequency = tick_frequency
+        self.calibration_age = calibration_age
+        self.calibrated_at: Optional[float] = None  # host time of the last calibration (attempt)
+        self._offsets = deque(maxlen=window)
+        self._calibration = None
+        self._last_ticks = None
+        self._lock = threading.Lock()
+
+    def calibrate(self, ticks: int, host_time: float):
+        """
+        Set an exact pair of camera and host time, e.g. of TimestampLatch
+        """
+        if self.tick_frequency > 0:
+            with self._lock:
+                self._calibration = host_time - ticks / self.tick_frequency
+                self.calibrated_at = host_time
+
+    def needs_calibration(self, now: Optional[float] = None) -> bool:
+        """
+        :return: True when there is no calibration or it is older than calibration_age
+        """
+        if self.tick_frequency <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        return self.calibrated_at is None or now - self.calibrated_at > self.calibration_age
+
+    def reset(self):
+        with self._lock:
+            self._offsets.clear()
+            self._calibration = None
+            self._last_ticks = None
+
+    def exposure_time(self, ticks: int, received: Optional[float] = None) -> float:
+        """
+        :param ticks: timestamp of the frame
+        :param received: time.monotonic() when the frame was delivered by the camera library, now by default
+        :return: time.monotonic() of the exposure
+        """
+        received = time.monotonic() if received is None else received
+        if self.tick_frequency <= 0:
+            return received
+        seconds = ticks / self.tick_frequency
+        with self._lock:
+            if self._last_ticks is not None and ticks < self._last_ticks:
+                # the camera clock was reset
+                self._offsets.clear()
+                self._calibration = None
+            self._last_ticks = ticks
+            self._offsets.append(received - seconds)
+            offset = min(self._offsets)
+            if self._calibration is not None and received - self.calibrated_at <= self.calibration_age:
+                offset = min(offset, self._calibration)
+            return seconds + offset
+
+
+class DeadlineScheduler:
+    """
+    Calls on_expired(key, expires) on its own thread once time.monotonic() passed expires of an added key.
+    Keys are not cancelled, on_expired has to check whether the key is still waiting.
+    """
+
+    def __init__(self, on_expired: Callable[[object, float], None]) -> None:
+        self.on_expired = on_expired
+        self._heap = []
+        self._sequence = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add(self, key, expires: float):
+        with self._condition:
+            if self._thread is None:
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name='deadline-scheduler', daemon=True)
+                self._thread.start()
+            # the sequence keeps keys that can not be compared out of the ordering
+            heapq.heappush(self._heap, (expires, self._sequence, key))
+            self._sequence += 1
+            self._condition.notify()
+
+    def close(self, timeout: Optional[float] = None):
+        with self._condition:
+            self._closing = True
+            self._heap = []
+            self._condition.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closing and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._closing:
+                    return
+                expires, _, key = heapq.heappop(self._heap)
+            try:
+                self.on_expired(key, expires)
+            except Exception as err:
+                logging.error(f'{self.__class__.__name__.upper()}: Deadline of {key} not handled: {err}')
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import numpy
+from PIL import Image
+
+from application.archive import DEFAULT_CHUNK_SIZE, INDEX_FILE, FrameArchive
+from application.options import flag, parse_options
+
+EXIF_IMAGE_DESCRIPTION = 0x010E
+ARCHIVE_DIRECTORY = 'archive-{}'
+
+
+class Encoder(ABC):
+    """
+    Writes a numpy image to a file. Encoders are plain picklable objects, so ImageWriter can run them
+    in a process pool unless parallel is False.
+    """
+    name = None
+    extension = None
+    supports_16bit = False
+    parallel = True
+    OPTIONS = {}
+
+    @abstractmethod
+    def encode(self, pixels, path: str, metadata: dict = None):
+        """
+        :param path: file name without extension
+        :param metadata: frame_id, timestamp, capture_time, sex, confidence, cage and for cropped frames
+                         their position x, y in the camera image, when known
+        """
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({vars(self)})'
+
+
+def _exif(metadata: dict = None) -> bytes:
+    """
+    metadata as JSON in the EXIF image description, JPEG, PNG and WebP files all take it
+    """
+    exif = Image.Exif()
+    if metadata:
+        exif[EXIF_IMAGE_DESCRIPTION] = json.dumps(metadata)
+    return exif.tobytes()
+
+
+class JpegEncoder(Encoder):
+    name = 'jpeg'
+    extension = '.jpg'
+    OPTIONS = {'quality': int, 'subsampling': str}
+
+    def __init__(self, quality: int = 90, subsampling: str = '4:2:0') -> None:
+        self.quality = quality
+        # only applies to color images
+        self.subsampling = subsampling
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        Image.fromarray(pixels).save(path + self.extension, quality=self.quality, subsampling=self.subsampling,
+                                     exif=_exif(metadata))
+
+
+class PngEncoder(Encoder):
+    name = 'png'
+    extension = '.png'
+    supports_16bit = True
+    OPTIONS = {'compresslevel': int}
+
+    def __init__(self, compresslevel: int = 3) -> None:
+        self.compresslevel = compresslevel
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        Image.fromarray(pixels).save(path + self.extension, compress_level=self.compresslevel,
+                                     exif=_exif(metadata))
+
+
+class WebpEncoder(Encoder):
+    name = 'webp'
+    extension = '.webp'
+    OPTIONS = {'lossless': flag, 'quality': int, 'method': int}
+
+    def __init__(self, lossless: bool = True, quality: int = 80, method: int = 4) -> None:
+        self.lossless = lossless
+        # with lossless=True quality is the compression effort
+        self.quality = quality
+        self.method = method
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        Image.fromarray(pixels).save(path + self.extension, lossless=self.lossless, quality=self.quality,
+                                     method=self.method, exif=_exif(metadata))
+
+
+class NpyEncoder(Encoder):
+    name = 'npy'
+    extension = '.npy'
+    supports_16bit = True
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        numpy.save(path + self.extension, pixels)
+
+
+class ArchiveEncoder(Encoder):
+    """
+    Appends raw frames with their metadata to a FrameArchive in a subdirectory of the directory of the path
+    instead of writing one file per frame. A new archive is started once the current one holds archivesize
+    bytes, so StorageManager can delete the oldest archives as a whole.
+    """
+    name = 'archive'
+    supports_16bit = True
+    # one archive is written sequentially by this process
+    parallel = False
+    OPTIONS = {'chunksize': int, 'archivesize': int}
+
+    def __init__(self, chunksize: int = DEFAULT_CHUNK_SIZE, archivesize: int = 4 * DEFAULT_CHUNK_SIZE) -> None:
+        self.chunksize = chunksize
+        self.archivesize = archivesize
+        self._archives = {}
+        self._lock = threading.Lock()
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        directory = os.path.dirname(path)
+        with self._lock:
+            archive = self._archives.get(directory)
+            # full, or deleted by the storage manager while no frames came in
+            if archive is not None and (archive.size >= self.archivesize or
+                                        not os.path.exists(os.path.join(archive.directory, INDEX_FILE))):
+                archive.close()
+                archive = None
+            if archive is None:
+                name = ARCHIVE_DIRECTORY.format(datetime.now().strftime('%Y-%m-%d_%Hh%Mm%Ss_%f'))
+                archive = FrameArchive(os.path.join(directory, name), chunk_size=self.chunksize)
+                self._archives[directory] = archive
+        archive.append(pixels, **(metadata or {}))
+
+    def close(self):
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+            self._archives = {}
+
+
+ENCODERS = {encoder.name: encoder for encoder in (JpegEncoder, PngEncoder, WebpEncoder, NpyEncoder, ArchiveEncoder)}
+
+
+def create_encoder(name: str, options: dict = None) -> Encoder:
+    """
+    Create an encoder from its settings.xml name and {option tag: text} options
+    :raises ValueError for unknown encoders or options
+    """
+    if name not in ENCODERS:
+        raise ValueError(f'Unknown encoder {name}, expected one of {sorted(ENCODERS)}')
+    encoder_class = ENCODERS[name]
+    return encoder_class(**parse_options(encoder_class.OPTIONS, options, f'{name} encoder'))
+
+
+def encode(encoder: Encoder, pixels, path: str, metadata: dict = None):
+    """
+    Module level entry point for process pools
+    """
+    encoder.encode(pixels, path, metadata)
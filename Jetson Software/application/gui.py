@@ -5,6 +5,7 @@ from tkinter import ttk, messagebox
 from PIL import Image, ImageTk, ImageOps
 import logging
 
+from application.application import PREVIEW_SIZE
 from application.serial import TooManyDevicesAvailableException, NoDeviceAvailableException, \
     UnableToOpenConnectionException, MessageTransportationException
 
@@ -88,6 +89,12 @@ class UI:
             self._cageFemaleCount = ttk.Label(master=self._cageFrame, textvariable=self.femaleLabel)
             self._cageFemaleLabel.grid(column=0, row=2)
             self._cageFemaleCount.grid(column=1, row=2)
+            self._cageUncertainLabel = ttk.Label(master=self._cageFrame, text='Uncertain: ')
+            self.uncertainLabel = tk.StringVar()
+            cage.uncertainLabel = self.uncertainLabel
+            self._cageUncertainCount = ttk.Label(master=self._cageFrame, textvariable=self.uncertainLabel)
+            self._cageUncertainLabel.grid(column=0, row=3)
+            self._cageUncertainCount.grid(column=1, row=3)
             self._cageFrame.grid(column=0, row=cage.ID)
 
         self._startButton = ttk.Button(master=self._sideFrame, text='Start Sorting',
@@ -156,7 +163,8 @@ class UI:
     def update_latest_image(self):
         logging.info('Inside update latest image')
         self.image = self._main_service.processedImg
-        self.image = self.image.resize((549, 367))
+        # the application hands over the pyramid level closest to this size
+        self.image = self.image.resize(PREVIEW_SIZE)
         self.processed_image = ImageTk.PhotoImage(self.image)
         self._imageLabel['image'] = self.processed_image
         self._imageLabel.pack(expand=True)
@@ -220,7 +228,7 @@ class UI:
     # Async / Service methods
     ######################################
     async def _async_acquire_images(self):
-        return self._main_service.acquire_images()
+        return await self._main_service.acquire_images_async()
 
     async def _async_start_sorting(self):
         return self.start_sorting()
\ No newline at end of file
@@ -0,0 +1,218 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+import numpy
+
+from application.classifier import Classification, create_classifier
+
+# a full 5496 x 3672 Mono8 frame
+DEFAULT_SLOT_SIZE = 5496 * 3672
+READY_TIMEOUT_SECONDS = 60.0
+
+
+def _work(backend: str, options: dict, shm_name: str, slot_size: int, tasks, results):
+    """
+    Worker process, classifies the frames in the shared memory slots named by the tasks
+    """
+    try:
+        classifier = create_classifier(backend, options)
+        classifier.load()
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except Exception as err:
+        results.put(('error', f'{err.__class__.__name__}: {err}'))
+        return
+    results.put(('ready', multiprocessing.current_process().pid))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            frame_id, slot, shape = task
+            frame = numpy.ndarray(shape, dtype=numpy.uint8, buffer=shm.buf, offset=slot * slot_size)
+            try:
+                classification = classifier.classify(frame)
+                results.put(('result', frame_id, slot, classification.sex, classification.confidence,
+                             classifier.last_seconds))
+            except Exception as err:
+                results.put(('failed', frame_id, slot, f'{err.__class__.__name__}: {err}'))
+            del frame
+    finally:
+        shm.close()
+
+
+class InferencePool:
+    """
+    Classifies frames in worker processes, so inference neither holds the GIL of the sorting loop nor of the UI.
+    Frames are copied into one of slots shared memory slots instead of being pickled, only the frame id, slot
+    and shape go through the task queue. Every worker loads the model once when the pool starts.
+    Results come back with their frame id, passed to on_result(frame_id, classification) on the result thread,
+    or, without on_result, collected by result(frame_id). The classification is None when inference failed.
+    """
+
+    def __init__(self, backend: str, options: dict = None, processes: int = 1, slots: int = 4,
+                 slot_size: int = DEFAULT_SLOT_SIZE,
+                 on_result: Optional[Callable[[int, Optional[Classification]], None]] = None) -> None:
+        """
+        :param backend: classifier backend as in create_classifier
+        :param slots: frames that can be classified or waiting at the same time
+        :param slot_size: bytes of the largest frame
+        """
+        self.backend = backend
+        self.options = dict(options or {})
+        self.processes = max(processes, 1)
+        self.slots = max(slots, self.processes)
+        self.slot_size = slot_size
+        self.on_result = on_result
+        self.submitted: int = 0
+        self.completed: int = 0
+        self.failed: int = 0
+        self.total_seconds: float = 0.0
+        self._shm = None
+        self._tasks = None
+        self._results = None
+        self._workers = []
+        self._thread = None
+        self._free_slots = queue.Queue()
+        self._finished = {}
+        self._condition = threading.Condition()
+
+    def start(self):
+        """
+        Start the workers and wait until every one of them loaded the model
+        :raises RuntimeError when a worker could not load the model
+        """
+        if self._workers:
+            return
+        # spawn instead of fork, the camera library runs threads of its own in this process
+        context = multiprocessing.get_context('spawn')
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        for index in range(self.processes):
+            worker = context.Process(target=_work, name=f'inference-{index}', daemon=True,
+                                     args=(self.backend, self.options, self._shm.name, self.slot_size,
+                                           self._tasks, self._results))
+            worker.start()
+            self._workers.append(worker)
+
+        errors = []
+        for _ in self._workers:
+            try:
+                message = self._results.get(timeout=READY_TIMEOUT_SECONDS)
+            except queue.Empty:
+                errors.append('worker did not start in time')
+                break
+            if message[0] == 'error':
+                errors.append(message[1])
+        if errors:
+            self.close()
+            raise RuntimeError(f'Unable to start the inference workers: {"; ".join(errors)}')
+
+        self._thread = threading.Thread(target=self._collect, name='inference-results', daemon=True)
+        self._thread.start()
+        logging.info(f'{self.__class__.__name__.upper()}: {self.processes} {self.backend} workers ready')
+
+    def submit(self, frame_id: int, frame, timeout: Optional[float] = None) -> bool:
+        """
+        Copy a 2-D uint8 frame into a free slot and queue it for classification
+        :param timeout: seconds to wait for a free slot
+        :return: False when no slot got free in time or the frame does not fit a slot
+        """
+        if frame.nbytes > self.slot_size:
+            logging.warning(f'{self.__class__.__name__.upper()}: Frame {frame_id} of {frame.nbytes} bytes does '
+                            f'not fit a slot of {self.slot_size} bytes')
+            return False
+        try:
+            slot = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        target = numpy.ndarray(frame.shape, dtype=numpy.uint8, buffer=self._shm.buf, offset=slot * self.slot_size)
+        target[:] = frame
+        del target
+        self._tasks.put((frame_id, slot, frame.shape))
+        with self._condition:
+            self.submitted += 1
+        return True
+
+    def result(self, frame_id: int, timeout: Optional[float] = None) -> Optional[Classification]:
+        """
+        Wait for the classification of a submitted frame, only without on_result
+        :return: None when inference failed or the timeout expired
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: frame_id in self._finished, timeout):
+                return None
+            return self._finished.pop(frame_id)
+
+    def classify(self, frame_id: int, frame, timeout: Optional[float] = None) -> Optional[Classification]:
+        if not self.submit(frame_id, frame, timeout):
+            return None
+        return self.result(frame_id, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Finish the queued frames and stop the workers
+        """
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        if self._thread is not None:
+            self._results.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        self._free_slots = queue.Queue()
+
+    def get_statistics(self) -> dict:
+        with self._condition:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': self.submitted - self.completed - self.failed,
+                'mean_ms': self.total_seconds * 1000 / self.completed if self.completed else 0.0,
+            }
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            if message[0] == 'result':
+                _, frame_id, slot, sex, confidence, seconds = message
+                classification = Classification(sex, confidence)
+                with self._condition:
+                    self.completed += 1
+                    self.total_seconds += seconds
+            elif message[0] == 'failed':
+                _, frame_id, slot, error = message
+                logging.error(f'{self.__class__.__name__.upper()}: Unable to classify frame {frame_id}: {error}')
+                classification = None
+                with self._condition:
+                    self.failed += 1
+            else:
+                continue
+            self._free_slots.put(slot)
+            if self.on_result is not None:
+                try:
+                    self.on_result(frame_id, classification)
+                except Exception as err:
+                    logging.error(f'{self.__class__.__name__.upper()}: Result of frame {frame_id} not handled: '
+                                  f'{err}')
+            else:
+                with self._condition:
+                    self._finished[frame_id] = classification
+                    self._condition.notify_all()
@@ -33,7 +33,7 @@ class notUI:
         threading.Thread(target=function).start()
 
     async def _async_acquire_images(self):
-        return self._main_service.acquire_images()
+        return await self._main_service.acquire_images_async()
 
     async def _async_start_sorting(self):
         return self.start_sorting()
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Options of the pluggable components, given in settings.xml as child tags of their block, e.g.
+
+    <crop><padding>32</padding><darkfly>true</darkfly></crop>
+
+A component declares OPTIONS, mapping every option tag it takes to the type its text is converted to.
+"""
+
+
+def flag(text: str) -> bool:
+    return text.lower() in ('1', 'true', 'yes')
+
+
+def parse_options(types: dict, options: dict = None, component: str = 'component') -> dict:
+    """
+    Convert {option tag: text} options to keyword arguments
+    :param types: OPTIONS of the component, {option tag: type}
+    :param component: name of the component in the error message
+    :raises ValueError for unknown options or texts that do not convert
+    """
+    kwargs = {}
+    for option, text in (options or {}).items():
+        if option not in types:
+            raise ValueError(f'Unknown {component} option {option}, expected one of {sorted(types)}')
+        kwargs[option] = types[option](text)
+    return kwargs
@@ -0,0 +1,70 @@
+import numpy
+
+from application.options import flag, parse_options
+
+
+class PresenceDetector:
+    """
+    Tells frames with a fly from frames of a trigger on noise. Every scale-th pixel of every scale-th row, or
+    the image pyramid level downscaled by scale when there is one, is compared with the background, a running
+    average of the empty frames so far, or with the median of the frame as long as there is no background.
+    The frame shows a fly when more than minfraction of the pixels differ by more than threshold gray values.
+    """
+    OPTIONS = {'enabled': flag, 'scale': int, 'threshold': int, 'minfraction': float, 'learningrate': float}
+
+    def __init__(self, enabled: bool = True, scale: int = 8, threshold: int = 30, minfraction: float = 0.001,
+                 learningrate: float = 0.05) -> None:
+        """
+        :param scale: step between the sampled rows and columns
+        :param threshold: gray value difference to the background of a pixel showing something
+        :param minfraction: fraction of the sampled pixels that has to differ for a fly
+        :param learningrate: weight of an empty frame in the background, 0 to compare with the median only
+        """
+        self.enabled = enabled
+        self.scale = max(scale, 1)
+        self.threshold = threshold
+        self.minfraction = minfraction
+        self.learningrate = learningrate
+        self.frames: int = 0
+        self.empty: int = 0
+        self._background = None
+
+    @classmethod
+    def from_options(cls, options: dict = None):
+        """
+        Create a detector from the {option tag: text} options of the <presence> settings
+        :raises ValueError for unknown options
+        """
+        return cls(**parse_options(cls.OPTIONS, options, 'presence'))
+
+    def is_present(self, mono8, pyramid=None) -> bool:
+        """
+        :param mono8: 2-D uint8 frame
+        :param pyramid: ImagePyramid of mono8, its level of the scale is compared instead of sampled pixels
+        :return: False when the frame is empty
+        """
+        small, factor = pyramid.for_scale(self.scale) if pyramid is not None else (mono8, 1)
+        step = max(self.scale // factor, 1)
+        small = small[::step, ::step].astype(numpy.float32)
+        if self._background is not None and self._background.shape != small.shape:
+            # the ROI changed
+            self._background = None
+        reference = self._background if self._background is not None else numpy.median(small)
+        changed = numpy.count_nonzero(numpy.abs(small - reference) > self.threshold)
+        present = bool(changed > self.minfraction * small.size)
+
+        self.frames += 1
+        if not present:
+            self.empty += 1
+            if self.learningrate > 0:
+                if self._background is None:
+                    self._background = small
+                else:
+                    self._background += self.learningrate * (small - self._background)
+        return present
+
+    def reset(self):
+        self._background = None
+
+    def get_statistics(self) -> dict:
+        return {'frames': self.frames, 'empty': self.empty}
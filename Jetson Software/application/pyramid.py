@@ -0,0 +1,63 @@
+from typing import Optional
+
+import cv2
+
+
+class ImagePyramid:
+    """
+    Resolution pyramid of a Mono8 frame, level n is the frame downscaled by 2^n with area averaging. Levels are
+    built on first use from the level above, so every consumer of a frame (preview, presence detector, crop,
+    classifier) takes the coarsest level it can work with and the full resolution frame is resampled once.
+    """
+
+    def __init__(self, base, max_level: int = 6) -> None:
+        """
+        :param base: 2-D uint8 frame, level 0
+        :param max_level: coarsest level, levels stop earlier when the frame gets smaller than 2 x 2
+        """
+        self._levels = [base]
+        self.max_level = max_level
+
+    @property
+    def base(self):
+        return self._levels[0]
+
+    def level(self, index: int):
+        """
+        :return: the frame downscaled by 2^index, the coarsest available level for a larger index
+        """
+        while len(self._levels) <= min(index, self.max_level):
+            previous = self._levels[-1]
+            height, width = previous.shape[0] // 2, previous.shape[1] // 2
+            if height < 1 or width < 1:
+                break
+            # an exact 2 x 2 mean, vectorized in OpenCV
+            self._levels.append(cv2.resize(previous, (width, height), interpolation=cv2.INTER_AREA))
+        return self._levels[min(index, len(self._levels) - 1)]
+
+    def for_scale(self, scale: int):
+        """
+        :return: (frame, factor), the coarsest level downscaled by a factor of at most scale
+        """
+        index = max(int(scale).bit_length() - 1, 0)
+        frame = self.level(index)
+        return frame, self.base.shape[1] // frame.shape[1]
+
+    def for_size(self, width: int, height: int):
+        """
+        :return: the coarsest level still at least width x height, the frame itself when it is smaller
+        """
+        return self.region(None, width, height)
+
+    def region(self, box: Optional[tuple], width: int, height: int):
+        """
+        :param box: (x, y, width, height) in the frame, None for the whole frame
+        :return: view of box in the coarsest level where it is still at least width x height
+        """
+        x, y, w, h = box if box is not None else (0, 0, self.base.shape[1], self.base.shape[0])
+        index = 0
+        while index < self.max_level and w >> (index + 1) >= width and h >> (index + 1) >= height:
+            index += 1
+        frame = self.level(index)
+        factor = self.base.shape[1] // frame.shape[1]
+        return frame[y // factor:-(-(y + h) // factor), x // factor:-(-(x + w) // factor)]
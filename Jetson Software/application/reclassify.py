@@ -0,0 +1,250 @@
+"""
+Re-classify archived fly images offline, e.g. to validate a new model against production captures:
+
+    python3 -m application.reclassify /media/entoq/41DB-88AA/Output --settings settings.xml --output results
+
+Walks the directory for image files written by the encoders and frame archives, classifies them with the
+classifier configured in settings.xml (or given on the command line) in batches on all cores, and writes
+images.csv with a row per image and runs.csv with the sex ratios per run.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+from collections import defaultdict
+from datetime import datetime
+
+import numpy
+from PIL import Image
+
+from application.archive import INDEX_FILE, FrameArchive
+from application.classifier import FEMALE, MALE, create_classifier
+from application.encoders import EXIF_IMAGE_DESCRIPTION
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.webp', '.npy')
+# Mono12, the bit depth is not stored with the images
+DEFAULT_BITS = 12
+IMAGE_COLUMNS = ['run', 'source', 'position', 'frame_id', 'capture_time', 'stored_sex', 'stored_confidence',
+                 'sex', 'confidence']
+RUN_COLUMNS = ['run', 'images', 'males', 'females', 'male_ratio', 'mean_confidence', 'stored_males',
+               'stored_females', 'agreement']
+
+# of the worker process
+_classifier = None
+_bits = DEFAULT_BITS
+_archives = {}
+
+
+def load_classifier_settings(file_name: str):
+    """
+    :return: (backend, {option tag: text}) of the <classifier> block of settings.xml
+    """
+    backend, options = 'random', {}
+    for child in ElementTree.parse(file_name).getroot():
+        if child.tag == 'classifier':
+            for childchild in child:
+                if childchild.tag == 'backend':
+                    backend = childchild.text
+                # the pool settings of the application
+                elif childchild.tag not in ('processes', 'slots'):
+                    options[childchild.tag] = childchild.text
+    return backend, options
+
+
+def find_images(root: str):
+    """
+    :return: [(source, position)], position is the index in a frame archive or None for an image file
+    """
+    items = []
+    for directory, subdirectories, names in os.walk(root):
+        subdirectories.sort()
+        if INDEX_FILE in names:
+            try:
+                with FrameArchive(directory, 'r') as archive:
+                    items.extend((directory, position) for position in range(len(archive)))
+            except (OSError, ValueError) as err:
+                logging.warning(f'RECLASSIFY: Skipping the archive in {directory}: {err}')
+        for name in sorted(names):
+            if name.endswith(IMAGE_EXTENSIONS):
+                items.append((os.path.join(directory, name), None))
+    return items
+
+
+def to_mono8(pixels, bits: int = DEFAULT_BITS):
+    """
+    Scale frames of more than 8 bit to 0 ~ 255 like RawImage.get_display_array
+    :param bits: bit depth of the camera pixel format, images are stored in 16 bit containers
+    """
+    if pixels.ndim == 3:
+        pixels = pixels[..., 0]
+    if pixels.dtype == numpy.uint8:
+        return pixels
+    return numpy.clip(pixels >> max(bits - 8, 0), 0, 255).astype(numpy.uint8)
+
+
+def load_image(source: str, position):
+    """
+    :return: (pixels, metadata stored with the image)
+    """
+    if position is not None:
+        archive = _archives.get(source)
+        if archive is None:
+            archive = _archives[source] = FrameArchive(source, 'r')
+        pixels, record = archive.read(position)
+        return numpy.array(pixels), {name: record[name].item() for name in record.dtype.names}
+    if source.endswith('.npy'):
+        return numpy.load(source), {}
+    with Image.open(source) as image:
+        description = image.getexif().get(EXIF_IMAGE_DESCRIPTION)
+        pixels = numpy.asarray(image)
+    try:
+        metadata = json.loads(description) if description else {}
+    except ValueError:
+        metadata = {}
+    return pixels, metadata
+
+
+def _init_worker(backend: str, options: dict, bits: int):
+    global _classifier, _bits
+    _bits = bits
+    _classifier = create_classifier(backend, options)
+    _classifier.load()
+
+
+def _classify_batch(batch):
+    """
+    Worker function
+    :param batch: [(source, position)]
+    :return: [(source, position, stored metadata, sex, confidence)], sex is None when the image could not be read
+    """
+    frames, loaded, results = [], [], []
+    for source, position in batch:
+        try:
+            pixels, metadata = load_image(source, position)
+        except Exception as err:
+            logging.warning(f'RECLASSIFY: Unable to read {source} {position}: {err}')
+            results.append((source, position, {}, None, None))
+            continue
+        frames.append(to_mono8(pixels, _bits))
+        loaded.append((source, position, metadata))
+    if frames:
+        for (source, position, metadata), classification in zip(loaded, _classifier.classify_batch(frames)):
+            results.append((source, position, metadata, classification.sex, classification.confidence))
+    return results
+
+
+def run_name(root: str, source: str, metadata: dict, group: str) -> str:
+    if group == 'day' and metadata.get('capture_time'):
+        return datetime.fromtimestamp(metadata['capture_time']).strftime('%Y-%m-%d')
+    directory = source if os.path.isdir(source) else os.path.dirname(source)
+    return os.path.relpath(directory, root)
+
+
+def reclassify(root: str, backend: str, options: dict, output: str, processes: int = 0, batch_size: int = 32,
+               group: str = 'directory', bits: int = DEFAULT_BITS) -> dict:
+    """
+    :param processes: worker processes, 0 for one per core
+    :param bits: bit depth of the pixel format of 16 bit images
+    :param group: 'directory' for a run per directory, 'day' for a run per capture day
+    :return: {run: aggregate row}
+    """
+    # fails here instead of in every worker when the model can not be loaded
+    create_classifier(backend, options).load()
+    items = find_images(root)
+    logging.info(f'RECLASSIFY: {len(items)} images in {root}')
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    os.makedirs(output, exist_ok=True)
+    runs = defaultdict(lambda: {'images': 0, MALE: 0, FEMALE: 0, 'confidence': 0.0,
+                                'stored': {MALE: 0, FEMALE: 0}, 'compared': 0, 'agreed': 0})
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes or os.cpu_count(), initializer=_init_worker, initargs=(backend, options, bits)) as pool, \
+            open(os.path.join(output, 'images.csv'), 'w', newline='') as image_file:
+        writer = csv.writer(image_file)
+        writer.writerow(IMAGE_COLUMNS)
+        done = 0
+        for results in pool.imap(_classify_batch, batches):
+            for source, position, metadata, sex, confidence in results:
+                if sex is None:
+                    continue
+                run = run_name(root, source, metadata, group)
+                stored_sex = metadata.get('sex', -1)
+                writer.writerow([run, source, '' if position is None else position, metadata.get('frame_id', ''),
+                                 metadata.get('capture_time', ''), stored_sex, metadata.get('confidence', ''),
+                                 sex, f'{confidence:.4f}'])
+                totals = runs[run]
+                totals['images'] += 1
+                totals[sex] += 1
+                totals['confidence'] += confidence
+                if stored_sex in (MALE, FEMALE):
+                    totals['stored'][stored_sex] += 1
+                    totals['compared'] += 1
+                    totals['agreed'] += stored_sex == sex
+            done += len(results)
+            logging.info(f'RECLASSIFY: {done}/{len(items)} images classified')
+
+    rows = {}
+    for run, totals in sorted(runs.items()):
+        rows[run] = {
+            'run': run,
+            'images': totals['images'],
+            'males': totals[MALE],
+            'females': totals[FEMALE],
+            'male_ratio': round(totals[MALE] / totals['images'], 4),
+            'mean_confidence': round(totals['confidence'] / totals['images'], 4),
+            'stored_males': totals['stored'][MALE],
+            'stored_females': totals['stored'][FEMALE],
+            'agreement': round(totals['agreed'] / totals['compared'], 4) if totals['compared'] else '',
+        }
+    with open(os.path.join(output, 'runs.csv'), 'w', newline='') as run_file:
+        writer = csv.DictWriter(run_file, RUN_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows.values())
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-classify archived fly images')
+    parser.add_argument('directory', help='save directory of the sorting machine')
+    parser.add_argument('--settings', default='settings.xml', help='settings.xml with the <classifier> block')
+    parser.add_argument('--backend', help='classifier backend instead of the one in the settings')
+    parser.add_argument('--model', help='model file instead of the one in the settings')
+    parser.add_argument('--option', action='append', default=[], metavar='TAG=VALUE',
+                        help='further classifier option, may be repeated')
+    parser.add_argument('--output', default='reclassified', help='directory for images.csv and runs.csv')
+    parser.add_argument('--processes', type=int, default=0, help='worker processes, 0 for one per core')
+    parser.add_argument('--batch', type=int, default=32, help='images per inference')
+    parser.add_argument('--group', choices=('directory', 'day'), default='directory',
+                        help='aggregate the sex ratios per directory or per capture day')
+    parser.add_argument('--bits', type=int, default=DEFAULT_BITS,
+                        help='bit depth of the camera pixel format of 16 bit images')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    backend, options = load_classifier_settings(args.settings) if os.path.exists(args.settings) else ('random', {})
+    if args.backend:
+        backend = args.backend
+    if args.model:
+        options['model'] = args.model
+    for option in args.option:
+        tag, _, value = option.partition('=')
+        options[tag] = value
+
+    try:
+        rows = reclassify(args.directory, backend, options, args.output, args.processes, args.batch,
+                          args.group, args.bits)
+    except Exception as err:
+        logging.critical(f'RECLASSIFY: {err}')
+        return 1
+    for row in rows.values():
+        print(f"{row['run']}: {row['images']} images, {row['males']} males, {row['females']} females, "
+              f"male ratio {row['male_ratio']}, agreement {row['agreement']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+from typing import Optional
+
+from application.archive import INDEX_FILE
+from application.encoders import ENCODERS
+from application.options import parse_options
+
+GIGABYTE = 1 << 30
+MEGABYTE = 1 << 20
+# a full drive asks for a scan on every frame, scans still start at most once per second
+MIN_SCAN_PERIOD = 1.0
+# files of other programs or copied to the drive by hand are never deleted
+IMAGE_EXTENSIONS = tuple(encoder.extension for encoder in ENCODERS.values() if encoder.extension)
+
+
+class StorageManager:
+    """
+    Keeps the save directory writable. A background thread measures the free space and walks the directory
+    every scan_interval seconds, deleting the oldest images while more than max_gb is stored or less than
+    reserve_mb is free. Only files the encoders write are deleted, a frame archive is deleted as a whole.
+    Between scans admit() decides from the last measurement, so the sorting loop never waits for the disk.
+    Frames that are not admitted are not written, the caller only logs their metadata.
+    """
+    OPTIONS = {'maxgb': float, 'reservemb': float, 'keepmales': float, 'keepfemales': float,
+               'scaninterval': float, 'minage': float}
+
+    def __init__(self, directory: str, maxgb: float = 0, reservemb: float = 500, keepmales: float = 1.0,
+                 keepfemales: float = 1.0, scaninterval: float = 30, minage: float = 60) -> None:
+        """
+        :param maxgb: newest gigabytes of images kept in directory, 0 for no limit
+        :param reservemb: megabytes kept free on the drive, images are deleted or not written below that
+        :param keepmales: fraction of the male flies that is saved
+        :param keepfemales: fraction of the female flies that is saved
+        :param scaninterval: seconds between scans of directory
+        :param minage: files modified less than minage seconds ago are never deleted, they may still be written
+        """
+        self.directory = directory
+        self.max_bytes = int(maxgb * GIGABYTE)
+        self.reserve_bytes = int(reservemb * MEGABYTE)
+        self.keep_fraction = {0: keepfemales, 1: keepmales}
+        self.scan_interval = scaninterval
+        self.min_age = minage
+        self.free: Optional[int] = None
+        self.used: int = 0
+        self.deleted: int = 0
+        self.skipped: int = 0
+        self.sampled_out: int = 0
+        self._full = False
+        self._lock = threading.Lock()
+        self._scan_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_options(cls, directory: str, options: dict = None):
+        """
+        Create a storage manager from the {option tag: text} options of the <storage> settings
+        :raises ValueError for unknown options
+        """
+        return cls(directory, **parse_options(cls.OPTIONS, options, 'storage'))
+
+    def start(self):
+        """
+        Create the directory, measure its free space and start the background scans
+        """
+        if self._thread is not None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: Unable to create {self.directory}: {err}')
+        # measured here, so the first frames are admitted without waiting for the first walk
+        free = self._free_space()
+        with self._lock:
+            self.free = free
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='storage-manager', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._scan_now.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def admit(self, size: int, metadata: dict = None) -> bool:
+        """
+        Decide without touching the disk whether an image of about size bytes is written. An admitted image
+        is subtracted from the free space until the next scan measures it.
+        :param metadata: decides the sampling by its sex
+        :return: False when the image is not to be written
+        """
+        sex = (metadata or {}).get('sex')
+        if random.random() >= self.keep_fraction.get(sex, 1.0):
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        with self._lock:
+            writable = self.free is not None and self.free - size >= self.reserve_bytes
+            if writable:
+                self.free -= size
+                self.used += size
+            else:
+                self.skipped += 1
+            warn = not writable and not self._full
+            self._full = not writable
+        if warn:
+            reason = 'No free space measured' if self.free is None else 'Not enough space'
+            logging.warning(f'{self.__class__.__name__.upper()}: {reason} in {self.directory}, '
+                            f'only metadata is logged until space is freed')
+        if not writable:
+            # delete old files now instead of at the next interval
+            self._scan_now.set()
+        return writable
+
+    def get_statistics(self) -> dict:
+        with self._lock:
+            return {
+                'free': self.free,
+                'used': self.used,
+                'deleted': self.deleted,
+                'skipped': self.skipped,
+                'sampled_out': self.sampled_out,
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as err:
+                logging.error(f'{self.__class__.__name__.upper()}: Unable to scan {self.directory}: {err}')
+            self._scan_now.wait(self.scan_interval)
+            self._scan_now.clear()
+            self._stop.wait(MIN_SCAN_PERIOD)
+
+    def scan(self):
+        """
+        Measure directory and apply the retention rules, called by the background thread
+        """
+        free = self._free_space()
+        if free is None:
+            with self._lock:
+                self.free = None
+            return
+        files = self._list_files()
+        used = sum(size for _, _, size in files)
+        deleted = 0
+        newest_allowed = time.time() - self.min_age
+        # oldest first
+        for modified, path, size in sorted(files):
+            if not (self.max_bytes and used > self.max_bytes) and free >= self.reserve_bytes:
+                break
+            if modified > newest_allowed:
+                break
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError as err:
+                logging.warning(f'{self.__class__.__name__.upper()}: Unable to delete {path}: {err}')
+                continue
+            used -= size
+            free += size
+            deleted += 1
+        if deleted:
+            logging.info(f'{self.__class__.__name__.upper()}: Deleted the {deleted} oldest images or archives')
+        with self._lock:
+            self.free = free
+            self.used = used
+            self.deleted += deleted
+
+    def _free_space(self) -> Optional[int]:
+        """
+        :return: free bytes on the drive of directory, or of its nearest existing parent while the writer has
+                 not created it yet, None when it can not be measured
+        """
+        path = os.path.abspath(self.directory)
+        while not os.path.exists(path) and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+        try:
+            return shutil.disk_usage(path).free
+        except OSError as err:
+            logging.warning(f'{self.__class__.__name__.upper()}: {self.directory} is not available: {err}')
+            return None
+
+    def _list_files(self):
+        """
+        :return: [(modification time, path, size)] of the deletable images and archive directories in directory,
+                 an archive is as new as its newest file
+        """
+        files = []
+        for root, subdirectories, names in os.walk(self.directory):
+            subdirectories.sort()
+            if INDEX_FILE in names and os.path.abspath(root) != os.path.abspath(self.directory):
+                # its records point into every chunk, so the archive goes as a whole
+                subdirectories[:] = []
+                archive = [self._stat(os.path.join(root, name)) for name in names]
+                archive = [entry for entry in archive if entry is not None]
+                if archive:
+                    files.append((max(modified for modified, _ in archive), root, sum(size for _, size in archive)))
+                continue
+            for name in names:
+                if not name.endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                entry = self._stat(path)
+                if entry is not None:
+                    files.append((entry[0], path, entry[1]))
+        return files
+
+    @staticmethod
+    def _stat(path: str):
+        """
+        :return: (modification time, size), None when the file is gone
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
@@ -0,0 +1,172 @@
+import logging
+import multiprocessing
+import pathlib
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from application.encoders import Encoder, JpegEncoder, PngEncoder, encode
+
+
+def _release(release: Optional[Callable[[], None]]):
+    if release is not None:
+        release()
+
+
+class ImageWriter:
+    """
+    Encodes and writes images on background threads so the sorting loop never waits for the disk.
+    Images are handed over through a bounded queue, when it is full the policy decides:
+        'drop_newest'   the submitted image is not written
+        'drop_oldest'   the oldest queued image is discarded to make room
+        'block'         submit waits up to block_timeout seconds for room, then drops the submitted image
+    With processes > 0 the encoding runs in a process pool of that size, so it is spread over the cores.
+    """
+    POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+    def __init__(self, maxsize: int = 16, policy: str = 'drop_newest', workers: int = 1,
+                 block_timeout: Optional[float] = 1.0, encoder: Optional[Encoder] = None, processes: int = 0) -> None:
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown writer policy {policy}, expected one of {self.POLICIES}')
+        self.maxsize = maxsize
+        self.policy = policy
+        # every process needs a thread feeding it
+        self.workers = max(workers, processes)
+        self.block_timeout = block_timeout
+        self.encoder = encoder if encoder is not None else JpegEncoder()
+        # images of more than 8 bit when the encoder only holds 8 bit
+        self.encoder_16bit = self.encoder if self.encoder.supports_16bit else PngEncoder()
+        self.processes = processes
+        self._executor = None
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.high_water_mark: int = 0
+        self._jobs = deque()
+        self._active = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closing = False
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of images waiting in the queue
+        """
+        with self._condition:
+            return len(self._jobs)
+
+    def submit(self, pixels, path: str, metadata: dict = None, release: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Queue a numpy image for writing to path, the encoder adds the file extension.
+        metadata (frame_id, timestamp, sex, cage) is stored by encoders that keep it, e.g. the archive.
+        The writer keeps a reference to pixels, so the array must not be reused by the caller.
+        :param release: called once pixels is written or dropped, e.g. to give a frame buffer back to its pool
+        :return: False when the image was dropped
+        """
+        with self._condition:
+            if self._closing:
+                _release(release)
+                return False
+            self._start_workers()
+            if len(self._jobs) >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    _release(self._jobs.popleft()[3])
+                    self._drop('dropped oldest image')
+                elif self.policy == 'block' and \
+                        self._condition.wait_for(lambda: len(self._jobs) < self.maxsize, self.block_timeout):
+                    pass
+                else:
+                    self._drop(f'dropped {path}')
+                    _release(release)
+                    return False
+            self._jobs.append((pixels, path, metadata, release))
+            self.high_water_mark = max(self.high_water_mark, len(self._jobs))
+            self._condition.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued image is written
+        :return: False when the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._jobs and self._active == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Write the remaining images and stop the worker threads
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.encoder.close()
+        if self.encoder_16bit is not self.encoder:
+            self.encoder_16bit.close()
+        with self._condition:
+            self._closing = False
+
+    def get_statistics(self) -> dict:
+        with self._condition:
+            return {
+                'depth': len(self._jobs),
+                'high_water_mark': self.high_water_mark,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+    def _start_workers(self):
+        if self.processes > 0 and self._executor is None:
+            # spawn instead of fork, the camera library runs threads of its own in this process
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'image-writer-{len(self._threads)}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _drop(self, message: str):
+        self.dropped += 1
+        logging.warning(f'{self.__class__.__name__.upper()}: Queue full, {message} '
+                        f'({self.dropped} dropped so far)')
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._jobs or self._closing)
+                if not self._jobs:
+                    return
+                pixels, path, metadata, release = self._jobs.popleft()
+                self._active += 1
+                self._condition.notify_all()
+            try:
+                self._write(pixels, path, metadata)
+                succeeded = True
+            except Exception as err:
+                logging.error(f'{self.__class__.__name__.upper()}: Unable to write {path}: {err}')
+                succeeded = False
+            finally:
+                _release(release)
+            with self._condition:
+                self._active -= 1
+                if succeeded:
+                    self.written += 1
+                else:
+                    self.failed += 1
+                self._condition.notify_all()
+
+    def _write(self, pixels, path: str, metadata: dict = None):
+        # every time, the drive may have been remounted or the directory deleted since the last image
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        encoder = self.encoder if pixels.dtype == 'uint8' else self.encoder_16bit
+        if self._executor is None or not encoder.parallel:
+            encoder.encode(pixels, path, metadata)
+        else:
+            self._executor.submit(encode, encoder, pixels, path, metadata).result()
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# -*-mode:python ; tab-width:4 -*- ex:set tabstop=4 shiftwidth=4 expandtab: -*-
+#
+# NumPy implementation of the DxImageProc functions used by gxipy. dxwrapper uses an instance of
+# NumpyDxImageProc instead of libdximageproc.so/DxImageProc.dll when the library is missing or when the
+# environment variable GXIPY_DX_BACKEND=numpy is set, dxwrapper.dx_set_backend switches at runtime.
+# The module level functions work on numpy arrays and write into out when given, so buffers can be reused.
+
+from ctypes import *
+
+import numpy
+
+# dxwrapper imports this module after the definitions below
+from gxipy.dxwrapper import DxStatus, DxPixelColorFilter
+
+
+# (row, column) of the red and the blue pixel in the 2x2 bayer tile
+BAYER_OFFSETS = {
+    DxPixelColorFilter.RG: ((0, 0), (1, 1)),
+    DxPixelColorFilter.GB: ((1, 0), (0, 1)),
+    DxPixelColorFilter.GR: ((0, 1), (1, 0)),
+    DxPixelColorFilter.BG: ((1, 1), (0, 0)),
+}
+
+LUT_LENGTH = 256
+
+
+def raw16_to_raw8(image, valid_bits, out=None):
+    """
+    :brief      Select 8 bits of a 16 bit image, values above the selected bits saturate
+    :param      image:          2-D numpy.uint16 array
+    :param      valid_bits:     lowest selected bit, See detail in DxValidBit
+    :param      out:            numpy.uint8 array with the shape of image
+    :return:    out
+    """
+    if out is None:
+        out = numpy.empty(image.shape, dtype=numpy.uint8)
+    selected = numpy.right_shift(image, valid_bits)
+    numpy.minimum(selected, 255, out=selected)
+    numpy.copyto(out, selected, casting='unsafe')
+    return out
+
+
+def bayer_to_rgb(image, color_filter, flip=False, out=None):
+    """
+    :brief      Bilinear demosaic of a raw8 image
+    :param      image:          2-D numpy.uint8 array, at least 2x2
+    :param      color_filter:   pixel color filter, See detail in DxPixelColorFilter, NONE copies the
+                                mono image into all three channels
+    :param      flip:           True: turn the image upside down
+    :param      out:            numpy.uint8 array of shape (height, width, 3)
+    :return:    out
+    """
+    height, width = image.shape
+    if out is None:
+        out = numpy.empty((height, width, 3), dtype=numpy.uint8)
+    target = out[::-1] if flip else out
+
+    if color_filter == DxPixelColorFilter.NONE:
+        target[...] = image[:, :, None]
+        return out
+
+    red, blue = BAYER_OFFSETS[color_filter]
+    # reflecting keeps the bayer pattern of the border pixels
+    padded = numpy.pad(image, 1, mode='reflect').astype(numpy.uint16)
+    for row in (0, 1):
+        for column in (0, 1):
+            def shifted(dy, dx):
+                return padded[1 + row + dy:1 + height + dy:2, 1 + column + dx:1 + width + dx:2]
+
+            center = shifted(0, 0)
+            cross = (shifted(-1, 0) + shifted(1, 0) + shifted(0, -1) + shifted(0, 1) + 2) >> 2
+            diagonal = (shifted(-1, -1) + shifted(-1, 1) + shifted(1, -1) + shifted(1, 1) + 2) >> 2
+            horizontal = (shifted(0, -1) + shifted(0, 1) + 1) >> 1
+            vertical = (shifted(-1, 0) + shifted(1, 0) + 1) >> 1
+
+            if (row, column) == red:
+                channels = (center, cross, diagonal)
+            elif (row, column) == blue:
+                channels = (diagonal, cross, center)
+            elif row == red[0]:
+                channels = (horizontal, center, vertical)
+            else:
+                channels = (vertical, center, horizontal)
+
+            tile = target[row::2, column::2]
+            for index, channel in enumerate(channels):
+                tile[:, :, index] = channel
+    return out
+
+
+def defective_pixel_correct(image, bit_num, out=None):
+    """
+    :brief      Replace pixels that are brighter or darker than all four neighbours of the same color by more
+                than 1/8 of the value range with the mean of these neighbours
+    :param      image:          2-D numpy.uint8 (bit_num 8) or numpy.uint16 array, at least 3x3
+    :param      bit_num:        actual bit number of the image, range 8 ~ 16
+    :param      out:            array with the shape and dtype of image, the image is corrected in place
+                                when out is not given
+    :return:    out
+    """
+    if out is None:
+        out = image
+    elif out is not image:
+        out[...] = image
+
+    height, width = image.shape
+    threshold = 1 << (bit_num - 3)
+    # same color neighbours are two pixels away in a bayer image
+    padded = numpy.pad(image, 2, mode='reflect').astype(numpy.int32)
+    center = padded[2:height + 2, 2:width + 2]
+    neighbours = (padded[0:height, 2:width + 2], padded[4:height + 4, 2:width + 2],
+                  padded[2:height + 2, 0:width], padded[2:height + 2, 4:width + 4])
+
+    low = numpy.minimum(numpy.minimum(neighbours[0], neighbours[1]), numpy.minimum(neighbours[2], neighbours[3]))
+    high = numpy.maximum(numpy.maximum(neighbours[0], neighbours[1]), numpy.maximum(neighbours[2], neighbours[3]))
+    defective = (center > high + threshold) | (center < low - threshold)
+    if defective.any():
+        mean = (neighbours[0] + neighbours[1] + neighbours[2] + neighbours[3] + 2) >> 2
+        out[defective] = mean[defective]
+    return out
+
+
+def gamma_lut(gamma):
+    """
+    :brief      8 bit gamma lookup table
+    :param      gamma:          gamma param, range(0.1 ~ 10)
+    :return:    numpy.uint8 array of LUT_LENGTH values
+    """
+    levels = numpy.arange(LUT_LENGTH) / (LUT_LENGTH - 1)
+    return numpy.round(numpy.power(levels, 1.0 / gamma) * 255).astype(numpy.uint8)
+
+
+def contrast_lut(contrast):
+    """
+    :brief      8 bit contrast lookup table, scales the distance to mid grey by (100 + contrast) / 100
+    :param      contrast:       contrast param, range(-50 ~ 100)
+    :return:    numpy.uint8 array of LUT_LENGTH values
+    """
+    levels = numpy.arange(LUT_LENGTH, dtype=numpy.float64)
+    scaled = (levels - 127.5) * (100 + contrast) / 100 + 127.5
+    return numpy.clip(numpy.round(scaled), 0, 255).astype(numpy.uint8)
+
+
+def apply_lut(image, lut, out=None):
+    """
+    :brief      Map every value of an 8 bit image through a lookup table
+    :param      image:          numpy.uint8 array
+    :param      lut:            numpy.uint8 array of LUT_LENGTH values
+    :param      out:            numpy.uint8 array with the shape of image, may be image itself
+    :return:    out
+    """
+    return numpy.take(lut, image, out=out)
+
+
+def saturation(image, factor, out=None):
+    """
+    :brief      Saturation adjustment (RGB24), 64 keeps the image unchanged and 0 turns it grey
+    :param      image:          numpy.uint8 array of shape (..., 3)
+    :param      factor:         saturation factor, range(0 ~ 128)
+    :param      out:            numpy.uint8 array with the shape of image, may be image itself
+    :return:    out
+    """
+    if out is None:
+        out = numpy.empty_like(image)
+    rgb = image.astype(numpy.float32)
+    grey = numpy.dot(rgb, numpy.array([0.299, 0.587, 0.114], dtype=numpy.float32))[..., None]
+    rgb -= grey
+    rgb *= factor / 64.0
+    rgb += grey
+    numpy.clip(rgb, 0, 255, out=rgb)
+    numpy.copyto(out, rgb, casting='unsafe')
+    return out
+
+
+def sharpen(image, factor, out=None):
+    """
+    :brief      Sharpen adjustment (RGB24), adds factor times the difference to the 3x3 mean
+    :param      image:          numpy.uint8 array of shape (height, width, 3)
+    :param      factor:         sharpen factor, range(0.1 ~ 5.0)
+    :param      out:            numpy.uint8 array with the shape of image, may be image itself
+    :return:    out
+    """
+    if out is None:
+        out = numpy.empty_like(image)
+    height, width = image.shape[:2]
+    padded = numpy.pad(image, ((1, 1), (1, 1), (0, 0)), mode='edge').astype(numpy.float32)
+    mean = numpy.zeros(image.shape, dtype=numpy.float32)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            mean += padded[dy:dy + height, dx:dx + width]
+    mean /= 9
+
+    rgb = image.astype(numpy.float32)
+    rgb += (rgb - mean) * factor
+    numpy.clip(rgb, 0, 255, out=rgb)
+    numpy.copyto(out, rgb, casting='unsafe')
+    return out
+
+
+def _value(arg):
+    """
+    :brief      value of an argument passed as a ctypes simple type or as a python value
+    """
+    return arg.value if hasattr(arg, 'value') else arg
+
+
+def _view(address, shape, dtype):
+    """
+    :brief      numpy array over the memory at address
+    """
+    size = int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize
+    return numpy.frombuffer((c_ubyte * size).from_address(_value(address)), dtype=dtype).reshape(shape)
+
+
+def _lut(lut):
+    """
+    :brief      numpy array of a lookup table passed as ctypes array, None stays None
+    """
+    return None if lut is None else numpy.frombuffer(lut, dtype=numpy.uint8, count=LUT_LENGTH)
+
+
+class NumpyDxImageProc:
+    """
+    Stand-in for the DxImageProc library, the methods take the same ctypes arguments as the C functions
+    """
+    def DxGetGammatLut(self, gamma_param, lut, lut_length):
+        return self.__get_lut(gamma_lut(_value(gamma_param)), lut, lut_length)
+
+    def DxGetContrastLut(self, contrast_param, lut, lut_length):
+        return self.__get_lut(contrast_lut(_value(contrast_param)), lut, lut_length)
+
+    def DxRaw8toRGB24(self, input_address, output_address, width, height, convert_type, bayer_type, flip):
+        width, height = _value(width), _value(height)
+        if not _value(input_address) or not _value(output_address) or width < 2 or height < 2:
+            return DxStatus.PARAMETER_INVALID
+        # every convert type is interpolated bilinearly
+        bayer_to_rgb(_view(input_address, (height, width), numpy.uint8), _value(bayer_type), _value(flip),
+                     out=_view(output_address, (height, width, 3), numpy.uint8))
+        return DxStatus.OK
+
+    def DxRaw16toRaw8(self, input_address, output_address, width, height, valid_bits):
+        width, height = _value(width), _value(height)
+        if not _value(input_address) or not _value(output_address):
+            return DxStatus.PARAMETER_INVALID
+        raw16_to_raw8(_view(input_address, (height, width), numpy.uint16), _value(valid_bits),
+                      out=_view(output_address, (height, width), numpy.uint8))
+        return DxStatus.OK
+
+    def DxImageImprovment(self, input_address, output_address, width, height,
+                          color_correction_param, contrast_lut, gamma_lut):
+        width, height = _value(width), _value(height)
+        if not _value(input_address) or not _value(output_address):
+            return DxStatus.PARAMETER_INVALID
+        # the color correction parameter is only interpreted by the vendor library
+        if _value(color_correction_param) != 0:
+            return DxStatus.STATUS_NOT_SUPPORTED
+
+        out = _view(output_address, (height, width, 3), numpy.uint8)
+        if _value(output_address) != _value(input_address):
+            out[...] = _view(input_address, (height, width, 3), numpy.uint8)
+        for lut in (_lut(contrast_lut), _lut(gamma_lut)):
+            if lut is not None:
+                apply_lut(out, lut, out=out)
+        return DxStatus.OK
+
+    def DxSaturation(self, input_address, output_address, image_size, factor):
+        image_size = _value(image_size)
+        if not _value(input_address) or not _value(output_address):
+            return DxStatus.PARAMETER_INVALID
+        saturation(_view(input_address, (image_size, 3), numpy.uint8), _value(factor),
+                   out=_view(output_address, (image_size, 3), numpy.uint8))
+        return DxStatus.OK
+
+    def DxAutoRawDefectivePixelCorrect(self, inout_address, width, height, bit_num):
+        width, height, bit_num = _value(width), _value(height), _value(bit_num)
+        if not _value(inout_address) or width < 3 or height < 3:
+            return DxStatus.PARAMETER_INVALID
+        if bit_num < 8 or bit_num > 16:
+            return DxStatus.PARAMETER_OUT_OF_BOUND
+        dtype = numpy.uint8 if bit_num == 8 else numpy.uint16
+        defective_pixel_correct(_view(inout_address, (height, width), dtype), bit_num)
+        return DxStatus.OK
+
+    def DxSharpen24B(self, input_address, output_address, width, height, factor):
+        width, height = _value(width), _value(height)
+        if not _value(input_address) or not _value(output_address):
+            return DxStatus.PARAMETER_INVALID
+        sharpen(_view(input_address, (height, width, 3), numpy.uint8), _value(factor),
+                out=_view(output_address, (height, width, 3), numpy.uint8))
+        return DxStatus.OK
+
+    @staticmethod
+    def __get_lut(values, lut, lut_length):
+        """
+        :brief      fill a lookup table like DxGetGammatLut, lut is None when only the length is queried
+        """
+        lut_length._obj.value = LUT_LENGTH
+        if lut is not None:
+            memmove(lut._obj, values.ctypes.data, LUT_LENGTH)
+        return DxStatus.OK
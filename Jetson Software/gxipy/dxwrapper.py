@@ -7,6 +7,9 @@ from ctypes import *
 import sys
 import os
 
+# GXIPY_DX_BACKEND=numpy selects the NumPy implementation in gxipy.dxnumpy instead of the vendor library
+NUMPY_BACKEND = os.environ.get('GXIPY_DX_BACKEND', '').lower() == 'numpy'
+
 if sys.platform == 'linux2' or sys.platform == 'linux':
     if os.path.exists('/usr/lib/libdximageproc.so') : 
         filepath = '/usr/lib/libdximageproc.so'
@@ -15,7 +18,8 @@ if sys.platform == 'linux2' or sys.platform == 'linux':
     try:
         dll = CDLL(filepath)
     except OSError:
-        print('Cannot find libdximageproc.so or libgxiapi.so.')
+        dll = None
+        print('Cannot find libdximageproc.so or libgxiapi.so, using the NumPy implementation.')
 else:
     try:
         if (sys.version_info.major == 3 and sys.version_info.minor >= 8) or (sys.version_info.major > 3):
@@ -23,7 +27,8 @@ else:
         else:
             dll = WinDLL('DxImageProc.dll')
     except OSError:
-        print('Cannot find DxImageProc.dll.')
+        dll = None
+        print('Cannot find DxImageProc.dll, using the NumPy implementation.')
 
 
 # status  definition
@@ -75,6 +80,14 @@ class DxActualBits:
         pass
 
 
+# the NumPy implementation uses the definitions above, so it is created once they are defined
+from gxipy.dxnumpy import NumpyDxImageProc
+native_dll = dll
+numpy_dll = NumpyDxImageProc()
+if dll is None or NUMPY_BACKEND:
+    dll = numpy_dll
+
+
 '''
 # mono8 image process structure
 class MonoImgProcess(Structure):
@@ -380,3 +393,28 @@ if hasattr(dll, "DxSharpen24B"):
 
         status = dll.DxSharpen24B(input_address_p, output_address_p, width_c, height_c, factor_c)
         return status
+
+
+def dx_set_backend(backend):
+    """
+    :brief      Select the implementation used by the dx_* functions
+    :param      backend:                'native' for the vendor library, 'numpy' for gxipy.dxnumpy
+    :return:    status:                 DxStatus.OK, DxStatus.STATUS_NOT_SUPPORTED when the vendor library
+                                        is not loaded or the backend is unknown
+    """
+    global dll
+    if backend == 'numpy':
+        dll = numpy_dll
+    elif backend == 'native' and native_dll is not None:
+        dll = native_dll
+    else:
+        return DxStatus.STATUS_NOT_SUPPORTED
+    return DxStatus.OK
+
+
+def dx_get_backend():
+    """
+    :brief      Implementation used by the dx_* functions
+    :return:    'native' or 'numpy'
+    """
+    return 'numpy' if dll is numpy_dll else 'native'
@@ -3,6 +3,8 @@
 # -*-mode:python ; tab-width:4 -*- ex:set tabstop=4 shiftwidth=4 expandtab: -*-
 
 import numpy
+import threading
+import traceback
 from gxipy.gxwrapper import *
 from gxipy.dxwrapper import *
 from gxipy.gxidef import *
@@ -14,6 +16,17 @@ if sys.version_info.major > 2:
     INT_TYPE = int
 else:
     INT_TYPE = (int, long)
+
+# values accepted by RawImage.convert, built once instead of on every call
+CONVERT_TYPE_DICT = dict((name, getattr(DxBayerConvertType, name))
+                         for name in dir(DxBayerConvertType) if not name.startswith('__'))
+VALID_BITS_DICT = dict((name, getattr(DxValidBit, name))
+                       for name in dir(DxValidBit) if not name.startswith('__'))
+CONVERT_TYPE_VALUES = frozenset(CONVERT_TYPE_DICT.values())
+VALID_BITS_VALUES = frozenset(VALID_BITS_DICT.values())
+
+# RawImage.convert keeps scratch buffers for this many image sizes
+CONVERT_SCRATCH_SIZES = 4
     
 
 class DeviceManager(object):
@@ -401,15 +414,161 @@ class DeviceManager(object):
         return GEVDevice(handle)
 
 
+# Features whose value changes the range or access mode of other features,
+# the cached metadata of the listed features is dropped after a write. None drops the whole cache.
+FEATURE_DEPENDENCIES = {
+    GxFeatureID.INT_WIDTH: (GxFeatureID.INT_OFFSET_X, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.INT_HEIGHT: (GxFeatureID.INT_OFFSET_Y, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.INT_OFFSET_X: (GxFeatureID.INT_WIDTH,),
+    GxFeatureID.INT_OFFSET_Y: (GxFeatureID.INT_HEIGHT,),
+    GxFeatureID.INT_BINNING_HORIZONTAL: (GxFeatureID.INT_WIDTH, GxFeatureID.INT_OFFSET_X,
+                                         GxFeatureID.INT_WIDTH_MAX, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.INT_BINNING_VERTICAL: (GxFeatureID.INT_HEIGHT, GxFeatureID.INT_OFFSET_Y,
+                                       GxFeatureID.INT_HEIGHT_MAX, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.INT_DECIMATION_HORIZONTAL: (GxFeatureID.INT_WIDTH, GxFeatureID.INT_OFFSET_X,
+                                            GxFeatureID.INT_WIDTH_MAX, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.INT_DECIMATION_VERTICAL: (GxFeatureID.INT_HEIGHT, GxFeatureID.INT_OFFSET_Y,
+                                          GxFeatureID.INT_HEIGHT_MAX, GxFeatureID.INT_PAYLOAD_SIZE),
+    GxFeatureID.ENUM_EXPOSURE_AUTO: (GxFeatureID.FLOAT_EXPOSURE_TIME,),
+    GxFeatureID.FLOAT_EXPOSURE_TIME: (GxFeatureID.FLOAT_ACQUISITION_FRAME_RATE,),
+    GxFeatureID.ENUM_ACQUISITION_FRAME_RATE_MODE: (GxFeatureID.FLOAT_ACQUISITION_FRAME_RATE,),
+    GxFeatureID.ENUM_GAIN_AUTO: (GxFeatureID.FLOAT_GAIN,),
+    GxFeatureID.ENUM_BLACK_LEVEL_AUTO: (GxFeatureID.FLOAT_BLACK_LEVEL,),
+    GxFeatureID.ENUM_BALANCE_WHITE_AUTO: (GxFeatureID.FLOAT_BALANCE_RATIO,),
+    GxFeatureID.ENUM_TRIGGER_MODE: (GxFeatureID.COMMAND_TRIGGER_SOFTWARE,),
+    GxFeatureID.ENUM_PIXEL_FORMAT: None,
+    GxFeatureID.ENUM_PIXEL_SIZE: None,
+    GxFeatureID.ENUM_REGION_MODE: None,
+    GxFeatureID.COMMAND_USER_SET_LOAD: None,
+    GxFeatureID.COMMAND_DEVICE_RESET: None,
+    # selectors switch which instance the selected features refer to
+    GxFeatureID.ENUM_TEST_PATTERN_GENERATOR_SELECTOR: None,
+    GxFeatureID.ENUM_REGION_SELECTOR: None,
+    GxFeatureID.ENUM_TRIGGER_SELECTOR: None,
+    GxFeatureID.ENUM_ACQUISITION_STATUS_SELECTOR: None,
+    GxFeatureID.ENUM_USER_OUTPUT_SELECTOR: None,
+    GxFeatureID.ENUM_LINE_SELECTOR: None,
+    GxFeatureID.ENUM_GAIN_SELECTOR: None,
+    GxFeatureID.ENUM_BLACK_LEVEL_SELECTOR: None,
+    GxFeatureID.ENUM_BALANCE_RATIO_SELECTOR: None,
+    GxFeatureID.ENUM_USER_SET_SELECTOR: None,
+    GxFeatureID.ENUM_LUT_SELECTOR: None,
+    GxFeatureID.ENUM_COLOR_TRANSFORMATION_VALUE_SELECTOR: None,
+    GxFeatureID.ENUM_CHUNK_SELECTOR: None,
+    GxFeatureID.ENUM_TIMER_SELECTOR: None,
+    GxFeatureID.ENUM_COUNTER_SELECTOR: None,
+}
+
+# Features the camera changes itself while their Auto feature(ExposureAuto, GainAuto, ...) is not Off,
+# the last written value is not kept for them, Device.apply compares with the value read from the device
+AUTO_CONTROLLED_FEATURES = (GxFeatureID.FLOAT_EXPOSURE_TIME, GxFeatureID.FLOAT_GAIN,
+                            GxFeatureID.FLOAT_BLACK_LEVEL, GxFeatureID.FLOAT_BALANCE_RATIO)
+
+
+class FeatureMetadataCache:
+    """
+    Per device cache of feature metadata (implemented/readable/writable flags and ranges),
+    so a get or set does not query the device for the metadata every time.
+    The last value written to a feature is kept as well, so Device.apply can skip unchanged writes,
+    except for AUTO_CONTROLLED_FEATURES. Feature.get always reads the value from the device.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.__entries = {}
+
+    def lookup(self, feature, key, loader):
+        """
+        :brief      Return the cached metadata, loader is called on a miss
+        :param      feature:    The feature code ID
+        :param      key:        metadata name, e.g. "writable" or "range"
+        :param      loader:     function returning the metadata from the device
+        :return:    metadata
+        """
+        if not self.enabled:
+            return loader()
+
+        entry = self.__entries.setdefault(feature, {})
+        if key not in entry:
+            entry[key] = loader()
+        return entry[key]
+
+    def store(self, feature, key, value):
+        """
+        :brief      Put metadata into the cache
+        :param      feature:    The feature code ID
+        :param      key:        metadata name
+        :param      value:      metadata
+        :return:    None
+        """
+        if self.enabled:
+            self.__entries.setdefault(feature, {})[key] = value
+
+    def invalidate(self, feature=None):
+        """
+        :brief      Drop the metadata of one feature, or of all features when feature is None
+        :param      feature:    The feature code ID
+        :return:    None
+        """
+        if feature is None:
+            self.__entries.clear()
+        else:
+            self.__entries.pop(feature, None)
+
+    def invalidate_access(self):
+        """
+        :brief      Drop the cached readable/writable flags, e.g. after acquisition start/stop
+                    changed which features are locked
+        :return:    None
+        """
+        for entry in self.__entries.values():
+            entry.pop("readable", None)
+            entry.pop("writable", None)
+
+    def feature_changed(self, feature):
+        """
+        :brief      Drop the metadata that depends on the value of feature, see FEATURE_DEPENDENCIES
+        :param      feature:    The feature code ID
+        :return:    None
+        """
+        if feature not in FEATURE_DEPENDENCIES:
+            return
+
+        dependents = FEATURE_DEPENDENCIES[feature]
+        if dependents is None:
+            self.invalidate()
+            return
+
+        for dependent in dependents:
+            self.invalidate(dependent)
+
+
+# Features Device.apply writes before all others, they change the ranges of the geometry features
+APPLY_ORDER_FIRST = ("PixelFormat", "PixelSize", "RegionMode", "BinningHorizontal", "BinningVertical",
+                     "DecimationHorizontal", "DecimationVertical")
+# Offset and size feature of each axis, Device.apply orders them so offset + size stays in range
+APPLY_ORDER_AXES = (("OffsetX", "Width"), ("OffsetY", "Height"))
+
+
 class Feature:
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param  handle:      The handle of the device
         :param  feature:     The feature code ID
+        :param  cache:       FeatureMetadataCache of the device, None to query the device every time
         """
         self.__handle = handle
         self.__feature = feature
-        self.feature_name = self.get_name()
+        self.__cache = cache
+        self.__feature_name = None
+
+    @property
+    def feature_name(self):
+        """
+        brief:  Feature name, looked up from the device on first use
+        """
+        if self.__feature_name is None:
+            self.__feature_name = self.get_name()
+        return self.__feature_name
 
     def get_name(self):
         """
@@ -428,6 +587,9 @@ class Feature:
         brief:  Determining whether the feature is implemented
         return: is_implemented
         """
+        return self._metadata("implemented", self.__query_implemented)
+
+    def __query_implemented(self):
         status, is_implemented = gx_is_implemented(self.__handle, self.__feature)
         if status == GxStatusList.SUCCESS:
             return is_implemented
@@ -445,6 +607,9 @@ class Feature:
         if not implemented:
             return False
 
+        return self._metadata("readable", self.__query_readable)
+
+    def __query_readable(self):
         status, is_readable = gx_is_readable(self.__handle, self.__feature)
         StatusProcessor.process(status, 'Feature', 'is_readable')
         return is_readable
@@ -458,18 +623,60 @@ class Feature:
         if not implemented:
             return False
 
+        return self._metadata("writable", self.__query_writable)
+
+    def __query_writable(self):
         status, is_writable = gx_is_writable(self.__handle, self.__feature)
         StatusProcessor.process(status, 'Feature', 'is_writable')
         return is_writable
 
+    def _metadata(self, key, loader):
+        """
+        brief:  Metadata of the feature through the device cache
+        param:  key:        metadata name
+        param:  loader:     function querying the device
+        return: metadata
+        """
+        if self.__cache is None:
+            return loader()
+        return self.__cache.lookup(self.__feature, key, loader)
+
+    def _value_written(self, status, value=None):
+        """
+        brief:  Drop cached metadata invalidated by writing this feature and remember the written value
+        param:  status:     status of the write, a failed write also drops the metadata of this feature
+        param:  value:      the written value
+        """
+        if self.__cache is None:
+            return
+        if status != GxStatusList.SUCCESS:
+            self.__cache.invalidate(self.__feature)
+        self.__cache.feature_changed(self.__feature)
+        if status == GxStatusList.SUCCESS and value is not None and self.__feature not in AUTO_CONTROLLED_FEATURES:
+            self.__cache.store(self.__feature, "value", value)
+
+    def _current_value(self):
+        """
+        brief:  Last value written to the feature, read from the device when it is not cached
+                or the camera may have changed it(AUTO_CONTROLLED_FEATURES)
+        return: value
+        """
+        if self.__feature in AUTO_CONTROLLED_FEATURES:
+            return self._read_value()
+        return self._metadata("value", self._read_value)
+
+    def _read_value(self):
+        return self.get()
+
 
 class IntFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param  handle:      The handle of the device
         :param  feature:     The feature code ID
+        :param  cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -496,6 +703,9 @@ class IntFeature(Feature):
             print("%s.get_range is not support" % self.feature_name)
             return None
 
+        return dict(self._metadata("range", self.__query_range))
+
+    def __query_range(self):
         status, int_range = gx_get_int_range(self.__handle, self.__feature)
         StatusProcessor.process(status, 'IntFeature', 'get_range')
         return self.__range_dict(int_range)
@@ -514,6 +724,24 @@ class IntFeature(Feature):
         StatusProcessor.process(status, 'IntFeature', 'get')
         return int_value
 
+    def check_value(self, int_value):
+        """
+        :brief      Check whether int_value can be set, without writing it
+        :param      int_value
+        :return:    None when the value can be set, otherwise the reason
+        """
+        if not isinstance(int_value, INT_TYPE):
+            return "Expected int_value type is int, not %s" % type(int_value)
+
+        if not self.is_writable():
+            return "%s is not writeable" % self.feature_name
+
+        int_range = self.get_range()
+        if not range_check(int_value, int_range["min"], int_range["max"], int_range["inc"]):
+            return "int_value out of bounds, %s.range=[%d, %d, %d]" % \
+                   (self.feature_name, int_range["min"], int_range["max"], int_range["inc"])
+        return None
+
     def set(self, int_value):
         """
         :brief      Setting integer value
@@ -538,16 +766,18 @@ class IntFeature(Feature):
             return
 
         status = gx_set_int(self.__handle, self.__feature, int_value)
+        self._value_written(status, int_value)
         StatusProcessor.process(status, 'IntFeature', 'set')
 
 
 class FloatFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param      handle:      The handle of the device
         :param      feature:     The feature code ID
+        :param      cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -576,6 +806,9 @@ class FloatFeature(Feature):
             print("%s.get_range is not support" % self.feature_name)
             return None
 
+        return dict(self._metadata("range", self.__query_range))
+
+    def __query_range(self):
         status, float_range = gx_get_float_range(self.__handle, self.__feature)
         StatusProcessor.process(status, 'FloatFeature', 'get_range')
         return self.__range_dict(float_range)
@@ -594,6 +827,24 @@ class FloatFeature(Feature):
         StatusProcessor.process(status, 'FloatFeature', 'get')
         return float_value
 
+    def check_value(self, float_value):
+        """
+        :brief      Check whether float_value can be set, without writing it
+        :param      float_value
+        :return:    None when the value can be set, otherwise the reason
+        """
+        if not isinstance(float_value, (INT_TYPE, float)):
+            return "Expected float_value type is float, not %s" % type(float_value)
+
+        if not self.is_writable():
+            return "%s is not writeable" % self.feature_name
+
+        float_range = self.get_range()
+        if not range_check(float_value, float_range["min"], float_range["max"]):
+            return "float_value out of bounds, %s.range=[%f, %f]" % \
+                   (self.feature_name, float_range["min"], float_range["max"])
+        return None
+
     def set(self, float_value):
         """
         :brief      Setting float value
@@ -617,16 +868,18 @@ class FloatFeature(Feature):
             return
 
         status = gx_set_float(self.__handle, self.__feature, float_value)
+        self._value_written(status, float_value)
         StatusProcessor.process(status, 'FloatFeature', 'set')
 
 
 class EnumFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param handle:      The handle of the device
         :param feature:     The feature code ID
+        :param cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -640,6 +893,9 @@ class EnumFeature(Feature):
             print("%s.get_range: is not support" % self.feature_name)
             return None
 
+        return dict(self._metadata("range", self.__query_range))
+
+    def __query_range(self):
         status, enum_num = gx_get_enum_entry_nums(self.__handle, self.__feature)
         StatusProcessor.process(status, 'EnumFeature', 'get_range')
 
@@ -670,6 +926,27 @@ class EnumFeature(Feature):
         new_dicts = {v: k for k, v in range_dict.items()}
         return enum_value, new_dicts[enum_value]
 
+    def check_value(self, enum_value):
+        """
+        :brief      Check whether enum_value can be set, without writing it
+        :param      enum_value
+        :return:    None when the value can be set, otherwise the reason
+        """
+        if not isinstance(enum_value, INT_TYPE):
+            return "Expected enum_value type is int, not %s" % type(enum_value)
+
+        if not self.is_writable():
+            return "%s is not writeable" % self.feature_name
+
+        range_dict = self.get_range()
+        if enum_value not in range_dict.values():
+            return "enum_value out of bounds, %s.range:%s" % (self.feature_name, range_dict.__str__())
+        return None
+
+    def _read_value(self):
+        enum_value, enum_str = self.get()
+        return enum_value
+
     def set(self, enum_value):
         """
         :brief      Setting enum value
@@ -693,16 +970,18 @@ class EnumFeature(Feature):
             return
 
         status = gx_set_enum(self.__handle, self.__feature, enum_value)
+        self._value_written(status, enum_value)
         StatusProcessor.process(status, 'EnumFeature', 'set')
 
 
 class BoolFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param handle:      The handle of the device
         :param feature:     The feature code ID
+        :param cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -720,6 +999,19 @@ class BoolFeature(Feature):
         StatusProcessor.process(status, 'BoolFeature', 'get')
         return bool_value
 
+    def check_value(self, bool_value):
+        """
+        :brief      Check whether bool_value can be set, without writing it
+        :param      bool_value[bool]
+        :return:    None when the value can be set, otherwise the reason
+        """
+        if not isinstance(bool_value, bool):
+            return "Expected bool_value type is bool, not %s" % type(bool_value)
+
+        if not self.is_writable():
+            return "%s is not writeable" % self.feature_name
+        return None
+
     def set(self, bool_value):
         """
         :brief      Setting bool value
@@ -736,16 +1028,18 @@ class BoolFeature(Feature):
             return
 
         status = gx_set_bool(self.__handle, self.__feature, bool_value)
+        self._value_written(status, bool_value)
         StatusProcessor.process(status, 'BoolFeature', 'set')
 
 
 class StringFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param      handle:      The handle of the device
         :param      feature:     The feature code ID
+        :param      cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -759,6 +1053,9 @@ class StringFeature(Feature):
             print("%s.get_string_max_length is not support" % self.feature_name)
             return None
 
+        return self._metadata("max_length", self.__query_string_max_length)
+
+    def __query_string_max_length(self):
         status, length = gx_get_string_max_length(self.__handle, self.__feature)
         StatusProcessor.process(status, 'StringFeature', 'get_string_max_length')
         return length
@@ -777,6 +1074,23 @@ class StringFeature(Feature):
         StatusProcessor.process(status, 'StringFeature', 'get')
         return strings
 
+    def check_value(self, input_string):
+        """
+        :brief      Check whether input_string can be set, without writing it
+        :param      input_string[string]
+        :return:    None when the value can be set, otherwise the reason
+        """
+        if not isinstance(input_string, str):
+            return "Expected input_string type is str, not %s" % type(input_string)
+
+        if not self.is_writable():
+            return "%s is not writeable" % self.feature_name
+
+        max_length = self.get_string_max_length()
+        if input_string.__len__() > max_length:
+            return "input_string length out of bounds, %s.length_max:%s" % (self.feature_name, max_length)
+        return None
+
     def set(self, input_string):
         """
         :brief      Setting string value
@@ -800,16 +1114,18 @@ class StringFeature(Feature):
             return
 
         status = gx_set_string(self.__handle, self.__feature, input_string)
+        self._value_written(status, input_string)
         StatusProcessor.process(status, 'StringFeature', 'set')
 
 
 class BufferFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param      handle:      The handle of the device
         :param      feature:     The feature code ID
+        :param      cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -823,6 +1139,9 @@ class BufferFeature(Feature):
             print("%s.get_buffer_length is not support" % self.feature_name)
             return None
 
+        return self._metadata("max_length", self.__query_buffer_length)
+
+    def __query_buffer_length(self):
         status, length = gx_get_buffer_length(self.__handle, self.__feature)
         StatusProcessor.process(status, 'BuffFeature', 'get_buffer_length')
         return length
@@ -865,16 +1184,18 @@ class BufferFeature(Feature):
 
         status = gx_set_buffer(self.__handle, self.__feature,
                                buf.get_ctype_array(), buf.get_length())
+        self._value_written(status)
         StatusProcessor.process(status, 'BuffFeature', 'set_buffer')
 
 
 class CommandFeature(Feature):
-    def __init__(self, handle, feature):
+    def __init__(self, handle, feature, cache=None):
         """
         :param      handle:      The handle of the device
         :param      feature:     The feature code ID
+        :param      cache:       FeatureMetadataCache of the device
         """
-        Feature.__init__(self, handle, feature)
+        Feature.__init__(self, handle, feature, cache)
         self.__handle = handle
         self.__feature = feature
 
@@ -889,6 +1210,7 @@ class CommandFeature(Feature):
             return
 
         status = gx_send_command(self.__handle, self.__feature)
+        self._value_written(status)
         StatusProcessor.process(status, 'CommandFeature', 'send_command')
 
 
@@ -932,6 +1254,32 @@ class Buffer:
         return len(self.data_array)
 
 
+class FeatureDescriptor:
+    """
+    Class level declaration of a device or data stream feature. The feature object is only created
+    on first access and then stored on the instance, so opening a device does not create every feature.
+    """
+    def __init__(self, feature_class, feature_id):
+        """
+        :param  feature_class:  Feature subclass used for the feature, e.g. IntFeature
+        :param  feature_id:     The feature code ID
+        """
+        self.feature_class = feature_class
+        self.feature_id = feature_id
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        feature = instance._create_feature(self.feature_class, self.feature_id)
+        instance.__dict__[self.name] = feature
+        return feature
+
+
 class Device:
     """
     The Camera class mainly encapsulates some common operations and function attributes,
@@ -940,170 +1288,266 @@ class Device:
     such as SetInt, SetFloat, etc. Can not open to the user, so that when the subsequent addition of features,
     Python interface does not upgrade, or only the definition of the control code can support new features
     """
+    # ---------------Device Information Section--------------------------
+    DeviceVendorName = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_VENDOR_NAME)
+    DeviceModelName = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_MODEL_NAME)
+    DeviceFirmwareVersion = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_FIRMWARE_VERSION)
+    DeviceVersion = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_VERSION)
+    DeviceSerialNumber = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_SERIAL_NUMBER)
+    FactorySettingVersion = FeatureDescriptor(StringFeature, GxFeatureID.STRING_FACTORY_SETTING_VERSION)
+    DeviceUserID = FeatureDescriptor(StringFeature, GxFeatureID.STRING_DEVICE_USER_ID)
+    DeviceLinkSelector = FeatureDescriptor(IntFeature, GxFeatureID.INT_DEVICE_LINK_SELECTOR)
+    DeviceLinkThroughputLimitMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_DEVICE_LINK_THROUGHPUT_LIMIT_MODE)
+    DeviceLinkThroughputLimit = FeatureDescriptor(IntFeature, GxFeatureID.INT_DEVICE_LINK_THROUGHPUT_LIMIT)
+    DeviceLinkCurrentThroughput = FeatureDescriptor(IntFeature, GxFeatureID.INT_DEVICE_LINK_CURRENT_THROUGHPUT)
+    DeviceReset = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_DEVICE_RESET)
+    TimestampTickFrequency = FeatureDescriptor(IntFeature, GxFeatureID.INT_TIMESTAMP_TICK_FREQUENCY)
+    TimestampLatch = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_TIMESTAMP_LATCH)
+    TimestampReset = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_TIMESTAMP_RESET)
+    TimestampLatchReset = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_TIMESTAMP_LATCH_RESET)
+    TimestampLatchValue = FeatureDescriptor(IntFeature, GxFeatureID.INT_TIMESTAMP_LATCH_VALUE)
+
+    # ---------------ImageFormat Section--------------------------------
+    SensorWidth = FeatureDescriptor(IntFeature, GxFeatureID.INT_SENSOR_WIDTH)
+    SensorHeight = FeatureDescriptor(IntFeature, GxFeatureID.INT_SENSOR_HEIGHT)
+    WidthMax = FeatureDescriptor(IntFeature, GxFeatureID.INT_WIDTH_MAX)
+    HeightMax = FeatureDescriptor(IntFeature, GxFeatureID.INT_HEIGHT_MAX)
+    OffsetX = FeatureDescriptor(IntFeature, GxFeatureID.INT_OFFSET_X)
+    OffsetY = FeatureDescriptor(IntFeature, GxFeatureID.INT_OFFSET_Y)
+    Width = FeatureDescriptor(IntFeature, GxFeatureID.INT_WIDTH)
+    Height = FeatureDescriptor(IntFeature, GxFeatureID.INT_HEIGHT)
+    BinningHorizontal = FeatureDescriptor(IntFeature, GxFeatureID.INT_BINNING_HORIZONTAL)
+    BinningVertical = FeatureDescriptor(IntFeature, GxFeatureID.INT_BINNING_VERTICAL)
+    DecimationHorizontal = FeatureDescriptor(IntFeature, GxFeatureID.INT_DECIMATION_HORIZONTAL)
+    DecimationVertical = FeatureDescriptor(IntFeature, GxFeatureID.INT_DECIMATION_VERTICAL)
+    PixelSize = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_PIXEL_SIZE)
+    PixelColorFilter = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_PIXEL_COLOR_FILTER)
+    PixelFormat = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_PIXEL_FORMAT)
+    ReverseX = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_REVERSE_X)
+    ReverseY = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_REVERSE_Y)
+    TestPattern = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TEST_PATTERN)
+    TestPatternGeneratorSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TEST_PATTERN_GENERATOR_SELECTOR)
+    RegionSendMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_REGION_SEND_MODE)
+    RegionMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_REGION_MODE)
+    RegionSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_REGION_SELECTOR)
+    CenterWidth = FeatureDescriptor(IntFeature, GxFeatureID.INT_CENTER_WIDTH)
+    CenterHeight = FeatureDescriptor(IntFeature, GxFeatureID.INT_CENTER_HEIGHT)
+    BinningHorizontalMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BINNING_HORIZONTAL_MODE)
+    BinningVerticalMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BINNING_VERTICAL_MODE)
+
+    # ---------------TransportLayer Section-------------------------------
+    PayloadSize = FeatureDescriptor(IntFeature, GxFeatureID.INT_PAYLOAD_SIZE)
+
+    # ---------------AcquisitionTrigger Section---------------------------
+    AcquisitionMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_ACQUISITION_MODE)
+    AcquisitionStart = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_ACQUISITION_START)
+    AcquisitionStop = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_ACQUISITION_STOP)
+    TriggerMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRIGGER_MODE)
+    TriggerSoftware = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_TRIGGER_SOFTWARE)
+    TriggerActivation = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRIGGER_ACTIVATION)
+    ExposureTime = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_EXPOSURE_TIME)
+    ExposureAuto = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_EXPOSURE_AUTO)
+    TriggerFilterRaisingEdge = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_TRIGGER_FILTER_RAISING)
+    TriggerFilterFallingEdge = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_TRIGGER_FILTER_FALLING)
+    TriggerSource = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRIGGER_SOURCE)
+    ExposureMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_EXPOSURE_MODE)
+    TriggerSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRIGGER_SELECTOR)
+    TriggerDelay = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_TRIGGER_DELAY)
+    TransferControlMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRANSFER_CONTROL_MODE)
+    TransferOperationMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRANSFER_OPERATION_MODE)
+    TransferStart = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_TRANSFER_START)
+    TransferBlockCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_TRANSFER_BLOCK_COUNT)
+    FrameBufferOverwriteActive = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_FRAME_STORE_COVER_ACTIVE)
+    AcquisitionFrameRateMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_ACQUISITION_FRAME_RATE_MODE)
+    AcquisitionFrameRate = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_ACQUISITION_FRAME_RATE)
+    CurrentAcquisitionFrameRate = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_CURRENT_ACQUISITION_FRAME_RATE)
+    FixedPatternNoiseCorrectMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_FIXED_PATTERN_NOISE_CORRECT_MODE)
+    AcquisitionBurstFrameCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_ACQUISITION_BURST_FRAME_COUNT)
+    AcquisitionStatusSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_ACQUISITION_STATUS_SELECTOR)
+    AcquisitionStatus = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_ACQUISITION_STATUS)
+    ExposureDelay = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_EXPOSURE_DELAY)
+
+    # ----------------DigitalIO Section----------------------------------
+    UserOutputSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_USER_OUTPUT_SELECTOR)
+    UserOutputValue = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_USER_OUTPUT_VALUE)
+    LineSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_LINE_SELECTOR)
+    LineMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_LINE_MODE)
+    LineInverter = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_LINE_INVERTER)
+    LineSource = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_LINE_SOURCE)
+    LineStatus = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_LINE_STATUS)
+    LineStatusAll = FeatureDescriptor(IntFeature, GxFeatureID.INT_LINE_STATUS_ALL)
+
+    # ----------------AnalogControls Section----------------------------
+    GainAuto = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_GAIN_AUTO)
+    GainSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_GAIN_SELECTOR)
+    BlackLevelAuto = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BLACK_LEVEL_AUTO)
+    BlackLevelSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BLACK_LEVEL_SELECTOR)
+    BalanceWhiteAuto = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BALANCE_WHITE_AUTO)
+    BalanceRatioSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_BALANCE_RATIO_SELECTOR)
+    BalanceRatio = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_BALANCE_RATIO)
+    DeadPixelCorrect = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_DEAD_PIXEL_CORRECT)
+    Gain = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_GAIN)
+    BlackLevel = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_BLACK_LEVEL)
+    GammaEnable = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_GAMMA_ENABLE)
+    GammaMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_GAMMA_MODE)
+    Gamma = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_GAMMA)
+    DigitalShift = FeatureDescriptor(IntFeature, GxFeatureID.INT_DIGITAL_SHIFT)
+
+    # ---------------CustomFeature Section------------------------------
+    ExpectedGrayValue = FeatureDescriptor(IntFeature, GxFeatureID.INT_GRAY_VALUE)
+    AAROIOffsetX = FeatureDescriptor(IntFeature, GxFeatureID.INT_AAROI_OFFSETX)
+    AAROIOffsetY = FeatureDescriptor(IntFeature, GxFeatureID.INT_AAROI_OFFSETY)
+    AAROIWidth = FeatureDescriptor(IntFeature, GxFeatureID.INT_AAROI_WIDTH)
+    AAROIHeight = FeatureDescriptor(IntFeature, GxFeatureID.INT_AAROI_HEIGHT)
+    AutoGainMin = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_AUTO_GAIN_MIN)
+    AutoGainMax = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_AUTO_GAIN_MAX)
+    AutoExposureTimeMin = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_AUTO_EXPOSURE_TIME_MIN)
+    AutoExposureTimeMax = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_AUTO_EXPOSURE_TIME_MAX)
+    ContrastParam = FeatureDescriptor(IntFeature, GxFeatureID.INT_CONTRAST_PARAM)
+    GammaParam = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_GAMMA_PARAM)
+    ColorCorrectionParam = FeatureDescriptor(IntFeature, GxFeatureID.INT_COLOR_CORRECTION_PARAM)
+    AWBLampHouse = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_AWB_LAMP_HOUSE)
+    AWBROIOffsetX = FeatureDescriptor(IntFeature, GxFeatureID.INT_AWBROI_OFFSETX)
+    AWBROIOffsetY = FeatureDescriptor(IntFeature, GxFeatureID.INT_AWBROI_OFFSETY)
+    AWBROIWidth = FeatureDescriptor(IntFeature, GxFeatureID.INT_AWBROI_WIDTH)
+    AWBROIHeight = FeatureDescriptor(IntFeature, GxFeatureID.INT_AWBROI_HEIGHT)
+    SharpnessMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_SHARPNESS_MODE)
+    Sharpness = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_SHARPNESS)
+
+    # ---------------UserSetControl Section-------------------------
+    UserSetSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_USER_SET_SELECTOR)
+    UserSetLoad = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_USER_SET_LOAD)
+    UserSetSave = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_USER_SET_SAVE)
+    UserSetDefault = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_USER_SET_DEFAULT)
+
+    # ---------------LUT Section-------------------------------
+    LUTSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_LUT_SELECTOR)
+    LUTValueAll = FeatureDescriptor(BufferFeature, GxFeatureID.BUFFER_LUT_VALUE_ALL)
+    LUTEnable = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_LUT_ENABLE)
+    LUTIndex = FeatureDescriptor(IntFeature, GxFeatureID.INT_LUT_INDEX)
+    LUTValue = FeatureDescriptor(IntFeature, GxFeatureID.INT_LUT_VALUE)
+
+    # ---------------Color Transformation Control--------------
+    ColorTransformationMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COLOR_TRANSFORMATION_MODE)
+    ColorTransformationEnable = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_COLOR_TRANSFORMATION_ENABLE)
+    ColorTransformationValueSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COLOR_TRANSFORMATION_VALUE_SELECTOR)
+    ColorTransformationValue = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_COLOR_TRANSFORMATION_VALUE)
+
+    # ---------------ChunkData Section-------------------------
+    ChunkModeActive = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_CHUNK_MODE_ACTIVE)
+    ChunkSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_CHUNK_SELECTOR)
+    ChunkEnable = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_CHUNK_ENABLE)
+
+    # ---------------CounterAndTimerControl Section-------------------------
+    TimerSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TIMER_SELECTOR)
+    TimerDuration = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_TIMER_DURATION)
+    TimerDelay = FeatureDescriptor(FloatFeature, GxFeatureID.FLOAT_TIMER_DELAY)
+    TimerTriggerSource = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TIMER_TRIGGER_SOURCE)
+    CounterSelector = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COUNTER_SELECTOR)
+    CounterEventSource = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COUNTER_EVENT_SOURCE)
+    CounterResetSource = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COUNTER_RESET_SOURCE)
+    CounterResetActivation = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_COUNTER_RESET_ACTIVATION)
+    CounterReset = FeatureDescriptor(CommandFeature, GxFeatureID.COMMAND_COUNTER_RESET)
+
     def __init__(self, handle):
         self.__dev_handle = handle
         self.data_stream = []
+        self.feature_cache = FeatureMetadataCache()
+        self.__capture_callback = None
+        self.__offline_callback = None
+        self.__offline_callback_handle = None
+
+    def _create_feature(self, feature_class, feature_id):
+        """
+        :brief      create the feature object behind a FeatureDescriptor
+        :param      feature_class:  Feature subclass
+        :param      feature_id:     The feature code ID
+        :return:    feature object
+        """
+        return feature_class(self.__dev_handle, feature_id, self.feature_cache)
+
+    def set_strict_mode(self, strict):
+        """
+        :brief      In strict mode feature metadata(implemented/readable/writable, ranges) is queried
+                    from the device before every access instead of being cached
+        :param      strict:     bool
+        :return:    None
+        """
+        if not isinstance(strict, bool):
+            raise ParameterTypeError("Device.set_strict_mode: "
+                                     "Expected strict type is bool, not %s" % type(strict))
+
+        self.feature_cache.enabled = not strict
+        self.feature_cache.invalidate()
+        for data_stream in self.data_stream:
+            data_stream.feature_cache.enabled = not strict
+            data_stream.feature_cache.invalidate()
+
+    def apply(self, settings):
+        """
+        :brief      Write several features in one call. Values equal to the last written value are skipped,
+                    pixel format, binning and decimation are written first and the offset and size of
+                    each axis are ordered so the region stays valid in between. Writing continues after
+                    a failure, all failures are raised together as FeatureApplyError.
+        :param      settings:   {feature name: value}, e.g. {"OffsetX": 8, "Width": 640}
+        :return:    names of the features that were written
+        """
+        if not isinstance(settings, dict):
+            raise ParameterTypeError("Device.apply: "
+                                     "Expected settings type is dict, not %s" % type(settings))
+
+        features = {}
+        errors = {}
+        for name in settings:
+            feature = getattr(self, name, None)
+            if not hasattr(feature, "check_value"):
+                errors[name] = "%s is not a feature that holds a value" % name
+                continue
+            features[name] = feature
+
+        order = [name for name in APPLY_ORDER_FIRST if name in features]
+        written = []
+        for name in order:
+            self.__apply_feature(name, features.pop(name), settings[name], written, errors)
+
+        for offset_name, size_name in APPLY_ORDER_AXES:
+            axis = [name for name in (offset_name, size_name) if name in features]
+            if len(axis) == 2:
+                # a growing offset only fits once the size shrank, a shrinking offset makes room for the size
+                offset = settings[offset_name]
+                current_offset = features[offset_name]._current_value()
+                if isinstance(offset, INT_TYPE) and current_offset is not None and offset > current_offset:
+                    axis.reverse()
+            for name in axis:
+                self.__apply_feature(name, features.pop(name), settings[name], written, errors)
+
+        for name, feature in features.items():
+            self.__apply_feature(name, feature, settings[name], written, errors)
+
+        if errors:
+            raise FeatureApplyError("Device.apply: %d feature(s) failed, %s" % (len(errors), errors), errors)
+        return written
 
-        # ---------------Device Information Section--------------------------
-        self.DeviceVendorName = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_VENDOR_NAME)
-        self.DeviceModelName = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_MODEL_NAME)
-        self.DeviceFirmwareVersion = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_FIRMWARE_VERSION)
-        self.DeviceVersion = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_VERSION)
-        self.DeviceSerialNumber = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_SERIAL_NUMBER)
-        self.FactorySettingVersion = StringFeature(self.__dev_handle, GxFeatureID.STRING_FACTORY_SETTING_VERSION)
-        self.DeviceUserID = StringFeature(self.__dev_handle, GxFeatureID.STRING_DEVICE_USER_ID)
-        self.DeviceLinkSelector = IntFeature(self.__dev_handle, GxFeatureID.INT_DEVICE_LINK_SELECTOR)
-        self.DeviceLinkThroughputLimitMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_DEVICE_LINK_THROUGHPUT_LIMIT_MODE)
-        self.DeviceLinkThroughputLimit = IntFeature(self.__dev_handle, GxFeatureID.INT_DEVICE_LINK_THROUGHPUT_LIMIT)
-        self.DeviceLinkCurrentThroughput = IntFeature(self.__dev_handle, GxFeatureID.INT_DEVICE_LINK_CURRENT_THROUGHPUT)
-        self.DeviceReset = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_DEVICE_RESET)
-        self.TimestampTickFrequency = IntFeature(self.__dev_handle, GxFeatureID.INT_TIMESTAMP_TICK_FREQUENCY)
-        self.TimestampLatch = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_TIMESTAMP_LATCH)
-        self.TimestampReset = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_TIMESTAMP_RESET)
-        self.TimestampLatchReset = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_TIMESTAMP_LATCH_RESET)
-        self.TimestampLatchValue = IntFeature(self.__dev_handle, GxFeatureID.INT_TIMESTAMP_LATCH_VALUE)
-
-        # ---------------ImageFormat Section--------------------------------
-        self.SensorWidth = IntFeature(self.__dev_handle, GxFeatureID.INT_SENSOR_WIDTH)
-        self.SensorHeight = IntFeature(self.__dev_handle, GxFeatureID.INT_SENSOR_HEIGHT)
-        self.WidthMax = IntFeature(self.__dev_handle, GxFeatureID.INT_WIDTH_MAX)
-        self.HeightMax = IntFeature(self.__dev_handle, GxFeatureID.INT_HEIGHT_MAX)
-        self.OffsetX = IntFeature(self.__dev_handle, GxFeatureID.INT_OFFSET_X)
-        self.OffsetY = IntFeature(self.__dev_handle, GxFeatureID.INT_OFFSET_Y)
-        self.Width = IntFeature(self.__dev_handle, GxFeatureID.INT_WIDTH)
-        self.Height = IntFeature(self.__dev_handle, GxFeatureID.INT_HEIGHT)
-        self.BinningHorizontal = IntFeature(self.__dev_handle, GxFeatureID.INT_BINNING_HORIZONTAL)
-        self.BinningVertical = IntFeature(self.__dev_handle, GxFeatureID.INT_BINNING_VERTICAL)
-        self.DecimationHorizontal = IntFeature(self.__dev_handle, GxFeatureID.INT_DECIMATION_HORIZONTAL)
-        self.DecimationVertical = IntFeature(self.__dev_handle, GxFeatureID.INT_DECIMATION_VERTICAL)
-        self.PixelSize = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_PIXEL_SIZE)
-        self.PixelColorFilter = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_PIXEL_COLOR_FILTER)
-        self.PixelFormat = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_PIXEL_FORMAT)
-        self.ReverseX = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_REVERSE_X)
-        self.ReverseY = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_REVERSE_Y)
-        self.TestPattern = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TEST_PATTERN)
-        self.TestPatternGeneratorSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TEST_PATTERN_GENERATOR_SELECTOR)
-        self.RegionSendMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_REGION_SEND_MODE)
-        self.RegionMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_REGION_MODE)
-        self.RegionSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_REGION_SELECTOR)
-        self.CenterWidth = IntFeature(self.__dev_handle, GxFeatureID.INT_CENTER_WIDTH)
-        self.CenterHeight = IntFeature(self.__dev_handle, GxFeatureID.INT_CENTER_HEIGHT)
-        self.BinningHorizontalMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BINNING_HORIZONTAL_MODE)
-        self.BinningVerticalMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BINNING_VERTICAL_MODE)
-
-        # ---------------TransportLayer Section-------------------------------
-        self.PayloadSize = IntFeature(self.__dev_handle, GxFeatureID.INT_PAYLOAD_SIZE)
-
-        # ---------------AcquisitionTrigger Section---------------------------
-        self.AcquisitionMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_ACQUISITION_MODE)
-        self.AcquisitionStart = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_ACQUISITION_START)
-        self.AcquisitionStop = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_ACQUISITION_STOP)
-        self.TriggerMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRIGGER_MODE)
-        self.TriggerSoftware = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_TRIGGER_SOFTWARE)
-        self.TriggerActivation = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRIGGER_ACTIVATION)
-        self.ExposureTime = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_EXPOSURE_TIME)
-        self.ExposureAuto = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_EXPOSURE_AUTO)
-        self.TriggerFilterRaisingEdge = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_TRIGGER_FILTER_RAISING)
-        self.TriggerFilterFallingEdge = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_TRIGGER_FILTER_FALLING)
-        self.TriggerSource = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRIGGER_SOURCE)
-        self.ExposureMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_EXPOSURE_MODE)
-        self.TriggerSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRIGGER_SELECTOR)
-        self.TriggerDelay = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_TRIGGER_DELAY)
-        self.TransferControlMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRANSFER_CONTROL_MODE)
-        self.TransferOperationMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRANSFER_OPERATION_MODE)
-        self.TransferStart = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_TRANSFER_START)
-        self.TransferBlockCount = IntFeature(self.__dev_handle, GxFeatureID.INT_TRANSFER_BLOCK_COUNT)
-        self.FrameBufferOverwriteActive = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_FRAME_STORE_COVER_ACTIVE)
-        self.AcquisitionFrameRateMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_ACQUISITION_FRAME_RATE_MODE)
-        self.AcquisitionFrameRate = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_ACQUISITION_FRAME_RATE)
-        self.CurrentAcquisitionFrameRate = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_CURRENT_ACQUISITION_FRAME_RATE)
-        self.FixedPatternNoiseCorrectMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_FIXED_PATTERN_NOISE_CORRECT_MODE)
-        self.AcquisitionBurstFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_ACQUISITION_BURST_FRAME_COUNT)
-        self.AcquisitionStatusSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_ACQUISITION_STATUS_SELECTOR)
-        self.AcquisitionStatus = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_ACQUISITION_STATUS)
-        self.ExposureDelay = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_EXPOSURE_DELAY)
-
-        # ----------------DigitalIO Section----------------------------------
-        self.UserOutputSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_USER_OUTPUT_SELECTOR)
-        self.UserOutputValue = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_USER_OUTPUT_VALUE)
-        self.LineSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_LINE_SELECTOR)
-        self.LineMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_LINE_MODE)
-        self.LineInverter = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_LINE_INVERTER)
-        self.LineSource = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_LINE_SOURCE)
-        self.LineStatus = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_LINE_STATUS)
-        self.LineStatusAll = IntFeature(self.__dev_handle, GxFeatureID.INT_LINE_STATUS_ALL)
-
-        # ----------------AnalogControls Section----------------------------
-        self.GainAuto = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_GAIN_AUTO)
-        self.GainSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_GAIN_SELECTOR)
-        self.BlackLevelAuto = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BLACK_LEVEL_AUTO)
-        self.BlackLevelSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BLACK_LEVEL_SELECTOR)
-        self.BalanceWhiteAuto = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BALANCE_WHITE_AUTO)
-        self.BalanceRatioSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_BALANCE_RATIO_SELECTOR)
-        self.BalanceRatio = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_BALANCE_RATIO)
-        self.DeadPixelCorrect = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_DEAD_PIXEL_CORRECT)
-        self.Gain = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_GAIN)
-        self.BlackLevel = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_BLACK_LEVEL)
-        self.GammaEnable = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_GAMMA_ENABLE)
-        self.GammaMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_GAMMA_MODE)
-        self.Gamma = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_GAMMA)
-        self.DigitalShift = IntFeature(self.__dev_handle, GxFeatureID.INT_DIGITAL_SHIFT)
-
-        # ---------------CustomFeature Section------------------------------
-        self.ExpectedGrayValue = IntFeature(self.__dev_handle, GxFeatureID.INT_GRAY_VALUE)
-        self.AAROIOffsetX = IntFeature(self.__dev_handle, GxFeatureID.INT_AAROI_OFFSETX)
-        self.AAROIOffsetY = IntFeature(self.__dev_handle, GxFeatureID.INT_AAROI_OFFSETY)
-        self.AAROIWidth = IntFeature(self.__dev_handle, GxFeatureID.INT_AAROI_WIDTH)
-        self.AAROIHeight = IntFeature(self.__dev_handle, GxFeatureID.INT_AAROI_HEIGHT)
-        self.AutoGainMin = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_AUTO_GAIN_MIN)
-        self.AutoGainMax = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_AUTO_GAIN_MAX)
-        self.AutoExposureTimeMin = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_AUTO_EXPOSURE_TIME_MIN)
-        self.AutoExposureTimeMax = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_AUTO_EXPOSURE_TIME_MAX)
-        self.ContrastParam = IntFeature(self.__dev_handle, GxFeatureID.INT_CONTRAST_PARAM)
-        self.GammaParam = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_GAMMA_PARAM)
-        self.ColorCorrectionParam = IntFeature(self.__dev_handle, GxFeatureID.INT_COLOR_CORRECTION_PARAM)
-        self.AWBLampHouse = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_AWB_LAMP_HOUSE)
-        self.AWBROIOffsetX = IntFeature(self.__dev_handle, GxFeatureID.INT_AWBROI_OFFSETX)
-        self.AWBROIOffsetY = IntFeature(self.__dev_handle, GxFeatureID.INT_AWBROI_OFFSETY)
-        self.AWBROIWidth = IntFeature(self.__dev_handle, GxFeatureID.INT_AWBROI_WIDTH)
-        self.AWBROIHeight = IntFeature(self.__dev_handle, GxFeatureID.INT_AWBROI_HEIGHT)
-        self.SharpnessMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_SHARPNESS_MODE)
-        self.Sharpness = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_SHARPNESS)
-
-        # ---------------UserSetControl Section-------------------------
-        self.UserSetSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_USER_SET_SELECTOR)
-        self.UserSetLoad = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_USER_SET_LOAD)
-        self.UserSetSave = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_USER_SET_SAVE)
-        self.UserSetDefault = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_USER_SET_DEFAULT)
-
-        # ---------------LUT Section-------------------------------
-        self.LUTSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_LUT_SELECTOR)
-        self.LUTValueAll = BufferFeature(self.__dev_handle, GxFeatureID.BUFFER_LUT_VALUE_ALL)
-        self.LUTEnable = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_LUT_ENABLE)
-        self.LUTIndex = IntFeature(self.__dev_handle, GxFeatureID.INT_LUT_INDEX)
-        self.LUTValue = IntFeature(self.__dev_handle, GxFeatureID.INT_LUT_VALUE)
-
-        # ---------------Color Transformation Control--------------
-        self.ColorTransformationMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COLOR_TRANSFORMATION_MODE)
-        self.ColorTransformationEnable = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_COLOR_TRANSFORMATION_ENABLE)
-        self.ColorTransformationValueSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COLOR_TRANSFORMATION_VALUE_SELECTOR)
-        self.ColorTransformationValue = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_COLOR_TRANSFORMATION_VALUE)
-
-        # ---------------ChunkData Section-------------------------
-        self.ChunkModeActive = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_CHUNK_MODE_ACTIVE)
-        self.ChunkSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_CHUNK_SELECTOR)
-        self.ChunkEnable = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_CHUNK_ENABLE)
-
-        # ---------------CounterAndTimerControl Section-------------------------
-        self.TimerSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TIMER_SELECTOR)
-        self.TimerDuration = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_TIMER_DURATION)
-        self.TimerDelay = FloatFeature(self.__dev_handle, GxFeatureID.FLOAT_TIMER_DELAY)
-        self.TimerTriggerSource = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TIMER_TRIGGER_SOURCE)
-        self.CounterSelector = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COUNTER_SELECTOR)
-        self.CounterEventSource = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COUNTER_EVENT_SOURCE)
-        self.CounterResetSource = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COUNTER_RESET_SOURCE)
-        self.CounterResetActivation = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_COUNTER_RESET_ACTIVATION)
-        self.CounterReset = CommandFeature(self.__dev_handle, GxFeatureID.COMMAND_COUNTER_RESET)
+    @staticmethod
+    def __apply_feature(name, feature, value, written, errors):
+        """
+        :brief      Write one feature for apply, failures are added to errors
+        """
+        try:
+            if feature._current_value() == value:
+                return
+
+            error = feature.check_value(value)
+            if error is not None:
+                errors[name] = error
+                return
+
+            feature.set(value)
+            written.append(name)
+        except OffLine:
+            raise
+        except Exception as err:
+            errors[name] = err.__str__()
 
     def stream_on(self):
         """
@@ -1111,6 +1555,7 @@ class Device:
         :return:    none
         """
         status = gx_send_command(self.__dev_handle, GxFeatureID.COMMAND_ACQUISITION_START)
+        self.feature_cache.invalidate_access()
         StatusProcessor.process(status, 'Device', 'stream_on')
 
         payload_size = self.PayloadSize.get()
@@ -1124,8 +1569,94 @@ class Device:
         """
         self.data_stream[0].acquisition_flag = False
         status = gx_send_command(self.__dev_handle, GxFeatureID.COMMAND_ACQUISITION_STOP)
+        self.feature_cache.invalidate_access()
         StatusProcessor.process(status, 'Device', 'stream_off')
 
+    def register_capture_callback(self, callback_func):
+        """
+        :brief      Register the capture callback function, images are then delivered by GxIAPI
+                    instead of being fetched with get_image. Register before stream_on.
+                    callback_func runs in a GxIAPI thread and receives a RawImage that wraps the
+                    SDK buffer in place, the buffer is only valid until callback_func returns
+                    (use RawImage.copy() to keep the image).
+        :param      callback_func:  callable taking one RawImage argument
+        :return:    None
+        """
+        if not callable(callback_func):
+            raise ParameterTypeError("Device.register_capture_callback: "
+                                     "Expected callback_func type is callable, not %s" % type(callback_func))
+
+        def capture_callback(frame_param_p):
+            frame_param = frame_param_p.contents
+            frame_data = GxFrameData()
+            frame_data.status = frame_param.status
+            frame_data.image_buf = frame_param.image_buf
+            frame_data.width = frame_param.width
+            frame_data.height = frame_param.height
+            frame_data.pixel_format = frame_param.pixel_format
+            frame_data.image_size = frame_param.image_size
+            frame_data.frame_id = frame_param.frame_id
+            frame_data.timestamp = frame_param.timestamp
+            # the SDK reclaims the buffer as soon as this function returns, callbacks that keep
+            # the frame have to copy() it
+            image = RawImage(frame_data)
+            try:
+                callback_func(image)
+            except Exception:
+                traceback.print_exc()
+
+        # keep a reference, ctypes does not keep the function pointer alive
+        self.__capture_callback = CAP_CALL(capture_callback)
+        status = gx_register_capture_callback(self.__dev_handle, self.__capture_callback)
+        StatusProcessor.process(status, 'Device', 'register_capture_callback')
+
+    def unregister_capture_callback(self):
+        """
+        :brief      Unregister the capture callback function, call after stream_off
+        :return:    None
+        """
+        if self.__capture_callback is None:
+            return
+
+        status = gx_unregister_capture_callback(self.__dev_handle)
+        StatusProcessor.process(status, 'Device', 'unregister_capture_callback')
+        self.__capture_callback = None
+
+    def register_device_offline_callback(self, callback_func):
+        """
+        :brief      Register a function that is called(from a GxIAPI thread) when the device goes offline
+        :param      callback_func:  callable without arguments
+        :return:    None
+        """
+        if not callable(callback_func):
+            raise ParameterTypeError("Device.register_device_offline_callback: "
+                                     "Expected callback_func type is callable, not %s" % type(callback_func))
+
+        def offline_callback(user_param):
+            try:
+                callback_func()
+            except Exception:
+                traceback.print_exc()
+
+        self.unregister_device_offline_callback()
+        self.__offline_callback = OFF_LINE_CALL(offline_callback)
+        status, self.__offline_callback_handle = gx_register_device_offline_callback(self.__dev_handle,
+                                                                                      self.__offline_callback)
+        StatusProcessor.process(status, 'Device', 'register_device_offline_callback')
+
+    def unregister_device_offline_callback(self):
+        """
+        :brief      Unregister the device offline callback function
+        :return:    None
+        """
+        if self.__offline_callback is None:
+            return
+
+        status = gx_unregister_device_offline_callback(self.__dev_handle, self.__offline_callback_handle)
+        self.__offline_callback = None
+        self.__offline_callback_handle = None
+        StatusProcessor.process(status, 'Device', 'unregister_device_offline_callback')
+
     def export_config_file(self, file_path):
         """
         :brief      Export the current configuration file
@@ -1176,20 +1707,21 @@ class Device:
 
 
 class GEVDevice(Device):
+    GevCurrentIPConfigurationLLA = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_LLA)
+    GevCurrentIPConfigurationDHCP = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_DHCP)
+    GevCurrentIPConfigurationPersistentIP = FeatureDescriptor(BoolFeature, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_PERSISTENT_IP)
+    EstimatedBandwidth = FeatureDescriptor(IntFeature, GxFeatureID.INT_ESTIMATED_BANDWIDTH)
+    GevHeartbeatTimeout = FeatureDescriptor(IntFeature, GxFeatureID.INT_GEV_HEARTBEAT_TIMEOUT)
+    GevSCPSPacketSize = FeatureDescriptor(IntFeature, GxFeatureID.INT_GEV_PACKET_SIZE)
+    GevSCPD = FeatureDescriptor(IntFeature, GxFeatureID.INT_GEV_PACKET_DELAY)
+    GevLinkSpeed = FeatureDescriptor(IntFeature, GxFeatureID.INT_GEV_LINK_SPEED)
+    DeviceCommandTimeout = FeatureDescriptor(IntFeature, GxFeatureID.INT_COMMAND_TIMEOUT)
+    DeviceCommandRetryCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_COMMAND_RETRY_COUNT)
+
     def __init__(self, handle):
         self.__dev_handle = handle
         Device.__init__(self, self.__dev_handle)
-        self.GevCurrentIPConfigurationLLA = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_LLA)
-        self.GevCurrentIPConfigurationDHCP = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_DHCP)
-        self.GevCurrentIPConfigurationPersistentIP = BoolFeature(self.__dev_handle, GxFeatureID.BOOL_GEV_CURRENT_IP_CONFIGURATION_PERSISTENT_IP)
-        self.EstimatedBandwidth = IntFeature(self.__dev_handle, GxFeatureID.INT_ESTIMATED_BANDWIDTH)
-        self.GevHeartbeatTimeout = IntFeature(self.__dev_handle, GxFeatureID.INT_GEV_HEARTBEAT_TIMEOUT)
-        self.GevSCPSPacketSize = IntFeature(self.__dev_handle, GxFeatureID.INT_GEV_PACKET_SIZE)
-        self.GevSCPD = IntFeature(self.__dev_handle, GxFeatureID.INT_GEV_PACKET_DELAY)
-        self.GevLinkSpeed = IntFeature(self.__dev_handle, GxFeatureID.INT_GEV_LINK_SPEED)
-        self.DeviceCommandTimeout = IntFeature(self.__dev_handle, GxFeatureID.INT_COMMAND_TIMEOUT)
-        self.DeviceCommandRetryCount = IntFeature(self.__dev_handle, GxFeatureID.INT_COMMAND_RETRY_COUNT)
-        self.data_stream.append(GEVDataStream(self.__dev_handle))
+        self.data_stream.append(GEVDataStream(self.__dev_handle, self.feature_cache))
 
 
 class U3VDevice(Device):
@@ -1200,46 +1732,158 @@ class U3VDevice(Device):
     def __init__(self, handle):
         self.__dev_handle = handle
         Device.__init__(self, self.__dev_handle)
-        self.data_stream.append(U3VDataStream(self.__dev_handle))
+        self.data_stream.append(U3VDataStream(self.__dev_handle, self.feature_cache))
 
 
 class U2Device(Device):
     """
     The U2Device class inherits from the Device class
     """
+    AcquisitionSpeedLevel = FeatureDescriptor(IntFeature, GxFeatureID.INT_ACQUISITION_SPEED_LEVEL)
+    AcquisitionFrameCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_ACQUISITION_FRAME_COUNT)
+    TriggerSwitch = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_TRIGGER_SWITCH)
+    UserOutputMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_USER_OUTPUT_MODE)
+    StrobeSwitch = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_STROBE_SWITCH)
+    ADCLevel = FeatureDescriptor(IntFeature, GxFeatureID.INT_ADC_LEVEL)
+    HBlanking = FeatureDescriptor(IntFeature, GxFeatureID.INT_H_BLANKING)
+    VBlanking = FeatureDescriptor(IntFeature, GxFeatureID.INT_V_BLANKING)
+    UserPassword = FeatureDescriptor(StringFeature, GxFeatureID.STRING_USER_PASSWORD)
+    VerifyPassword = FeatureDescriptor(StringFeature, GxFeatureID.STRING_VERIFY_PASSWORD)
+    UserData = FeatureDescriptor(BufferFeature, GxFeatureID.BUFFER_USER_DATA)
+    AALightEnvironment = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_AA_LIGHT_ENVIRONMENT)
+    FrameInformation = FeatureDescriptor(BufferFeature, GxFeatureID.BUFFER_FRAME_INFORMATION)
+    ImageGrayRaiseSwitch = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_IMAGE_GRAY_RAISE_SWITCH)
+
     def __init__(self, handle):
         self.__dev_handle = handle
         Device.__init__(self, self.__dev_handle)
-        self.AcquisitionSpeedLevel = IntFeature(self.__dev_handle, GxFeatureID.INT_ACQUISITION_SPEED_LEVEL)
-        self.AcquisitionFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_ACQUISITION_FRAME_COUNT)
-        self.TriggerSwitch = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_TRIGGER_SWITCH)
-        self.UserOutputMode = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_USER_OUTPUT_MODE)
-        self.StrobeSwitch = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_STROBE_SWITCH)
-        self.ADCLevel = IntFeature(self.__dev_handle, GxFeatureID.INT_ADC_LEVEL)
-        self.HBlanking = IntFeature(self.__dev_handle, GxFeatureID.INT_H_BLANKING)
-        self.VBlanking = IntFeature(self.__dev_handle, GxFeatureID.INT_V_BLANKING)
-        self.UserPassword = StringFeature(self.__dev_handle, GxFeatureID.STRING_USER_PASSWORD)
-        self.VerifyPassword = StringFeature(self.__dev_handle, GxFeatureID.STRING_VERIFY_PASSWORD)
-        self.UserData = BufferFeature(self.__dev_handle, GxFeatureID.BUFFER_USER_DATA)
-        self.AALightEnvironment = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_AA_LIGHT_ENVIRONMENT)
-        self.FrameInformation = BufferFeature(self.__dev_handle, GxFeatureID.BUFFER_FRAME_INFORMATION)
-        self.ImageGrayRaiseSwitch = EnumFeature(self.__dev_handle, GxFeatureID.ENUM_IMAGE_GRAY_RAISE_SWITCH)
-        self.data_stream.append(DataStream(self.__dev_handle))
+        self.data_stream.append(DataStream(self.__dev_handle, self.feature_cache))
+
+
+class FrameBufferPool:
+    """
+    Preallocated payload sized image buffers for DataStream.get_image and RawImage.copy.
+    An image takes a buffer from the pool and gives it back on RawImage.release(), when all buffers
+    are in use the image gets a buffer of its own as before (counted as exhausted).
+    """
+    def __init__(self, buffer_num=8):
+        """
+        :param      buffer_num:     number of buffers
+        """
+        self.buffer_num = buffer_num
+        self.buffer_size = 0
+        self.in_use = 0
+        self.high_water_mark = 0
+        self.exhausted = 0
+        self.__free = []
+        self.__lock = threading.Lock()
+
+    def set_buffer_number(self, buffer_num):
+        """
+        :brief      set the number of buffers, takes effect with the next resize
+        :param      buffer_num:     number of buffers, minimum=1
+        """
+        if not isinstance(buffer_num, INT_TYPE):
+            raise ParameterTypeError("FrameBufferPool.set_buffer_number: "
+                                     "Expected buffer_num type is int, not %s" % type(buffer_num))
+
+        if buffer_num < 1:
+            print("FrameBufferPool.set_buffer_number: buffer_num out of bounds, minimum=1")
+            return
+
+        self.buffer_num = buffer_num
+
+    def resize(self, buffer_size):
+        """
+        :brief      allocate the buffers for a payload size, buffers of the previous size that are
+                    still in use are dropped when they are released
+        :param      buffer_size:    payload size in bytes
+        """
+        with self.__lock:
+            if buffer_size == self.buffer_size and len(self.__free) + self.in_use >= self.buffer_num:
+                return
+            self.buffer_size = buffer_size
+            self.__free = [(c_ubyte * buffer_size)() for _ in range(max(self.buffer_num - self.in_use, 0))]
+
+    def create_image(self, frame_data):
+        """
+        :brief      RawImage for frame_data backed by a pool buffer
+        :param      frame_data:     GxFrameData, image_size is the number of bytes needed
+        :return:    RawImage object
+        """
+        buffer = self.__acquire(frame_data.image_size)
+        if buffer is None:
+            frame_data.image_buf = None
+            return RawImage(frame_data)
+
+        frame_data.image_buf = addressof(buffer)
+        return RawImage(frame_data, release=lambda: self.__release(buffer), owner=buffer)
+
+    def get_statistics(self):
+        """
+        :brief      pool usage
+        :return:    dict with buffer_num, buffer_size, in_use, high_water_mark and exhausted
+        """
+        with self.__lock:
+            return {
+                "buffer_num": self.buffer_num,
+                "buffer_size": self.buffer_size,
+                "in_use": self.in_use,
+                "high_water_mark": self.high_water_mark,
+                "exhausted": self.exhausted,
+            }
+
+    def __acquire(self, size):
+        with self.__lock:
+            if not self.__free or size > self.buffer_size:
+                self.exhausted += 1
+                return None
+            self.in_use += 1
+            self.high_water_mark = max(self.high_water_mark, self.in_use)
+            return self.__free.pop()
+
+    def __release(self, buffer):
+        with self.__lock:
+            self.in_use -= 1
+            # a resize may have replaced the buffers in use already, the pool never grows past buffer_num
+            if len(buffer) == self.buffer_size and len(self.__free) + self.in_use < self.buffer_num:
+                self.__free.append(buffer)
 
 
 class DataStream:
-    def __init__(self, handle):
+    StreamAnnouncedBufferCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_ANNOUNCED_BUFFER_COUNT)
+    StreamDeliveredFrameCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_DELIVERED_FRAME_COUNT)
+    StreamLostFrameCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_LOST_FRAME_COUNT)
+    StreamIncompleteFrameCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_INCOMPLETE_FRAME_COUNT)
+    StreamDeliveredPacketCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_DELIVERED_PACKET_COUNT)
+
+    def __init__(self, handle, device_cache=None):
+        """
+        :param      handle:         The handle of the device
+        :param      device_cache:   FeatureMetadataCache of the device, its access flags are
+                                    dropped when streaming starts or stops
+        """
         self.__dev_handle = handle
-        self.StreamAnnouncedBufferCount = IntFeature(self.__dev_handle, GxFeatureID.INT_ANNOUNCED_BUFFER_COUNT)
-        self.StreamDeliveredFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_DELIVERED_FRAME_COUNT)
-        self.StreamLostFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_LOST_FRAME_COUNT)
-        self.StreamIncompleteFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_INCOMPLETE_FRAME_COUNT)
-        self.StreamDeliveredPacketCount = IntFeature(self.__dev_handle, GxFeatureID.INT_DELIVERED_PACKET_COUNT)
+        self.__device_cache = device_cache
+        self.feature_cache = FeatureMetadataCache()
         self.payload_size = 0
         self.acquisition_flag = False
+        self.streaming_flag = False
+        self.buffer_pool = FrameBufferPool()
+        self.__outstanding_buffers = set()
+
+    def _create_feature(self, feature_class, feature_id):
+        """
+        :brief      create the feature object behind a FeatureDescriptor
+        :param      feature_class:  Feature subclass
+        :param      feature_id:     The feature code ID
+        :return:    feature object
+        """
+        return feature_class(self.__dev_handle, feature_id, self.feature_cache)
 
     def set_payload_size(self, payload_size):
         self.payload_size = payload_size
+        self.buffer_pool.resize(payload_size)
 
     def set_acquisition_buffer_number(self, buf_num):
         """
@@ -1279,15 +1923,20 @@ class DataStream:
             print("DataStream.get_image: Current data steam don't  start acquisition")
             return None
 
+        if self.streaming_flag is True:
+            print("DataStream.get_image: Current data stream is streaming, use dequeue_buffer")
+            return None
+
         frame_data = GxFrameData()
         frame_data.image_size = self.payload_size
-        frame_data.image_buf = None
-        image = RawImage(frame_data)
+        image = self.buffer_pool.create_image(frame_data)
 
         status = gx_get_image(self.__dev_handle, image.frame_data, timeout)
         if status == GxStatusList.SUCCESS:
             return image
-        elif status == GxStatusList.TIMEOUT:
+
+        image.release()
+        if status == GxStatusList.TIMEOUT:
             return None
         else:
             StatusProcessor.process(status, 'DataStream', 'get_image')
@@ -1297,32 +1946,143 @@ class DataStream:
         status = gx_flush_queue(self.__dev_handle)
         StatusProcessor.process(status, 'DataStream', 'flush_queue')
 
+    def start_streaming(self):
+        """
+        :brief      Start continuous acquisition into the GxIAPI buffer queue(GXStreamOn).
+                    Images are fetched with dequeue_buffer and stay in the SDK buffers,
+                    this mode can not be mixed with Device.stream_on/get_image.
+        :return:    None
+        """
+        if self.streaming_flag is True:
+            return
+
+        status = gx_stream_on(self.__dev_handle)
+        self.__invalidate_access()
+        StatusProcessor.process(status, 'DataStream', 'start_streaming')
+        self.acquisition_flag = True
+        self.streaming_flag = True
+
+    def stop_streaming(self):
+        """
+        :brief      Stop continuous acquisition(GXStreamOff).
+                    Images that were not released yet become invalid.
+        :return:    None
+        """
+        if self.streaming_flag is False:
+            return
+
+        self.streaming_flag = False
+        self.acquisition_flag = False
+        self.__outstanding_buffers.clear()
+        status = gx_stream_off(self.__dev_handle)
+        self.__invalidate_access()
+        StatusProcessor.process(status, 'DataStream', 'stop_streaming')
+
+    def __invalidate_access(self):
+        """
+        :brief      Drop the access flags of the stream and device features, streaming locks some of them
+        :return:    None
+        """
+        self.feature_cache.invalidate_access()
+        if self.__device_cache is not None:
+            self.__device_cache.invalidate_access()
+
+    def dequeue_buffer(self, timeout=1000):
+        """
+        :brief      Get an image from the stream buffer queue without copying it.
+                    The image refers to a buffer owned by GxIAPI, call RawImage.release() to put
+                    the buffer back in the queue, otherwise the acquisition runs out of buffers.
+        :param      timeout:    Acquisition timeout, range:[0, 0xFFFFFFFF]
+        :return:    image object
+        """
+        if not isinstance(timeout, INT_TYPE):
+            raise ParameterTypeError("DataStream.dequeue_buffer: "
+                                     "Expected timeout type is int, not %s" % type(timeout))
+
+        if (timeout < 0) or (timeout > UNSIGNED_INT_MAX):
+            print("DataStream.dequeue_buffer: "
+                  "timeout out of bounds, minimum=0, maximum=%s"
+                  % hex(UNSIGNED_INT_MAX).__str__())
+            return None
+
+        if self.streaming_flag is False:
+            print("DataStream.dequeue_buffer: Current data stream don't start streaming")
+            return None
+
+        status, frame_data, frame_data_p = gx_dequeue_buf(self.__dev_handle, timeout)
+        if status == GxStatusList.SUCCESS:
+            self.__outstanding_buffers.add(frame_data_p)
+            return RawImage(frame_data, release=lambda: self.__queue_buffer(frame_data_p))
+        elif status == GxStatusList.TIMEOUT:
+            return None
+        else:
+            StatusProcessor.process(status, 'DataStream', 'dequeue_buffer')
+            return None
+
+    def __queue_buffer(self, frame_data_p):
+        """
+        :brief      Put a dequeued buffer back in the acquisition queue
+        :param      frame_data_p:   buffer address returned by gx_dequeue_buf
+        :return:    None
+        """
+        if frame_data_p not in self.__outstanding_buffers:
+            # stream was stopped in between, the SDK already reclaimed the buffer
+            return
+
+        self.__outstanding_buffers.discard(frame_data_p)
+        status = gx_queue_buf(self.__dev_handle, frame_data_p)
+        StatusProcessor.process(status, 'DataStream', 'queue_buffer')
+
+    def frames(self, timeout=1000):
+        """
+        :brief      Iterate over streamed images until stop_streaming is called.
+                    Every image must be released before it is dropped.
+        :param      timeout:    Timeout of a single dequeue, range:[0, 0xFFFFFFFF]
+        :return:    image iterator
+        """
+        while self.streaming_flag:
+            image = self.dequeue_buffer(timeout)
+            if image is not None:
+                yield image
+
+    def __enter__(self):
+        self.start_streaming()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_streaming()
+
+    def __iter__(self):
+        return self.frames()
+
 
 class U3VDataStream(DataStream):
-    def __init__(self, handle):
+    StreamTransferSize = FeatureDescriptor(IntFeature, GxFeatureID.INT_STREAM_TRANSFER_SIZE)
+    StreamTransferNumberUrb = FeatureDescriptor(IntFeature, GxFeatureID.INT_STREAM_TRANSFER_NUMBER_URB)
+
+    def __init__(self, handle, device_cache=None):
         self.__handle = handle
-        DataStream.__init__(self, self.__handle)
-        self.StreamTransferSize = IntFeature(self.__handle, GxFeatureID.INT_STREAM_TRANSFER_SIZE)
-        self.StreamTransferNumberUrb = IntFeature(self.__handle, GxFeatureID.INT_STREAM_TRANSFER_NUMBER_URB)
+        DataStream.__init__(self, self.__handle, device_cache)
 
 
 class GEVDataStream(DataStream):
-    def __init__(self, handle):
+    StreamResendPacketCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_RESEND_PACKET_COUNT)
+    StreamRescuedPacketCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_RESCUED_PACKED_COUNT)
+    StreamResendCommandCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_RESEND_COMMAND_COUNT)
+    StreamUnexpectedPacketCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_UNEXPECTED_PACKED_COUNT)
+    MaxPacketCountInOneBlock = FeatureDescriptor(IntFeature, GxFeatureID.INT_MAX_PACKET_COUNT_IN_ONE_BLOCK)
+    MaxPacketCountInOneCommand = FeatureDescriptor(IntFeature, GxFeatureID.INT_MAX_PACKET_COUNT_IN_ONE_COMMAND)
+    ResendTimeout = FeatureDescriptor(IntFeature, GxFeatureID.INT_RESEND_TIMEOUT)
+    MaxWaitPacketCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_MAX_WAIT_PACKET_COUNT)
+    ResendMode = FeatureDescriptor(EnumFeature, GxFeatureID.ENUM_RESEND_MODE)
+    StreamMissingBlockIDCount = FeatureDescriptor(IntFeature, GxFeatureID.INT_MISSING_BLOCK_ID_COUNT)
+    BlockTimeout = FeatureDescriptor(IntFeature, GxFeatureID.INT_BLOCK_TIMEOUT)
+    MaxNumQueueBuffer = FeatureDescriptor(IntFeature, GxFeatureID.INT_MAX_NUM_QUEUE_BUFFER)
+    PacketTimeout = FeatureDescriptor(IntFeature, GxFeatureID.INT_PACKET_TIMEOUT)
+
+    def __init__(self, handle, device_cache=None):
         self.__handle = handle
-        DataStream.__init__(self, self.__handle)
-        self.StreamResendPacketCount = IntFeature(self.__handle, GxFeatureID.INT_RESEND_PACKET_COUNT)
-        self.StreamRescuedPacketCount = IntFeature(self.__handle, GxFeatureID.INT_RESCUED_PACKED_COUNT)
-        self.StreamResendCommandCount = IntFeature(self.__handle, GxFeatureID.INT_RESEND_COMMAND_COUNT)
-        self.StreamUnexpectedPacketCount = IntFeature(self.__handle, GxFeatureID.INT_UNEXPECTED_PACKED_COUNT)
-        self.MaxPacketCountInOneBlock = IntFeature(self.__handle, GxFeatureID.INT_MAX_PACKET_COUNT_IN_ONE_BLOCK)
-        self.MaxPacketCountInOneCommand = IntFeature(self.__handle, GxFeatureID.INT_MAX_PACKET_COUNT_IN_ONE_COMMAND)
-        self.ResendTimeout = IntFeature(self.__handle, GxFeatureID.INT_RESEND_TIMEOUT)
-        self.MaxWaitPacketCount = IntFeature(self.__handle, GxFeatureID.INT_MAX_WAIT_PACKET_COUNT)
-        self.ResendMode = EnumFeature(self.__handle, GxFeatureID.ENUM_RESEND_MODE)
-        self.StreamMissingBlockIDCount = IntFeature(self.__handle, GxFeatureID.INT_MISSING_BLOCK_ID_COUNT)
-        self.BlockTimeout = IntFeature(self.__handle, GxFeatureID.INT_BLOCK_TIMEOUT)
-        self.MaxNumQueueBuffer = IntFeature(self.__handle, GxFeatureID.INT_MAX_NUM_QUEUE_BUFFER)
-        self.PacketTimeout = IntFeature(self.__handle, GxFeatureID.INT_PACKET_TIMEOUT)
+        DataStream.__init__(self, self.__handle, device_cache)
 
 
 class UnexpectedError(Exception):
@@ -1465,6 +2225,18 @@ class ParameterTypeError(Exception):
         Exception.__init__(self, args)
 
 
+class FeatureApplyError(Exception):
+    """
+    brief:  Device.apply could not write one or more features
+    param:  args            exception description
+    param:  errors          {feature name: reason}
+    return: none
+    """
+    def __init__(self, args, errors):
+        Exception.__init__(self, args)
+        self.errors = errors
+
+
 def exception_deal(status, args):
     """
     brief:  deal with different exception
@@ -1541,15 +2313,34 @@ class StatusProcessor:
 
 
 class RGBImage:
-    def __init__(self, frame_data):
+    def __init__(self, frame_data, owner=None):
+        """
+        :param      frame_data:     GxFrameData, when image_buf is set the buffer is wrapped in place
+                                    instead of copied
+        :param      owner:          object owning image_buf, referenced so that the buffer stays valid
+                                    as long as this image is alive
+        """
         self.frame_data = frame_data
+        self.__owner = owner
 
         if self.frame_data.image_buf is not None:
-            self.__image_array = string_at(self.frame_data.image_buf, self.frame_data.image_size)
+            self.__image_array = (c_ubyte * self.frame_data.image_size).from_address(self.frame_data.image_buf)
         else:
             self.__image_array = (c_ubyte * self.frame_data.image_size)()
             self.frame_data.image_buf = addressof(self.__image_array)
 
+    def copy(self):
+        """
+        :brief      Copy the image into a buffer owned by the returned object
+        :return:    RGBImage object
+        """
+        frame_data = GxFrameData()
+        memmove(addressof(frame_data), addressof(self.frame_data), sizeof(GxFrameData))
+        frame_data.image_buf = None
+        image = RGBImage(frame_data)
+        memmove(image.frame_data.image_buf, self.__image_array, self.frame_data.image_size)
+        return image
+
     def image_improvement(self, color_correction_param=0, contrast_lut=None, gamma_lut=None):
         """
         :brief:     Improve image quality of the object itself
@@ -1623,7 +2414,8 @@ class RGBImage:
 
     def get_numpy_array(self):
         """
-        :brief:     Return data as a numpy.Array type with dimension Image.height * Image.width * 3
+        :brief:     Return data as a numpy.Array type with dimension Image.height * Image.width * 3,
+                    the array is a view of the image buffer, use copy() to detach it from the owner
         :return:    numpy.Array objects
         """
         image_np = numpy.frombuffer(self.__image_array, dtype=numpy.ubyte).reshape(self.frame_data.height, self.frame_data.width, 3)
@@ -1638,15 +2430,74 @@ class RGBImage:
 
 
 class RawImage:
-    def __init__(self, frame_data):
+    # {image size: FrameBufferPool} of the raw8 step of convert
+    __scratch_pools = {}
+    __scratch_lock = threading.Lock()
+
+    def __init__(self, frame_data, release=None, owner=None):
+        """
+        :param      frame_data:     GxFrameData, when image_buf is set the buffer is wrapped in place
+                                    instead of copied, use copy() when the image has to outlive the buffer
+        :param      release:        callback that gives image_buf back to its owner, the buffer stays
+                                    valid until release() is called
+        :param      owner:          object owning image_buf, referenced so that the buffer stays valid
+                                    as long as this image is alive
+        """
         self.frame_data = frame_data
+        self.__release = release
+        self.__owner = owner
+        # pixels of a packed format, unpacked by the first get_numpy_array
+        self.__unpacked = None
 
         if self.frame_data.image_buf is not None:
-            self.__image_array = string_at(self.frame_data.image_buf, self.frame_data.image_size)
+            self.__image_array = (c_ubyte * self.frame_data.image_size).from_address(self.frame_data.image_buf)
         else:
             self.__image_array = (c_ubyte * self.frame_data.image_size)()
             self.frame_data.image_buf = addressof(self.__image_array)
 
+    def release(self):
+        """
+        :brief      Give the image buffer back to its owner(e.g. the stream buffer queue).
+                    Numpy arrays obtained from this image must not be used afterwards.
+        :return:    None
+        """
+        release, self.__release = self.__release, None
+        self.__unpacked = None
+        if release is not None:
+            release()
+
+    def detach(self):
+        """
+        :brief      Hand the image buffer over to the caller, release() no longer gives it back.
+                    Numpy arrays obtained from this image stay valid until the returned callback is called.
+        :return:    callback giving the buffer back to its owner, None when the image owns the buffer
+        """
+        release, self.__release = self.__release, None
+        return release
+
+    def copy(self, buffer_pool=None):
+        """
+        :brief      Copy the image into a buffer owned by the returned object
+        :param      buffer_pool:    FrameBufferPool to take the buffer from, the copy gives
+                                    it back on release()
+        :return:    RawImage object
+        """
+        frame_data = GxFrameData()
+        memmove(addressof(frame_data), addressof(self.frame_data), sizeof(GxFrameData))
+        if buffer_pool is None:
+            frame_data.image_buf = None
+            image = RawImage(frame_data)
+        else:
+            image = buffer_pool.create_image(frame_data)
+        memmove(image.frame_data.image_buf, self.__image_array, self.frame_data.image_size)
+        return image
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
     def __get_bit_depth(self, pixel_format):
         """
         :brief      Calculate pixel depth based on pixel format
@@ -1662,7 +2513,9 @@ class RawImage:
         bpp16_tup = (GxPixelFormatEntry.MONO16, GxPixelFormatEntry.BAYER_GR16, GxPixelFormatEntry.BAYER_RG16,
                      GxPixelFormatEntry.BAYER_GB16, GxPixelFormatEntry.BAYER_BG16)
 
-        if (pixel_format & PIXEL_BIT_MASK) == GX_PIXEL_8BIT:
+        if pixel_format in PACKED_PIXEL_FORMATS:
+            return self.__get_bit_depth(PACKED_PIXEL_FORMATS[pixel_format][0])
+        elif (pixel_format & PIXEL_BIT_MASK) == GX_PIXEL_8BIT:
             return GxPixelSizeEntry.BPP8
         elif pixel_format in bpp10_tup:
             return GxPixelSizeEntry.BPP10
@@ -1736,11 +2589,54 @@ class RawImage:
         else:
             return -1
 
-    def __raw16_to_raw8(self, pixel_bit_depth, valid_bits):
+    def __scratch_raw8(self):
+        """
+        :brief      raw8 image of this size backed by a scratch buffer, release() gives the buffer back
+        :return:    RawImage object
+        """
+        image_size = self.frame_data.width * self.frame_data.height
+        with RawImage.__scratch_lock:
+            pool = RawImage.__scratch_pools.get(image_size)
+            if pool is None:
+                if len(RawImage.__scratch_pools) >= CONVERT_SCRATCH_SIZES:
+                    del RawImage.__scratch_pools[next(iter(RawImage.__scratch_pools))]
+                pool = FrameBufferPool(buffer_num=2)
+                pool.resize(image_size)
+                RawImage.__scratch_pools[image_size] = pool
+
+        frame_data = GxFrameData()
+        frame_data.image_size = image_size
+        return pool.create_image(frame_data)
+
+    def __output_image(self, image_class, pixel_format, image_size, out):
+        """
+        :brief      image receiving a convert result, carrying the frame information of this image
+        :param      image_class:        RawImage or RGBImage
+        :param      pixel_format:       pixel format of the result
+        :param      image_size:         size of the result in bytes
+        :param      out:                image to reuse, None to create one
+        :return:    out or the new image
+        """
+        if out is None:
+            frame_data = GxFrameData()
+            frame_data.image_size = image_size
+            frame_data.image_buf = None
+            out = image_class(frame_data)
+
+        out.frame_data.status = self.frame_data.status
+        out.frame_data.width = self.frame_data.width
+        out.frame_data.height = self.frame_data.height
+        out.frame_data.pixel_format = pixel_format
+        out.frame_data.frame_id = self.frame_data.frame_id
+        out.frame_data.timestamp = self.frame_data.timestamp
+        return out
+
+    def __raw16_to_raw8(self, pixel_bit_depth, valid_bits, out=None):
         """
         :brief      convert raw16 to raw8
         :param      pixel_bit_depth     pixel bit depth
         :param      valid_bits:         data valid digit[DxValidBit]
+        :param      out:                raw8 RAWImage object to write to, None to create one
         :return:    RAWImage object
         """
         if pixel_bit_depth == GxPixelSizeEntry.BPP10:
@@ -1751,17 +2647,8 @@ class RawImage:
             print("RawImage.__dx_raw16_to_raw8: Only support 10bit and 12bit")
             return None
 
-        frame_data = GxFrameData()
-        frame_data.status = self.frame_data.status
-        frame_data.width = self.frame_data.width
-        frame_data.height = self.frame_data.height
-        frame_data.pixel_format = self.__pixel_format_raw16_to_raw8(self.frame_data.pixel_format)
-        frame_data.image_size = self.frame_data.width * self.frame_data.height
-        frame_data.frame_id = self.frame_data.frame_id
-        frame_data.timestamp = self.frame_data.timestamp
-        # frame_data.buf_id = self.frame_data.buf_id
-        frame_data.image_buf = None
-        image_raw8 = RawImage(frame_data)
+        image_raw8 = self.__output_image(RawImage, self.__pixel_format_raw16_to_raw8(self.frame_data.pixel_format),
+                                         self.frame_data.width * self.frame_data.height, out)
 
         status = dx_raw16_to_raw8(self.frame_data.image_buf, image_raw8.frame_data.image_buf,
                                   self.frame_data.width, self.frame_data.height, valid_bits)
@@ -1772,7 +2659,7 @@ class RawImage:
         else:
             return image_raw8
 
-    def __raw8_to_rgb(self, raw8_image, convert_type, pixel_color_filter, flip):
+    def __raw8_to_rgb(self, raw8_image, convert_type, pixel_color_filter, flip, out=None):
         """
         :brief      convert raw8 to RGB
         :param      raw8_image          RAWImage object, bit depth is 8bit
@@ -1781,19 +2668,11 @@ class RawImage:
         :param      flip:               Output image flip flag
                                         True: turn the image upside down
                                         False: do not flip
-        :return:    RAWImage object
+        :param      out:                RGBImage object to write to, None to create one
+        :return:    RGBImage object
         """
-        frame_data = GxFrameData()
-        frame_data.status = raw8_image.frame_data.status
-        frame_data.width = raw8_image.frame_data.width
-        frame_data.height = raw8_image.frame_data.height
-        frame_data.pixel_format = GxPixelFormatEntry.RGB8_PLANAR
-        frame_data.image_size = raw8_image.frame_data.width * raw8_image.frame_data.height * 3
-        frame_data.frame_id = raw8_image.frame_data.frame_id
-        frame_data.timestamp = raw8_image.frame_data.timestamp
-        # frame_data.buf_id = self.frame_data.buf_id
-        frame_data.image_buf = None
-        image_rgb = RGBImage(frame_data)
+        image_rgb = self.__output_image(RGBImage, GxPixelFormatEntry.RGB8_PLANAR,
+                                        raw8_image.frame_data.width * raw8_image.frame_data.height * 3, out)
 
         status = dx_raw8_to_rgb24(raw8_image.frame_data.image_buf, image_rgb.frame_data.image_buf,
                                   raw8_image.frame_data.width, raw8_image.frame_data.height,
@@ -1805,7 +2684,7 @@ class RawImage:
         return image_rgb
 
     def convert(self, mode, flip=False, valid_bits=DxValidBit.BIT4_11,
-                convert_type=DxBayerConvertType.NEIGHBOUR):
+                convert_type=DxBayerConvertType.NEIGHBOUR, out=None):
         """
         :brief      Image format convert
         :param      mode:           "RAW8":     convert raw16 RAWImage object to raw8 RAWImage object
@@ -1815,12 +2694,17 @@ class RawImage:
                                     False: do not flip
         :param      valid_bits:     Data valid digit, See detail in DxValidBit, raw8 don't this param
         :param      convert_type:   Bayer convert type, See detail in DxBayerConvertType
+        :param      out:            image of the same size to write the result to instead of creating one,
+                                    RawImage for "RAW8", RGBImage for "RGB"
         :return:    return image object according to mode parameter
         """
         if self.frame_data.status != GxFrameStatusList.SUCCESS:
             print("RawImage.convert: This is a incomplete image")
             return None
 
+        if self.frame_data.pixel_format in PACKED_PIXEL_FORMATS:
+            return self.unpack().convert(mode, flip, valid_bits, convert_type, out)
+
         if not isinstance(flip, bool):
             raise ParameterTypeError("RawImage.convert: "
                                      "Expected flip type is bool, not %s" % type(flip))
@@ -1837,18 +2721,25 @@ class RawImage:
             raise ParameterTypeError("RawImage.convert: "
                                      "Expected mode type is str, not %s" % type(mode))
 
-        convert_type_dict = dict((name, getattr(DxBayerConvertType, name))
-                                 for name in dir(DxBayerConvertType) if not name.startswith('__'))
-        if convert_type not in convert_type_dict.values():
-            print("RawImage.convert: convert_type out of bounds, %s" % convert_type_dict.__str__())
+        if convert_type not in CONVERT_TYPE_VALUES:
+            print("RawImage.convert: convert_type out of bounds, %s" % CONVERT_TYPE_DICT.__str__())
             return None
 
-        valid_bits_dict = dict((name, getattr(DxValidBit, name))
-                               for name in dir(DxValidBit) if not name.startswith('__'))
-        if valid_bits not in valid_bits_dict.values():
-            print("RawImage.convert: valid_bits out of bounds, %s" % valid_bits_dict.__str__())
+        if valid_bits not in VALID_BITS_VALUES:
+            print("RawImage.convert: valid_bits out of bounds, %s" % VALID_BITS_DICT.__str__())
             return None
 
+        if out is not None:
+            out_class, out_size = (RGBImage, 3) if mode == "RGB" else (RawImage, 1)
+            out_size *= self.frame_data.width * self.frame_data.height
+            if not isinstance(out, out_class):
+                raise ParameterTypeError("RawImage.convert: "
+                                         "Expected out type is %s, not %s" % (out_class.__name__, type(out)))
+
+            if out.frame_data.image_size != out_size:
+                print("RawImage.convert: out size is %s, expected %s" % (out.frame_data.image_size, out_size))
+                return None
+
         pixel_bit_depth = self.__get_bit_depth(self.frame_data.pixel_format)
         pixel_color_filter = self.__get_pixel_color_filter(self.frame_data.pixel_format)
 
@@ -1863,17 +2754,18 @@ class RawImage:
                 return None
 
             if pixel_bit_depth in (GxPixelSizeEntry.BPP10, GxPixelSizeEntry.BPP12):
-                image_raw8 = self.__raw16_to_raw8(pixel_bit_depth, valid_bits)
+                image_raw8 = self.__raw16_to_raw8(pixel_bit_depth, valid_bits, out)
                 return image_raw8
             else:
                 print('RawImage.convert: mode="RAW8" only support 10bit and 12bit')
         elif mode == "RGB":
-            if pixel_bit_depth in (GxPixelSizeEntry.BPP10, GxPixelSizeEntry.BPP12):
-                image_raw8 = self.__raw16_to_raw8(pixel_bit_depth, valid_bits)
-            else:
-                image_raw8 = self
+            if pixel_bit_depth not in (GxPixelSizeEntry.BPP10, GxPixelSizeEntry.BPP12):
+                return self.__raw8_to_rgb(self, convert_type, pixel_color_filter, flip, out)
 
-            return self.__raw8_to_rgb(image_raw8, convert_type, pixel_color_filter, flip)
+            # the intermediate raw8 image only lives during the conversion
+            with self.__scratch_raw8() as image_raw8:
+                self.__raw16_to_raw8(pixel_bit_depth, valid_bits, image_raw8)
+                return self.__raw8_to_rgb(image_raw8, convert_type, pixel_color_filter, flip, out)
         else:
             print('''RawImage.convert: mode="%s", isn't support''' % mode)
             return None
@@ -1886,6 +2778,10 @@ class RawImage:
                     This function should be used in each frame.
         :return:    None
         """
+        if self.frame_data.pixel_format in PACKED_PIXEL_FORMATS:
+            print("RawImage.defective_pixel_correct: packed pixel formats are not supported, unpack() first")
+            return
+
         pixel_bit_depth = self.__get_bit_depth(self.frame_data.pixel_format)
         status = dx_auto_raw_defective_pixel_correct(self.frame_data.image_buf, self.frame_data.width,
                                                      self.frame_data.height, pixel_bit_depth)
@@ -1893,9 +2789,13 @@ class RawImage:
         if status != DxStatus.OK:
             raise UnexpectedError("RawImage.defective_pixel_correct: failed, error code:%s" % hex(status).__str__())
 
-    def get_numpy_array(self):
+    def get_numpy_array(self, out=None):
         """
-        :brief      Return data as a numpy.Array type with dimension Image.height * Image.width
+        :brief      Return data as a numpy.Array type with dimension Image.height * Image.width,
+                    the array is a view of the image buffer, use copy() to detach it from the owner.
+                    Packed formats are unpacked to numpy.uint16.
+        :param      out:    numpy.uint16 array of Image.height * Image.width for the unpacked pixels
+                            of packed formats, None to unpack once into an array kept by the image
         :return:    numpy.Array objects
         """
         if self.frame_data.status != GxFrameStatusList.SUCCESS:
@@ -1904,7 +2804,15 @@ class RawImage:
 
         image_size = self.frame_data.width * self.frame_data.height
 
-        if self.frame_data.pixel_format & PIXEL_BIT_MASK == GX_PIXEL_8BIT:
+        if self.frame_data.pixel_format in PACKED_PIXEL_FORMATS:
+            if out is not None:
+                image_np = self.__unpack_array(out)
+            elif self.__unpacked is not None:
+                image_np = self.__unpacked
+            else:
+                image_np = numpy.empty((self.frame_data.height, self.frame_data.width), dtype=numpy.uint16)
+                self.__unpacked = self.__unpack_array(image_np)
+        elif self.frame_data.pixel_format & PIXEL_BIT_MASK == GX_PIXEL_8BIT:
             image_np = numpy.frombuffer(self.__image_array, dtype=numpy.ubyte, count=image_size).\
                 reshape(self.frame_data.height, self.frame_data.width)
         elif self.frame_data.pixel_format & PIXEL_BIT_MASK == GX_PIXEL_16BIT:
@@ -1915,6 +2823,93 @@ class RawImage:
 
         return image_np
 
+    def get_display_array(self, window=None, out=None):
+        """
+        :brief      Return the image as numpy.uint8 array for display, pixel values of more than 8 bit are
+                    scaled from window to 0 ~ 255
+        :param      window:     (low, high) pixel values mapped to 0 and 255, None for the full range of
+                                the pixel format, 8 bit images are returned as they are without window
+        :param      out:        numpy.uint8 array of Image.height * Image.width, None to create one
+        :return:    numpy.Array objects
+        """
+        image_np = self.get_numpy_array()
+        if image_np is None:
+            return None
+
+        if image_np.dtype == numpy.uint8 and window is None:
+            if out is None:
+                return image_np
+            numpy.copyto(out, image_np)
+            return out
+
+        bit_depth = self.__get_bit_depth(self.frame_data.pixel_format)
+        low, high = (0, (1 << bit_depth) - 1) if window is None else window
+        if high <= low:
+            print("RawImage.get_display_array: window high must be larger than low")
+            return None
+
+        levels = numpy.arange(1 << bit_depth, dtype=numpy.float32)
+        lut = numpy.clip((levels - low) * (255.0 / (high - low)), 0, 255).astype(numpy.uint8)
+        return numpy.take(lut, image_np, out=out, mode='clip')
+
+    def unpack(self, out=None):
+        """
+        :brief      Unpack an image of a packed pixel format to 16 bit per pixel(e.g. MONO12_PACKED to MONO12)
+        :param      out:        RawImage of Image.height * Image.width * 2 bytes to write to, None to create one
+        :return:    RawImage object, the image itself when its pixel format is not packed
+        """
+        if self.frame_data.pixel_format not in PACKED_PIXEL_FORMATS:
+            return self
+
+        image_size = self.frame_data.width * self.frame_data.height * 2
+        if out is not None:
+            if not isinstance(out, RawImage):
+                raise ParameterTypeError("RawImage.unpack: "
+                                         "Expected out type is RawImage, not %s" % type(out))
+
+            if out.frame_data.image_size != image_size:
+                print("RawImage.unpack: out size is %s, expected %s" % (out.frame_data.image_size, image_size))
+                return None
+
+        image = self.__output_image(RawImage, PACKED_PIXEL_FORMATS[self.frame_data.pixel_format][0],
+                                    image_size, out)
+        self.__unpack_array(numpy.frombuffer(image.__image_array, dtype=numpy.uint16).
+                            reshape(self.frame_data.height, self.frame_data.width))
+        return image
+
+    def __unpack_array(self, out):
+        """
+        :brief      Unpack the pixels of a packed format
+        :param      out:        numpy.uint16 array of Image.height * Image.width
+        :return:    out
+        """
+        unpacked_format, group_pixels, group_bytes, layout = PACKED_PIXEL_FORMATS[self.frame_data.pixel_format]
+        pixel_num = self.frame_data.width * self.frame_data.height
+        group_num = -(-pixel_num // group_pixels)
+
+        packed = numpy.frombuffer(self.__image_array, dtype=numpy.ubyte)[:group_num * group_bytes]
+        if packed.size < group_num * group_bytes:
+            packed = numpy.concatenate((packed, numpy.zeros(group_num * group_bytes - packed.size, numpy.ubyte)))
+        packed = packed.reshape(group_num, group_bytes)
+
+        # the last group is incomplete when the pixel number is not a multiple of the group size
+        complete = group_num * group_pixels == pixel_num
+        if complete:
+            groups = out.reshape(group_num, group_pixels)
+        else:
+            groups = numpy.empty((group_num, group_pixels), dtype=numpy.uint16)
+
+        for pixel, parts in enumerate(layout):
+            target = groups[:, pixel]
+            target[...] = 0
+            for byte, right_shift, mask, left_shift in parts:
+                part = numpy.bitwise_and(numpy.right_shift(packed[:, byte], right_shift), mask)
+                target |= numpy.left_shift(part, left_shift, dtype=numpy.uint16)
+
+        if not complete:
+            out.reshape(-1)[...] = groups.reshape(-1)[:pixel_num]
+        return out
+
     def get_data(self):
         """
         :brief      get Raw data
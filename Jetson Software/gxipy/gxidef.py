@@ -112,6 +112,10 @@ class GxPixelFormatEntry:
     MONO12 = (GX_PIXEL_MONO | GX_PIXEL_16BIT | 0x0005)  # 0x1100005
     MONO14 = (GX_PIXEL_MONO | GX_PIXEL_16BIT | 0x0025)  # 0x1100025
     MONO16 = (GX_PIXEL_MONO | GX_PIXEL_16BIT | 0x0007)  # 0x1100007
+    MONO10_PACKED = (GX_PIXEL_MONO | GX_PIXEL_12BIT | 0x0004)  # 0x10C0004
+    MONO12_PACKED = (GX_PIXEL_MONO | GX_PIXEL_12BIT | 0x0006)  # 0x10C0006
+    MONO10_P = (GX_PIXEL_MONO | GX_PIXEL_10BIT | 0x0046)  # 0x10A0046
+    MONO12_P = (GX_PIXEL_MONO | GX_PIXEL_12BIT | 0x0047)  # 0x10C0047
     BAYER_GR8 = (GX_PIXEL_MONO | GX_PIXEL_8BIT | 0x0008)  # 0x1080008
     BAYER_RG8 = (GX_PIXEL_MONO | GX_PIXEL_8BIT | 0x0009)  # 0x1080009
     BAYER_GB8 = (GX_PIXEL_MONO | GX_PIXEL_8BIT | 0x000A)  # 0x108000A
@@ -137,6 +141,26 @@ class GxPixelFormatEntry:
         pass
 
 
+# packed pixel format: (unpacked pixel format, pixels per group, bytes per group, layout), the layout
+# lists for every pixel of a group the parts it is made of as (byte, right shift, mask, left shift)
+PACKED_PIXEL_FORMATS = {
+    GxPixelFormatEntry.MONO10_PACKED: (GxPixelFormatEntry.MONO10, 2, 3, (
+        ((0, 0, 0xFF, 2), (1, 0, 0x03, 0)),
+        ((2, 0, 0xFF, 2), (1, 4, 0x03, 0)))),
+    GxPixelFormatEntry.MONO12_PACKED: (GxPixelFormatEntry.MONO12, 2, 3, (
+        ((0, 0, 0xFF, 4), (1, 0, 0x0F, 0)),
+        ((2, 0, 0xFF, 4), (1, 4, 0x0F, 0)))),
+    GxPixelFormatEntry.MONO10_P: (GxPixelFormatEntry.MONO10, 4, 5, (
+        ((0, 0, 0xFF, 0), (1, 0, 0x03, 8)),
+        ((1, 2, 0x3F, 0), (2, 0, 0x0F, 6)),
+        ((2, 4, 0x0F, 0), (3, 0, 0x3F, 4)),
+        ((3, 6, 0x03, 0), (4, 0, 0xFF, 2)))),
+    GxPixelFormatEntry.MONO12_P: (GxPixelFormatEntry.MONO12, 2, 3, (
+        ((0, 0, 0xFF, 0), (1, 0, 0x0F, 8)),
+        ((1, 4, 0x0F, 0), (2, 0, 0xFF, 4)))),
+}
+
+
 class GxAcquisitionModeEntry:
     SINGLE_FRAME = 0
     MULITI_FRAME = 1
@@ -0,0 +1,1029 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# -*-mode:python ; tab-width:4 -*- ex:set tabstop=4 shiftwidth=4 expandtab: -*-
+#
+# Simulated GxIAPI library. With the environment variable GXIPY_BACKEND=sim, gxwrapper uses an instance of
+# SimulatedGxIAPI instead of libgxiapi.so, so gxipy and everything above it runs without a camera attached.
+# The simulator takes the same ctypes arguments as the C library, all gx_* functions are unchanged.
+# The simulated cameras are configured with GXIPY_SIM_* environment variables, see SimConfig, and
+# gxwrapper.dll gives access to the simulator at runtime, e.g. gxwrapper.dll.unplug('SIM00001').
+
+from ctypes import *
+import os
+import threading
+import time
+from collections import deque
+
+import numpy
+
+from gxipy.gxidef import *
+# gxwrapper imports this module after the definitions below
+from gxipy.gxwrapper import GxStatusList, GxOpenMode, GxFrameMask, GxFeatureType, GxFeatureID, \
+    GxFrameData, GxFrameCallbackParam
+
+
+def _value(arg):
+    """
+    :brief      value of an argument passed as a ctypes simple type or as a python value
+    """
+    return arg.value if hasattr(arg, 'value') else arg
+
+
+def _target(ref):
+    """
+    :brief      the ctypes object passed with byref()
+    """
+    return ref._obj
+
+
+class SimConfig:
+    """
+    Settings of the simulated cameras, read from the environment
+        GXIPY_SIM_DEVICES         number of cameras (1)
+        GXIPY_SIM_WIDTH           sensor width (5496)
+        GXIPY_SIM_HEIGHT          sensor height (3672)
+        GXIPY_SIM_TRIGGER_RATE    average number of LINE0 trigger pulses (passing flies) per second (5.0)
+        GXIPY_SIM_FLY_LENGTH      length of a fly in pixels (400)
+        GXIPY_SIM_EMPTY_RATIO     fraction of frames without a fly (0.0)
+        GXIPY_SIM_SEED            random seed of the image generator (none)
+    """
+    def __init__(self):
+        self.device_num = int(os.environ.get('GXIPY_SIM_DEVICES', 1))
+        self.sensor_width = int(os.environ.get('GXIPY_SIM_WIDTH', 5496))
+        self.sensor_height = int(os.environ.get('GXIPY_SIM_HEIGHT', 3672))
+        self.trigger_rate = float(os.environ.get('GXIPY_SIM_TRIGGER_RATE', 5.0))
+        self.fly_length = int(os.environ.get('GXIPY_SIM_FLY_LENGTH', 400))
+        self.empty_ratio = float(os.environ.get('GXIPY_SIM_EMPTY_RATIO', 0.0))
+        seed = os.environ.get('GXIPY_SIM_SEED')
+        self.seed = None if seed is None else int(seed)
+
+
+class FlyImageGenerator:
+    """
+    Synthetic top view images of a back lit tray: a bright noisy background with one dark fly
+    at a random position and orientation
+    """
+    __ROTATIONS = 16
+
+    def __init__(self, width, height, fly_length=400, empty_ratio=0.0, seed=None):
+        """
+        :param      width:          sensor width
+        :param      height:         sensor height
+        :param      fly_length:     fly length in pixels
+        :param      empty_ratio:    fraction of the images without a fly
+        :param      seed:           random seed
+        """
+        self.empty_ratio = empty_ratio
+        self.rng = numpy.random.default_rng(seed)
+        noise = self.rng.normal(200.0, 4.0, (height, width)).astype(numpy.float32)
+        self.background = numpy.clip(noise, 0, 255).astype(numpy.uint8)
+        self.sprites = [self.__fly_sprite(fly_length, numpy.pi * i / self.__ROTATIONS)
+                        for i in range(2 * self.__ROTATIONS)]
+        self.__scratch = None
+
+    @staticmethod
+    def __fly_sprite(length, angle):
+        """
+        :brief      opacity of a fly (body, head and two wings) rotated by angle
+        :return:    float32 array, 0 transparent to 1 opaque
+        """
+        size = int(length * 1.2) | 1
+        half = size // 2
+        y, x = numpy.mgrid[-half:half + 1, -half:half + 1].astype(numpy.float32)
+        # rotate the coordinates, the fly points along u
+        u = x * numpy.cos(angle) + y * numpy.sin(angle)
+        v = -x * numpy.sin(angle) + y * numpy.cos(angle)
+
+        body = ((u / (0.35 * length)) ** 2 + (v / (0.12 * length)) ** 2) <= 1.0
+        head = ((u - 0.38 * length) ** 2 + v ** 2) <= (0.09 * length) ** 2
+        wing_u = u + 0.15 * length
+        wings = (((wing_u / (0.3 * length)) ** 2 + ((numpy.abs(v) - 0.14 * length) / (0.1 * length)) ** 2) <= 1.0)
+
+        alpha = numpy.zeros((size, size), dtype=numpy.float32)
+        alpha[wings] = 0.35
+        alpha[body | head] = 0.85
+        return alpha
+
+    def render(self, out, offset_x, offset_y, bits=8):
+        """
+        :brief      Render an image of the region at offset_x, offset_y into out
+        :param      out:        uint8 (bits=8) or uint16 array of the region size
+        :param      offset_x:   region offset on the sensor
+        :param      offset_y:   region offset on the sensor
+        :param      bits:       significant bits of a pixel
+        :return:    True when a fly was drawn
+        """
+        height, width = out.shape
+        if bits == 8:
+            frame = out
+        else:
+            if self.__scratch is None or self.__scratch.shape != out.shape:
+                self.__scratch = numpy.empty(out.shape, dtype=numpy.uint8)
+            frame = self.__scratch
+
+        numpy.copyto(frame, self.background[offset_y:offset_y + height, offset_x:offset_x + width])
+        has_fly = self.rng.random() >= self.empty_ratio
+        if has_fly:
+            self.__draw_fly(frame)
+
+        if bits != 8:
+            out[...] = frame
+            out <<= bits - 8
+        return has_fly
+
+    def __draw_fly(self, frame):
+        sprite = self.sprites[self.rng.integers(len(self.sprites))]
+        size = sprite.shape[0]
+        height, width = frame.shape
+        top = int(self.rng.integers(-size // 4, max(height - 3 * size // 4, 1)))
+        left = int(self.rng.integers(-size // 4, max(width - 3 * size // 4, 1)))
+
+        y0, x0 = max(top, 0), max(left, 0)
+        y1, x1 = min(top + size, height), min(left + size, width)
+        if y1 <= y0 or x1 <= x0:
+            return
+        alpha = sprite[y0 - top:y1 - top, x0 - left:x1 - left]
+        patch = frame[y0:y1, x0:x1]
+        # the fly body is dark brown, about 40 grey levels on the light table
+        patch[...] = (patch * (1.0 - alpha) + 40.0 * alpha).astype(numpy.uint8)
+
+
+class _SimFeature:
+    def __init__(self, name, value=None, min_value=0, max_value=0, inc=1, entries=None, max_length=64,
+                 writable=True, locked=False, unit='', getter=None, range_getter=None):
+        """
+        :param      name:           feature name
+        :param      value:          initial value
+        :param      min_value:      int/float minimum
+        :param      max_value:      int/float maximum
+        :param      inc:            int increment
+        :param      entries:        enum entries {symbolic: value}
+        :param      max_length:     string maximum length
+        :param      writable:       False for read only features
+        :param      locked:         not writable while acquiring
+        :param      unit:           float unit
+        :param      getter:         function returning the value of a computed feature
+        :param      range_getter:   function returning (min, max) of a dynamic range
+        """
+        self.name = name
+        self.value = value
+        self.min_value = min_value
+        self.max_value = max_value
+        self.inc = inc
+        self.entries = entries or {}
+        self.max_length = max_length
+        self.writable = writable
+        self.locked = locked
+        self.unit = unit
+        self.getter = getter
+        self.range_getter = range_getter
+
+    def get(self):
+        return self.getter() if self.getter is not None else self.value
+
+    def get_range(self):
+        if self.range_getter is not None:
+            return self.range_getter()
+        return self.min_value, self.max_value
+
+
+def _pack(pixels, pixel_format, out):
+    """
+    :brief      pack uint16 pixels into the bytes of a packed pixel format, see PACKED_PIXEL_FORMATS
+    :param      pixels:         uint16 array
+    :param      pixel_format:   packed pixel format
+    :param      out:            uint8 array of the payload size
+    """
+    unpacked_format, group_pixels, group_bytes, layout = PACKED_PIXEL_FORMATS[pixel_format]
+    group_num = -(-pixels.size // group_pixels)
+    flat = pixels.reshape(-1)
+    if flat.size < group_num * group_pixels:
+        flat = numpy.concatenate((flat, numpy.zeros(group_num * group_pixels - flat.size, numpy.uint16)))
+    groups = flat.reshape(group_num, group_pixels)
+
+    packed = numpy.zeros((group_num, group_bytes), dtype=numpy.uint8)
+    for pixel, parts in enumerate(layout):
+        for byte, right_shift, mask, left_shift in parts:
+            part = ((groups[:, pixel] >> left_shift) & mask).astype(numpy.uint8)
+            packed[:, byte] |= part << right_shift
+    out[...] = packed.reshape(-1)[:out.size]
+
+
+class _SimBuffer:
+    """
+    Image buffer of the simulated stream, frame is the GxFrameData handed out by GXDQBuf
+    """
+    def __init__(self, size):
+        self.array = (c_ubyte * size)()
+        self.frame = GxFrameData()
+        self.frame.image_buf = addressof(self.array)
+
+
+class _SimDevice:
+    def __init__(self, index, config):
+        self.index = index
+        self.config = config
+        self.serial_number = 'SIM%05d' % index
+        self.model_name = 'MER2-2000-19U3M-SIM'
+        self.handle = None
+        self.online = True
+        self.acquiring = False
+        self.streaming = False
+        self.capture_callback = None
+        self.offline_callbacks = {}
+        self.feature_callbacks = {}
+        self.buffer_num = 5
+        self.frame_id = 0
+        self.delivered = 0
+        self.lost = 0
+        self.frame_times = deque(maxlen=32)
+        self.start_time = time.monotonic_ns()
+        self.latched_time = 0
+        self.lock = threading.Condition(threading.RLock())
+        self.features = self.__create_features()
+        self.__generator = None
+        self.__thread = None
+        self.__triggers = 0
+        self.__free = deque()
+        self.__ready = deque()
+        self.__outstanding = {}
+        self.__callback_buffer = None
+
+    def __create_features(self):
+        config = self.config
+        features = {}
+
+        def add(id_name, name, value=None, **kwargs):
+            features[getattr(GxFeatureID, id_name)] = _SimFeature(name, value, **kwargs)
+
+        # device information
+        add('STRING_DEVICE_VENDOR_NAME', 'DeviceVendorName', 'Daheng Imaging', writable=False)
+        add('STRING_DEVICE_MODEL_NAME', 'DeviceModelName', self.model_name, writable=False)
+        add('STRING_DEVICE_FIRMWARE_VERSION', 'DeviceFirmwareVersion', 'SIM-1.0', writable=False)
+        add('STRING_DEVICE_VERSION', 'DeviceVersion', 'V1.0', writable=False)
+        add('STRING_DEVICE_SERIAL_NUMBER', 'DeviceSerialNumber', self.serial_number, writable=False)
+        add('STRING_DEVICE_USER_ID', 'DeviceUserID', '', max_length=16)
+        add('INT_TIMESTAMP_TICK_FREQUENCY', 'TimestampTickFrequency', 1000000000, writable=False)
+        add('INT_TIMESTAMP_LATCH_VALUE', 'TimestampLatchValue', writable=False, getter=lambda: self.latched_time)
+        add('COMMAND_TIMESTAMP_LATCH', 'TimestampLatch')
+        add('COMMAND_TIMESTAMP_RESET', 'TimestampReset')
+
+        # image format
+        add('INT_SENSOR_WIDTH', 'SensorWidth', config.sensor_width, writable=False)
+        add('INT_SENSOR_HEIGHT', 'SensorHeight', config.sensor_height, writable=False)
+        add('INT_WIDTH_MAX', 'WidthMax', config.sensor_width, writable=False)
+        add('INT_HEIGHT_MAX', 'HeightMax', config.sensor_height, writable=False)
+        add('INT_WIDTH', 'Width', config.sensor_width, inc=8, locked=True,
+            range_getter=lambda: (16, config.sensor_width - self.value('INT_OFFSET_X')))
+        add('INT_HEIGHT', 'Height', config.sensor_height, inc=2, locked=True,
+            range_getter=lambda: (2, config.sensor_height - self.value('INT_OFFSET_Y')))
+        add('INT_OFFSET_X', 'OffsetX', 0, inc=8, locked=True,
+            range_getter=lambda: (0, config.sensor_width - self.value('INT_WIDTH')))
+        add('INT_OFFSET_Y', 'OffsetY', 0, inc=2, locked=True,
+            range_getter=lambda: (0, config.sensor_height - self.value('INT_HEIGHT')))
+        add('ENUM_PIXEL_FORMAT', 'PixelFormat', GxPixelFormatEntry.MONO8, locked=True,
+            entries={'Mono8': GxPixelFormatEntry.MONO8, 'Mono10': GxPixelFormatEntry.MONO10,
+                     'Mono12': GxPixelFormatEntry.MONO12, 'Mono10Packed': GxPixelFormatEntry.MONO10_PACKED,
+                     'Mono12Packed': GxPixelFormatEntry.MONO12_PACKED, 'Mono10p': GxPixelFormatEntry.MONO10_P,
+                     'Mono12p': GxPixelFormatEntry.MONO12_P})
+        add('ENUM_PIXEL_SIZE', 'PixelSize', writable=False, getter=self.bits,
+            entries={'Bpp8': GxPixelSizeEntry.BPP8, 'Bpp10': GxPixelSizeEntry.BPP10,
+                     'Bpp12': GxPixelSizeEntry.BPP12})
+        add('ENUM_PIXEL_COLOR_FILTER', 'PixelColorFilter', GxPixelColorFilterEntry.NONE, writable=False,
+            entries={'None': GxPixelColorFilterEntry.NONE})
+        add('BOOL_REVERSE_X', 'ReverseX', False)
+        add('BOOL_REVERSE_Y', 'ReverseY', False)
+        add('INT_PAYLOAD_SIZE', 'PayloadSize', writable=False, getter=self.payload_size)
+
+        # acquisition and trigger
+        add('ENUM_ACQUISITION_MODE', 'AcquisitionMode', GxAcquisitionModeEntry.CONTINUOUS,
+            entries={'Continuous': GxAcquisitionModeEntry.CONTINUOUS})
+        add('COMMAND_ACQUISITION_START', 'AcquisitionStart')
+        add('COMMAND_ACQUISITION_STOP', 'AcquisitionStop')
+        add('ENUM_TRIGGER_SELECTOR', 'TriggerSelector', GxTriggerSelectorEntry.FRAME_START,
+            entries={'FrameStart': GxTriggerSelectorEntry.FRAME_START})
+        add('ENUM_TRIGGER_MODE', 'TriggerMode', GxSwitchEntry.OFF,
+            entries={'Off': GxSwitchEntry.OFF, 'On': GxSwitchEntry.ON})
+        add('COMMAND_TRIGGER_SOFTWARE', 'TriggerSoftware')
+        add('ENUM_TRIGGER_SOURCE', 'TriggerSource', GxTriggerSourceEntry.SOFTWARE,
+            entries={'Software': GxTriggerSourceEntry.SOFTWARE, 'Line0': GxTriggerSourceEntry.LINE0,
+                     'Line2': GxTriggerSourceEntry.LINE2, 'Line3': GxTriggerSourceEntry.LINE3})
+        add('ENUM_TRIGGER_ACTIVATION', 'TriggerActivation', GxTriggerActivationEntry.RISING_EDGE,
+            entries={'FallingEdge': GxTriggerActivationEntry.FALLING_EDGE,
+                     'RisingEdge': GxTriggerActivationEntry.RISING_EDGE})
+        add('FLOAT_TRIGGER_DELAY', 'TriggerDelay', 0.0, min_value=0.0, max_value=3000000.0, unit='us')
+        add('ENUM_EXPOSURE_MODE', 'ExposureMode', GxExposureModeEntry.TIMED,
+            entries={'Timed': GxExposureModeEntry.TIMED})
+        add('ENUM_EXPOSURE_AUTO', 'ExposureAuto', GxAutoEntry.OFF, entries={'Off': GxAutoEntry.OFF})
+        add('FLOAT_EXPOSURE_TIME', 'ExposureTime', 10000.0, min_value=20.0, max_value=1000000.0, unit='us')
+        add('ENUM_ACQUISITION_FRAME_RATE_MODE', 'AcquisitionFrameRateMode', GxSwitchEntry.OFF,
+            entries={'Off': GxSwitchEntry.OFF, 'On': GxSwitchEntry.ON})
+        add('FLOAT_ACQUISITION_FRAME_RATE', 'AcquisitionFrameRate', 19.0, min_value=0.1, max_value=19.0,
+            unit='fps')
+        add('FLOAT_CURRENT_ACQUISITION_FRAME_RATE', 'CurrentAcquisitionFrameRate', writable=False,
+            unit='fps', getter=self.current_frame_rate)
+
+        # analog
+        add('ENUM_GAIN_AUTO', 'GainAuto', GxAutoEntry.OFF, entries={'Off': GxAutoEntry.OFF})
+        add('FLOAT_GAIN', 'Gain', 0.0, min_value=0.0, max_value=24.0, unit='dB')
+
+        # data stream
+        add('INT_ANNOUNCED_BUFFER_COUNT', 'StreamAnnouncedBufferCount', writable=False,
+            getter=lambda: self.buffer_num)
+        add('INT_DELIVERED_FRAME_COUNT', 'StreamDeliveredFrameCount', writable=False,
+            getter=lambda: self.delivered)
+        add('INT_LOST_FRAME_COUNT', 'StreamLostFrameCount', writable=False, getter=lambda: self.lost)
+        add('INT_INCOMPLETE_FRAME_COUNT', 'StreamIncompleteFrameCount', 0, writable=False)
+        return features
+
+    def value(self, id_name):
+        return self.features[getattr(GxFeatureID, id_name)].get()
+
+    def bits(self):
+        pixel_format = self.value('ENUM_PIXEL_FORMAT')
+        pixel_format = PACKED_PIXEL_FORMATS.get(pixel_format, (pixel_format,))[0]
+        if pixel_format == GxPixelFormatEntry.MONO10:
+            return GxPixelSizeEntry.BPP10
+        elif pixel_format == GxPixelFormatEntry.MONO12:
+            return GxPixelSizeEntry.BPP12
+        return GxPixelSizeEntry.BPP8
+
+    def payload_size(self):
+        # the bit field of the pixel format is the number of bits a pixel takes in the payload
+        bits_per_pixel = (self.value('ENUM_PIXEL_FORMAT') & 0x00ff0000) >> 16
+        return -(-self.value('INT_WIDTH') * self.value('INT_HEIGHT') * bits_per_pixel // 8)
+
+    def current_frame_rate(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        return (len(self.frame_times) - 1) / max(self.frame_times[-1] - self.frame_times[0], 1e-9)
+
+    def timestamp(self):
+        return time.monotonic_ns() - self.start_time
+
+    def generator(self):
+        if self.__generator is None:
+            config = self.config
+            seed = None if config.seed is None else config.seed + self.index
+            self.__generator = FlyImageGenerator(config.sensor_width, config.sensor_height,
+                                                 config.fly_length, config.empty_ratio, seed)
+        return self.__generator
+
+    def start_acquisition(self, streaming=False):
+        with self.lock:
+            if self.acquiring:
+                return
+            size = self.payload_size()
+            self.__free = deque(_SimBuffer(size) for _ in range(self.buffer_num))
+            self.__ready.clear()
+            self.__outstanding = {}
+            self.__triggers = 0
+            self.__callback_buffer = _SimBuffer(size) if self.capture_callback is not None else None
+            self.acquiring = True
+            self.streaming = streaming
+            self.generator()
+            self.__thread = threading.Thread(target=self.__run, name='gxsim-%s' % self.serial_number, daemon=True)
+            self.__thread.start()
+
+    def stop_acquisition(self):
+        with self.lock:
+            if not self.acquiring:
+                return
+            self.acquiring = False
+            self.streaming = False
+            self.lock.notify_all()
+            thread = self.__thread
+            self.__thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def software_trigger(self):
+        with self.lock:
+            if self.acquiring:
+                self.__triggers += 1
+                self.lock.notify_all()
+
+    def __run(self):
+        next_time = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.acquiring:
+                    return
+                triggered = self.value('ENUM_TRIGGER_MODE') == GxSwitchEntry.ON
+                source = self.value('ENUM_TRIGGER_SOURCE')
+                if triggered and source == GxTriggerSourceEntry.SOFTWARE:
+                    if self.__triggers == 0:
+                        self.lock.wait(0.1)
+                        continue
+                    self.__triggers -= 1
+                else:
+                    now = time.monotonic()
+                    if next_time > now:
+                        self.lock.wait(next_time - now)
+                        continue
+                    if triggered:
+                        # flies pass the light barrier at random moments
+                        interval = self.generator().rng.exponential(1.0 / self.config.trigger_rate)
+                    else:
+                        interval = 1.0 / self.value('FLOAT_ACQUISITION_FRAME_RATE')
+                    next_time = max(next_time + interval, now)
+                delay = (self.value('FLOAT_TRIGGER_DELAY') + self.value('FLOAT_EXPOSURE_TIME')) / 1e6
+
+            time.sleep(delay)
+            self.__deliver()
+
+    def __deliver(self):
+        with self.lock:
+            if not self.acquiring:
+                return
+            callback = self.capture_callback
+            if callback is not None:
+                buffer = self.__callback_buffer
+            elif self.__free:
+                buffer = self.__free.popleft()
+            else:
+                self.lost += 1
+                return
+            width = self.value('INT_WIDTH')
+            height = self.value('INT_HEIGHT')
+            offset_x = self.value('INT_OFFSET_X')
+            offset_y = self.value('INT_OFFSET_Y')
+            pixel_format = self.value('ENUM_PIXEL_FORMAT')
+            bits = self.bits()
+            self.frame_id += 1
+            frame_id = self.frame_id
+
+        if pixel_format in PACKED_PIXEL_FORMATS:
+            image = numpy.empty((height, width), dtype=numpy.uint16)
+            self.generator().render(image, offset_x, offset_y, bits)
+            image_size = -(-width * height * ((pixel_format & 0x00ff0000) >> 16) // 8)
+            _pack(image, pixel_format, numpy.frombuffer(buffer.array, dtype=numpy.uint8, count=image_size))
+        else:
+            dtype = numpy.uint8 if bits == GxPixelSizeEntry.BPP8 else numpy.uint16
+            image = numpy.frombuffer(buffer.array, dtype=dtype, count=width * height).reshape(height, width)
+            self.generator().render(image, offset_x, offset_y, bits)
+            image_size = image.nbytes
+
+        frame = buffer.frame
+        frame.status = GxFrameStatusList.SUCCESS
+        frame.width = width
+        frame.height = height
+        frame.pixel_format = pixel_format
+        frame.image_size = image_size
+        frame.frame_id = frame_id
+        frame.timestamp = self.timestamp()
+
+        with self.lock:
+            self.delivered += 1
+            self.frame_times.append(time.monotonic())
+            if callback is None:
+                self.__ready.append(buffer)
+                self.lock.notify_all()
+                return
+
+        param = GxFrameCallbackParam()
+        param.status = frame.status
+        param.image_buf = frame.image_buf
+        param.image_size = frame.image_size
+        param.width = width
+        param.height = height
+        param.pixel_format = pixel_format
+        param.frame_id = frame_id
+        param.timestamp = frame.timestamp
+        callback(pointer(param))
+
+    def wait_ready(self, timeout_ms):
+        """
+        :return:    the oldest filled buffer, None on timeout
+        """
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        with self.lock:
+            while not self.__ready:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.acquiring:
+                    return None
+                self.lock.wait(remaining)
+            return self.__ready.popleft()
+
+    def dequeue(self, timeout_ms, max_num=1):
+        with self.lock:
+            first = self.wait_ready(timeout_ms)
+            if first is None:
+                return []
+            buffers = [first]
+            while self.__ready and len(buffers) < max_num:
+                buffers.append(self.__ready.popleft())
+            for buffer in buffers:
+                self.__outstanding[addressof(buffer.frame)] = buffer
+            return buffers
+
+    def queue(self, address=None):
+        """
+        :brief      give a dequeued buffer back, all of them when address is None
+        :return:    False if address is not a dequeued buffer
+        """
+        with self.lock:
+            if address is None:
+                self.__free.extend(self.__outstanding.values())
+                self.__outstanding = {}
+                return True
+            buffer = self.__outstanding.pop(address, None)
+            if buffer is None:
+                return False
+            self.__free.append(buffer)
+            return True
+
+    def recycle(self, buffer):
+        with self.lock:
+            self.__free.append(buffer)
+
+    def flush(self):
+        with self.lock:
+            self.__free.extend(self.__ready)
+            self.__ready.clear()
+
+
+class SimulatedGxIAPI:
+    """
+    Stand-in for the GxIAPI library object(CDLL) with simulated cameras, the GX* methods take the
+    same ctypes arguments and return the same status codes as the C functions
+    """
+    def __init__(self, config=None):
+        """
+        :param      config:     SimConfig, read from the environment when None
+        """
+        self.config = config or SimConfig()
+        self.__devices = None
+        self.__enumerated = []
+        self.__handles = {}
+        self.__next_handle = 0x5100
+        self.__next_callback_handle = 1
+        self.__last_error = (0, '')
+
+    # ---------------simulation control--------------------------------
+    def devices(self):
+        if self.__devices is None:
+            self.__devices = [_SimDevice(i + 1, self.config) for i in range(self.config.device_num)]
+        return self.__devices
+
+    def unplug(self, serial_number):
+        """
+        :brief      Take a camera offline, acquisition stops and the offline callbacks are called
+        """
+        device = self.__device_by_sn(serial_number)
+        device.online = False
+        device.stop_acquisition()
+        for callback in list(device.offline_callbacks.values()):
+            threading.Thread(target=callback, args=(None,), daemon=True).start()
+
+    def plug(self, serial_number):
+        """
+        :brief      Bring a camera back online, it has to be opened again
+        """
+        device = self.__device_by_sn(serial_number)
+        device.online = True
+
+    def __device_by_sn(self, serial_number):
+        for device in self.devices():
+            if device.serial_number == serial_number:
+                return device
+        raise KeyError(serial_number)
+
+    # ---------------helpers-------------------------------------------
+    def __error(self, status, message):
+        self.__last_error = (status, message)
+        return status
+
+    def __device(self, handle_c):
+        """
+        :return:    status, device
+        """
+        device = self.__handles.get(_value(handle_c))
+        if device is None:
+            return self.__error(GxStatusList.INVALID_HANDLE, 'Invalid handle'), None
+        if not device.online:
+            return self.__error(GxStatusList.OFFLINE, 'Device is offline'), None
+        return GxStatusList.SUCCESS, device
+
+    def __feature(self, handle_c, feature_id_c, feature_type=None):
+        """
+        :return:    status, device, feature
+        """
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status, None, None
+        feature_id = _value(feature_id_c)
+        feature = device.features.get(feature_id)
+        if feature is None:
+            return self.__error(GxStatusList.NOT_IMPLEMENTED, 'Feature %s is not implemented' % hex(feature_id)), \
+                device, None
+        if feature_type is not None and (feature_id & GxFrameMask.TYPE_MASK) != feature_type:
+            return self.__error(GxStatusList.ERROR_TYPE, '%s has another type' % feature.name), device, None
+        return GxStatusList.SUCCESS, device, feature
+
+    def __is_writable(self, device, feature):
+        return feature.writable and not (feature.locked and device.acquiring)
+
+    def __write(self, handle_c, feature_id_c, feature_type, value):
+        status, device, feature = self.__feature(handle_c, feature_id_c, feature_type)
+        if status != GxStatusList.SUCCESS:
+            return status
+        with device.lock:
+            if not self.__is_writable(device, feature):
+                return self.__error(GxStatusList.INVALID_ACCESS, '%s is not writable' % feature.name)
+            if feature_type in (GxFeatureType.INT, GxFeatureType.FLOAT):
+                min_value, max_value = feature.get_range()
+                if value < min_value or value > max_value or \
+                        (feature_type == GxFeatureType.INT and (value - min_value) % feature.inc != 0):
+                    return self.__error(GxStatusList.OUT_OF_RANGE, '%s out of range' % feature.name)
+            elif feature_type == GxFeatureType.ENUM and value not in feature.entries.values():
+                return self.__error(GxStatusList.OUT_OF_RANGE, '%s has no entry %s' % (feature.name, value))
+            elif feature_type == GxFeatureType.STRING and len(value) > feature.max_length:
+                return self.__error(GxStatusList.OUT_OF_RANGE, '%s is too long' % feature.name)
+            feature.value = value
+            callbacks = list(device.feature_callbacks.get(_value(feature_id_c), {}).values())
+        for callback in callbacks:
+            callback(_value(feature_id_c), None)
+        return GxStatusList.SUCCESS
+
+    def __read(self, handle_c, feature_id_c, feature_type, ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, feature_type)
+        if status == GxStatusList.SUCCESS:
+            with device.lock:
+                _target(ref).value = feature.get()
+        return status
+
+    # ---------------library-------------------------------------------
+    def GXInitLib(self):
+        return GxStatusList.SUCCESS
+
+    def GXCloseLib(self):
+        for handle in list(self.__handles):
+            self.GXCloseDevice(handle)
+        return GxStatusList.SUCCESS
+
+    def GXGetLastError(self, err_code_ref, content_ref, size_ref):
+        status, message = self.__last_error
+        size = _target(size_ref)
+        message = message.encode()[:max(size.value - 1, 0)]
+        _target(err_code_ref).value = status
+        if size.value > 0:
+            _target(content_ref).value = message
+        size.value = len(message) + 1
+        return GxStatusList.SUCCESS
+
+    # ---------------enumeration and open------------------------------
+    def GXUpdateDeviceList(self, device_num_ref, time_out_c):
+        self.__enumerated = [device for device in self.devices() if device.online]
+        _target(device_num_ref).value = len(self.__enumerated)
+        return GxStatusList.SUCCESS
+
+    def GXUpdateAllDeviceList(self, device_num_ref, time_out_c):
+        return self.GXUpdateDeviceList(device_num_ref, time_out_c)
+
+    def GXGetAllDeviceBaseInfo(self, devices_info_ref, buf_size_ref):
+        devices_info = _target(devices_info_ref)
+        for info, device in zip(devices_info, self.__enumerated):
+            info.vendor_name = b'Daheng Imaging'
+            info.model_name = device.model_name.encode()
+            info.serial_number = device.serial_number.encode()
+            info.display_name = ('%s(%s)' % (device.model_name, device.serial_number)).encode()
+            info.device_id = device.serial_number.encode()
+            info.user_id = device.features[GxFeatureID.STRING_DEVICE_USER_ID].value.encode()
+            info.access_status = GxAccessStatus.READWRITE if device.handle is None else GxAccessStatus.NOACCESS
+            info.device_class = GxDeviceClassList.U3V
+        return GxStatusList.SUCCESS
+
+    def GXGetDeviceIPInfo(self, index_c, device_ip_info_ref):
+        return self.__error(GxStatusList.NOT_FOUND_DEVICE, 'Simulated cameras are USB3 devices')
+
+    def GXOpenDeviceByIndex(self, index_c, handle_ref):
+        index = _value(index_c)
+        if index < 1 or index > len(self.__enumerated):
+            return self.__error(GxStatusList.NOT_FOUND_DEVICE, 'No device with index %d' % index)
+        return self.__open(self.__enumerated[index - 1], handle_ref)
+
+    def GXOpenDevice(self, open_param_ref, handle_ref):
+        open_param = _target(open_param_ref)
+        content = open_param.content.decode()
+        if open_param.open_mode == GxOpenMode.INDEX:
+            return self.GXOpenDeviceByIndex(int(content), handle_ref)
+
+        for device in self.__enumerated:
+            user_id = device.features[GxFeatureID.STRING_DEVICE_USER_ID].value
+            if (open_param.open_mode == GxOpenMode.SN and device.serial_number == content) or \
+                    (open_param.open_mode == GxOpenMode.USER_ID and user_id == content):
+                return self.__open(device, handle_ref)
+        return self.__error(GxStatusList.NOT_FOUND_DEVICE, 'No device %s' % content)
+
+    def __open(self, device, handle_ref):
+        if not device.online:
+            return self.__error(GxStatusList.NOT_FOUND_DEVICE, 'Device is offline')
+        if device.handle is not None:
+            return self.__error(GxStatusList.INVALID_ACCESS, 'Device is already open')
+        device.handle = self.__next_handle
+        self.__next_handle += 1
+        self.__handles[device.handle] = device
+        _target(handle_ref).value = device.handle
+        return GxStatusList.SUCCESS
+
+    def GXCloseDevice(self, handle_c):
+        device = self.__handles.pop(_value(handle_c), None)
+        if device is None:
+            return self.__error(GxStatusList.INVALID_HANDLE, 'Invalid handle')
+        device.stop_acquisition()
+        device.handle = None
+        device.capture_callback = None
+        device.offline_callbacks = {}
+        device.feature_callbacks = {}
+        return GxStatusList.SUCCESS
+
+    # ---------------features------------------------------------------
+    def GXGetFeatureName(self, handle_c, feature_id_c, name_ref, size_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        name = feature.name.encode()
+        if name_ref is not None:
+            _target(name_ref).value = name
+        _target(size_ref).value = len(name) + 1
+        return GxStatusList.SUCCESS
+
+    def GXIsImplemented(self, handle_c, feature_id_c, is_implemented_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c)
+        if status == GxStatusList.NOT_IMPLEMENTED:
+            status = GxStatusList.SUCCESS
+        _target(is_implemented_ref).value = feature is not None
+        return status
+
+    def GXIsReadable(self, handle_c, feature_id_c, is_readable_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c)
+        if status == GxStatusList.SUCCESS:
+            _target(is_readable_ref).value = (_value(feature_id_c) & GxFrameMask.TYPE_MASK) != GxFeatureType.COMMAND
+        return status
+
+    def GXIsWritable(self, handle_c, feature_id_c, is_writable_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c)
+        if status == GxStatusList.SUCCESS:
+            with device.lock:
+                _target(is_writable_ref).value = self.__is_writable(device, feature)
+        return status
+
+    def GXGetIntRange(self, handle_c, feature_id_c, int_range_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.INT)
+        if status == GxStatusList.SUCCESS:
+            int_range = _target(int_range_ref)
+            with device.lock:
+                int_range.min, int_range.max = feature.get_range()
+            int_range.inc = feature.inc
+        return status
+
+    def GXGetInt(self, handle_c, feature_id_c, int_value_ref):
+        return self.__read(handle_c, feature_id_c, GxFeatureType.INT, int_value_ref)
+
+    def GXSetInt(self, handle_c, feature_id_c, value_c):
+        return self.__write(handle_c, feature_id_c, GxFeatureType.INT, _value(value_c))
+
+    def GXGetFloatRange(self, handle_c, feature_id_c, float_range_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.FLOAT)
+        if status == GxStatusList.SUCCESS:
+            float_range = _target(float_range_ref)
+            float_range.min, float_range.max = feature.get_range()
+            float_range.inc = 0.0
+            float_range.unit = feature.unit.encode()
+            float_range.inc_is_valid = False
+        return status
+
+    def GXGetFloat(self, handle_c, feature_id_c, float_value_ref):
+        return self.__read(handle_c, feature_id_c, GxFeatureType.FLOAT, float_value_ref)
+
+    def GXSetFloat(self, handle_c, feature_id_c, value_c):
+        return self.__write(handle_c, feature_id_c, GxFeatureType.FLOAT, _value(value_c))
+
+    def GXGetEnumEntryNums(self, handle_c, feature_id_c, enum_nums_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.ENUM)
+        if status == GxStatusList.SUCCESS:
+            _target(enum_nums_ref).value = len(feature.entries)
+        return status
+
+    def GXGetEnumDescription(self, handle_c, feature_id_c, enum_description_ref, buf_size_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.ENUM)
+        if status == GxStatusList.SUCCESS:
+            for description, (symbolic, value) in zip(_target(enum_description_ref), feature.entries.items()):
+                description.value = value
+                description.symbolic = symbolic.encode()
+        return status
+
+    def GXGetEnum(self, handle_c, feature_id_c, enum_value_ref):
+        return self.__read(handle_c, feature_id_c, GxFeatureType.ENUM, enum_value_ref)
+
+    def GXSetEnum(self, handle_c, feature_id_c, value_c):
+        return self.__write(handle_c, feature_id_c, GxFeatureType.ENUM, _value(value_c))
+
+    def GXGetBool(self, handle_c, feature_id_c, bool_value_ref):
+        return self.__read(handle_c, feature_id_c, GxFeatureType.BOOL, bool_value_ref)
+
+    def GXSetBool(self, handle_c, feature_id_c, value_c):
+        return self.__write(handle_c, feature_id_c, GxFeatureType.BOOL, _value(value_c))
+
+    def GXGetStringLength(self, handle_c, feature_id_c, string_length_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.STRING)
+        if status == GxStatusList.SUCCESS:
+            _target(string_length_ref).value = len(feature.get().encode()) + 1
+        return status
+
+    def GXGetStringMaxLength(self, handle_c, feature_id_c, string_max_length_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.STRING)
+        if status == GxStatusList.SUCCESS:
+            _target(string_max_length_ref).value = feature.max_length + 1
+        return status
+
+    def GXGetString(self, handle_c, feature_id_c, content_ref, size_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.STRING)
+        if status == GxStatusList.SUCCESS:
+            content = feature.get().encode()
+            if content_ref is not None:
+                _target(content_ref).value = content
+            _target(size_ref).value = len(content) + 1
+        return status
+
+    def GXSetString(self, handle_c, feature_id_c, content_ref):
+        content = _target(content_ref).value.decode()
+        return self.__write(handle_c, feature_id_c, GxFeatureType.STRING, content)
+
+    def GXGetBufferLength(self, handle_c, feature_id_c, buff_length_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.BUFFER)
+        return status
+
+    def GXGetBuffer(self, handle_c, feature_id_c, buff_ref, buff_length_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.BUFFER)
+        return status
+
+    def GXSetBuffer(self, handle_c, feature_id_c, buff, buff_size_c):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.BUFFER)
+        return status
+
+    def GXSendCommand(self, handle_c, feature_id_c):
+        status, device, feature = self.__feature(handle_c, feature_id_c, GxFeatureType.COMMAND)
+        if status != GxStatusList.SUCCESS:
+            return status
+
+        command = _value(feature_id_c)
+        if command == GxFeatureID.COMMAND_ACQUISITION_START:
+            device.start_acquisition()
+        elif command == GxFeatureID.COMMAND_ACQUISITION_STOP:
+            device.stop_acquisition()
+        elif command == GxFeatureID.COMMAND_TRIGGER_SOFTWARE:
+            device.software_trigger()
+        elif command == GxFeatureID.COMMAND_TIMESTAMP_LATCH:
+            device.latched_time = device.timestamp()
+        elif command == GxFeatureID.COMMAND_TIMESTAMP_RESET:
+            device.start_time = time.monotonic_ns()
+        return GxStatusList.SUCCESS
+
+    # ---------------callbacks and events------------------------------
+    def GXRegisterCaptureCallback(self, handle_c, user_param, cap_call):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if device.acquiring:
+            return self.__error(GxStatusList.INVALID_CALL, 'Register the capture callback before acquisition start')
+        device.capture_callback = cap_call
+        return GxStatusList.SUCCESS
+
+    def GXUnregisterCaptureCallback(self, handle_c):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if device.acquiring:
+            return self.__error(GxStatusList.INVALID_CALL, 'Unregister the capture callback after acquisition stop')
+        device.capture_callback = None
+        return GxStatusList.SUCCESS
+
+    def GXRegisterDeviceOfflineCallback(self, handle_c, user_param, call_back, call_back_handle_ref):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.offline_callbacks[self.__next_callback_handle] = call_back
+            _target(call_back_handle_ref).value = self.__next_callback_handle
+            self.__next_callback_handle += 1
+        return status
+
+    def GXUnregisterDeviceOfflineCallback(self, handle_c, call_back_handle_c):
+        device = self.__handles.get(_value(handle_c))
+        if device is None:
+            return self.__error(GxStatusList.INVALID_HANDLE, 'Invalid handle')
+        device.offline_callbacks.pop(_value(call_back_handle_c), None)
+        return GxStatusList.SUCCESS
+
+    def GXRegisterFeatureCallback(self, handle_c, user_param, call_back, feature_id_c, call_back_handle_ref):
+        status, device, feature = self.__feature(handle_c, feature_id_c)
+        if status == GxStatusList.SUCCESS:
+            callbacks = device.feature_callbacks.setdefault(_value(feature_id_c), {})
+            callbacks[self.__next_callback_handle] = call_back
+            _target(call_back_handle_ref).value = self.__next_callback_handle
+            self.__next_callback_handle += 1
+        return status
+
+    def GXUnregisterFeatureCallback(self, handle_c, feature_id_c, call_back_handle_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.feature_callbacks.get(_value(feature_id_c), {}).pop(_value(call_back_handle_c), None)
+        return status
+
+    def GXFlushEvent(self, handle_c):
+        status, device = self.__device(handle_c)
+        return status
+
+    def GXGetEventNumInQueue(self, handle_c, event_num_ref):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            _target(event_num_ref).value = 0
+        return status
+
+    # ---------------acquisition---------------------------------------
+    def GXSetAcqusitionBufferNumber(self, handle_c, buffer_num_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.buffer_num = _value(buffer_num_c)
+        return status
+
+    def GXGetImage(self, handle_c, frame_data_ref, time_out_c):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if device.capture_callback is not None or device.streaming:
+            return self.__error(GxStatusList.INVALID_CALL, 'GXGetImage can not be used with the capture '
+                                                           'callback or GXStreamOn')
+        frame_data = _target(frame_data_ref)
+        if not frame_data.image_buf:
+            return self.__error(GxStatusList.INVALID_PARAMETER, 'frame_data.image_buf is NULL')
+
+        buffer = device.wait_ready(_value(time_out_c))
+        if buffer is None:
+            if not device.online:
+                return self.__error(GxStatusList.OFFLINE, 'Device is offline')
+            return self.__error(GxStatusList.TIMEOUT, 'Timeout')
+        frame = buffer.frame
+        memmove(frame_data.image_buf, frame.image_buf, min(frame.image_size, frame_data.image_size))
+        for field in ('status', 'width', 'height', 'pixel_format', 'image_size', 'frame_id', 'timestamp'):
+            setattr(frame_data, field, getattr(frame, field))
+        device.recycle(buffer)
+        return GxStatusList.SUCCESS
+
+    def GXFlushQueue(self, handle_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.flush()
+        return status
+
+    def GXStreamOn(self, handle_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.start_acquisition(streaming=True)
+        return status
+
+    def GXStreamOff(self, handle_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.stop_acquisition()
+        return status
+
+    def GXDQBuf(self, handle_c, frame_data_p_ref, time_out_c):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if not device.streaming:
+            return self.__error(GxStatusList.INVALID_CALL, 'GXDQBuf needs GXStreamOn')
+        buffers = device.dequeue(_value(time_out_c))
+        if not buffers:
+            return self.__error(GxStatusList.TIMEOUT, 'Timeout')
+        _target(frame_data_p_ref).value = addressof(buffers[0].frame)
+        return GxStatusList.SUCCESS
+
+    def GXQBuf(self, handle_c, frame_data_p_c):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if not device.queue(_value(frame_data_p_c)):
+            return self.__error(GxStatusList.INVALID_PARAMETER, 'Buffer was not dequeued')
+        return GxStatusList.SUCCESS
+
+    def GXDQAllBufs(self, handle_c, frame_data_p, buff_num, frame_count_ref, time_out_c):
+        status, device = self.__device(handle_c)
+        if status != GxStatusList.SUCCESS:
+            return status
+        if not device.streaming:
+            return self.__error(GxStatusList.INVALID_CALL, 'GXDQAllBufs needs GXStreamOn')
+        buffers = device.dequeue(_value(time_out_c), _value(buff_num))
+        if not buffers:
+            return self.__error(GxStatusList.TIMEOUT, 'Timeout')
+        for i, buffer in enumerate(buffers):
+            frame_data_p[i] = addressof(buffer.frame)
+        _target(frame_count_ref).value = len(buffers)
+        return GxStatusList.SUCCESS
+
+    def GXQAllBufs(self, handle_c):
+        status, device = self.__device(handle_c)
+        if status == GxStatusList.SUCCESS:
+            device.queue()
+        return status
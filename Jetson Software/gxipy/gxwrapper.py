@@ -10,10 +10,16 @@ import traceback
 
 # os.add_dll_directory("C:\Program Files\Daheng Imaging\GalaxySDK\APIDll\Win64")
 
-if sys.platform == 'linux2' or sys.platform == 'linux':
+# GXIPY_BACKEND=sim replaces GxIAPI with the simulated cameras of gxsim(see below)
+SIMULATED_BACKEND = os.environ.get('GXIPY_BACKEND', '').lower() == 'sim'
+
+if SIMULATED_BACKEND:
+    dll = None
+elif sys.platform == 'linux2' or sys.platform == 'linux':
     try:
         dll = CDLL('/usr/lib/libgxiapi.so')
     except OSError:
+        dll = None
         print("Cannot find libgxiapi.so.")
 else:
     try:
@@ -22,6 +28,7 @@ else:
         else:
             dll = WinDLL('GxIAPI.dll')
     except OSError:
+        dll = None
         traceback.print_exc()
         print('Cannot find GxIAPI.dll.')
 
@@ -451,6 +458,12 @@ class GxEnumDescription(Structure):
         return "GxEnumDescription\n%s" % "\n".join("%s:\t%s" % (n, getattr(self, n[0])) for n in self._fields_)
 
 
+# the simulator uses the structures above, so it is created once they are defined
+if SIMULATED_BACKEND:
+    from gxipy.gxsim import SimulatedGxIAPI
+    dll = SimulatedGxIAPI()
+
+
 if hasattr(dll, 'GXInitLib'):
     def gx_init_lib():
         """
@@ -1233,7 +1246,7 @@ if hasattr(dll, 'GXSendCommand'):
         status = dll.GXSendCommand(handle_c, feature_id_c)
         return status
 
-'''
+
 CAP_CALL = CFUNCTYPE(None, POINTER(GxFrameCallbackParam))
 if hasattr(dll, 'GXRegisterCaptureCallback'):
     def gx_register_capture_callback(handle, cap_call):
@@ -1262,7 +1275,6 @@ if hasattr(dll, 'GXUnregisterCaptureCallback'):
 
         status = dll.GXUnregisterCaptureCallback(handle_c)
         return status
-'''
 
 if hasattr(dll, 'GXGetImage'):
     def gx_get_image(handle, frame_data, time_out=200):
@@ -1302,7 +1314,6 @@ if hasattr(dll, 'GXFlushQueue'):
         return status
 
 
-'''
 OFF_LINE_CALL = CFUNCTYPE(None, c_void_p)
 if hasattr(dll, 'GXRegisterDeviceOfflineCallback'):
     def gx_register_device_offline_callback(handle, call_back):
@@ -1338,7 +1349,7 @@ if hasattr(dll, 'GXUnregisterDeviceOfflineCallback'):
         call_back_handle_c = c_void_p()
         call_back_handle_c.value = call_back_handle
 
-        status = dll.GXUnregisterDeviceOfflineCallback(handle, call_back_handle_c)
+        status = dll.GXUnregisterDeviceOfflineCallback(handle_c, call_back_handle_c)
         return status
 
 
@@ -1421,7 +1432,6 @@ if hasattr(dll, 'GXUnregisterFeatureCallback'):
 
         status = dll.GXUnregisterFeatureCallback(handle_c, feature_id_c, call_back_handle_c)
         return status
-'''
 
 if hasattr(dll, 'GXExportConfigFile'):
     def gx_export_config_file(handle, file_path):
@@ -1575,7 +1585,7 @@ if hasattr(dll, 'GXSetAcqusitionBufferNumber'):
         status = dll.GXSetAcqusitionBufferNumber(handle_c, buffer_num_c)
         return status
 
-'''
+
 if hasattr(dll, 'GXStreamOn'):
     def gx_stream_on(handle):
         """
@@ -1612,7 +1622,8 @@ if hasattr(dll, 'GXDQBuf'):
         status = dll.GXDQBuf(handle_c, byref(frame_data_p), time_out_c)
 
         frame_data = GxFrameData()
-        memmove(addressof(frame_data), frame_data_p.value, sizeof(frame_data))
+        if status == GxStatusList.SUCCESS:
+            memmove(addressof(frame_data), frame_data_p.value, sizeof(frame_data))
         return status, frame_data, frame_data_p.value
 
 
@@ -1659,8 +1670,9 @@ if hasattr(dll, 'GXDQAllBufs'):
         status = dll.GXDQAllBufs(handle_c, frame_data_p, buff_num, byref(frame_count_c), time_out_c)
         frame_data = (GxFrameData * buff_num)()
 
-        for i in range(buff_num):
-            memmove(addressof(frame_data[i]), frame_data_p[i], sizeof(GxFrameData))
+        if status == GxStatusList.SUCCESS:
+            for i in range(frame_count_c.value):
+                memmove(addressof(frame_data[i]), frame_data_p[i], sizeof(GxFrameData))
 
         return status, frame_data, frame_count_c.value
 
@@ -1691,7 +1703,6 @@ if hasattr(dll, 'GXStreamOff'):
 
         status = dll.GXStreamOff(handle_c)
         return status
-'''
 
 
 def string_encoding(string):
@@ -46,6 +46,7 @@ def main(async_loop):
         UI(window, main_service, async_loop)
         logging.debug('Starting Tkinter mainloop')
         window.mainloop()
+        main_service.close()
     else:
         notUI(main_service,async_loop)
 
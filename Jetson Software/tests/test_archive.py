@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from application.archive import CHUNK_FILE, INDEX_DTYPE, INDEX_FILE, FrameArchive
+
+
+class FrameArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.random = numpy.random.default_rng(0)
+
+    def frames(self, count: int):
+        frames = []
+        for number in range(count):
+            if number % 2:
+                frames.append(self.random.integers(0, 1 << 12, (48, 40), dtype=numpy.uint16))
+            else:
+                frames.append(self.random.integers(0, 1 << 8, (64, 64), dtype=numpy.uint8))
+        return frames
+
+    def write(self, frames, start: int = 0):
+        # every frame takes one 4 KiB block, so a chunk holds two frames
+        with FrameArchive(self.directory, chunk_size=8192) as archive:
+            for number, pixels in enumerate(frames, start):
+                position = archive.append(pixels, frame_id=number, timestamp=1000 * number, sex=number % 2,
+                                          cage=number, capture_time=1.5 * number, x=8 * number, y=4 * number,
+                                          confidence=0.25)
+                self.assertEqual(position, number)
+
+    def check(self, archive, frames):
+        self.assertEqual(len(archive), len(frames))
+        for number, expected in enumerate(frames):
+            pixels, record = archive.read(number)
+            self.assertEqual(pixels.dtype, expected.dtype)
+            numpy.testing.assert_array_equal(pixels, expected)
+            self.assertEqual(
+                (record['frame_id'], record['timestamp'], record['sex'], record['cage'], record['capture_time'],
+                 record['x'], record['y'], record['confidence']),
+                (number, 1000 * number, number % 2, number, 1.5 * number, 8 * number, 4 * number, 0.25))
+
+    def test_round_trip_rolls_over_chunks(self):
+        frames = self.frames(5)
+        self.write(frames)
+
+        self.assertTrue(os.path.exists(os.path.join(self.directory, CHUNK_FILE.format(1))))
+        with FrameArchive(self.directory, mode='r') as archive:
+            self.check(archive, frames)
+            self.assertEqual(len(set(archive.records['chunk'])), 3)
+
+    def test_append_after_reopen(self):
+        frames = self.frames(5)
+        self.write(frames[:3])
+        self.write(frames[3:], start=3)
+
+        with FrameArchive(self.directory, mode='r') as archive:
+            self.check(archive, frames)
+
+    def test_cut_off_record_is_dropped(self):
+        frames = self.frames(3)
+        self.write(frames)
+        with open(os.path.join(self.directory, INDEX_FILE), 'r+b') as index_file:
+            index_file.truncate(os.path.getsize(index_file.name) - INDEX_DTYPE.itemsize // 2)
+
+        with FrameArchive(self.directory, mode='r') as archive:
+            self.check(archive, frames[:2])
+        self.write(frames[2:], start=2)
+        with FrameArchive(self.directory, mode='r') as archive:
+            self.check(archive, frames)
+
+    def test_read_only(self):
+        self.write(self.frames(1))
+        with FrameArchive(self.directory, mode='r') as archive:
+            with self.assertRaises(IOError):
+                archive.append(numpy.zeros((8, 8), dtype=numpy.uint8))
+
+
+if __name__ == '__main__':
+    unittest.main()
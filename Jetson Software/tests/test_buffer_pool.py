@@ -0,0 +1,49 @@
+import unittest
+
+from gxipy.gxiapi import FrameBufferPool, GxFrameData
+
+
+def frame_data(size: int):
+    data = GxFrameData()
+    data.image_size = size
+    return data
+
+
+class FrameBufferPoolTest(unittest.TestCase):
+
+    def test_buffers_are_reused(self):
+        pool = FrameBufferPool(2)
+        pool.resize(64)
+        first = pool.create_image(frame_data(64))
+        address = first.frame_data.image_buf
+        first.release()
+        second = pool.create_image(frame_data(64))
+        self.assertEqual(second.frame_data.image_buf, address)
+        self.assertEqual(pool.get_statistics()['in_use'], 1)
+
+    def test_exhausted_pool_allocates(self):
+        pool = FrameBufferPool(1)
+        pool.resize(64)
+        pool.create_image(frame_data(64))
+        extra = pool.create_image(frame_data(64))
+        self.assertIsNotNone(extra.frame_data.image_buf)
+        extra.release()
+        self.assertEqual(pool.get_statistics()['exhausted'], 1)
+
+    def test_released_buffers_do_not_grow_the_pool(self):
+        pool = FrameBufferPool(4)
+        pool.resize(64)
+        images = [pool.create_image(frame_data(64)) for _ in range(2)]
+        # stream restarted with fewer buffers while two are held
+        pool.set_buffer_number(2)
+        pool.resize(64)
+        for image in images:
+            image.release()
+        held = [pool.create_image(frame_data(64)) for _ in range(3)]
+        self.assertEqual(pool.get_statistics()['in_use'], 2)
+        self.assertEqual(pool.get_statistics()['exhausted'], 1)
+        for image in held:
+            image.release()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Run from the Jetson Software directory without a camera:
+
+    GXIPY_BACKEND=sim python3 -m unittest discover tests
+"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from application.application import Application, Cage
+from application.deadline import DeadlineScheduler, FrameClock
+
+
+def make_application():
+    # no settings, camera or serial port, only what routing needs
+    application = Application.__new__(Application)
+    application.serial_service = mock.Mock()
+    application.cages = []
+    for index, name in enumerate(('male', 'female', 'trash')):
+        cage = Cage(index)
+        cage.name = name
+        application.cages.append(cage)
+    application.male_threshold = application.female_threshold = 0.5
+    application.uncertain_cage_name = 'trash'
+    application.fallback_cage_name = 'trash'
+    application.deadline_misses = 0
+    application.last_classification = None
+    application._pending = {}
+    application._route_lock = threading.Lock()
+    application.save_image = mock.Mock()
+    return application
+
+
+class PendingDeadlineTest(unittest.TestCase):
+
+    def test_on_deadline_routes_pending_fly_to_fallback(self):
+        application = make_application()
+        expires = time.monotonic() - 0.01
+        application._pending[7] = ('pixels', {'frame_id': 7}, expires, None)
+
+        application._on_deadline(7, expires)
+
+        self.assertEqual(application._pending, {})
+        self.assertEqual(application.deadline_misses, 1)
+        self.assertEqual(application.cages[-1].numberUncertain, 1)
+        application.serial_service.writeandreadJSON.assert_called_once()
+        pixels, metadata, _ = application.save_image.call_args[0]
+        self.assertEqual(pixels, 'pixels')
+        self.assertEqual((metadata['sex'], metadata['cage']), (-1, 2))
+
+    def test_scheduler_drives_pending_fly_past_deadline(self):
+        application = make_application()
+        application.deadlines = DeadlineScheduler(application._on_deadline)
+        # the pool takes the fly but its classification never arrives
+        application.inference = mock.Mock()
+        application.inference.submit.return_value = True
+        try:
+            application._classify_in_background('fly', 'pixels', {'frame_id': 3}, time.monotonic() + 0.05)
+            deadline = time.monotonic() + 2.0
+            while application.save_image.call_count == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            application.deadlines.close()
+
+        application.save_image.assert_called_once()
+        self.assertEqual(application.deadline_misses, 1)
+        self.assertEqual(application._pending, {})
+        # a late classification is dropped instead of firing the fly twice
+        application._on_classified(3, (1, 0.9))
+        application.save_image.assert_called_once()
+
+    def test_busy_pool_routes_fly_with_deadline(self):
+        application = make_application()
+        application.deadlines = mock.Mock()
+        application.inference = mock.Mock()
+        application.inference.submit.return_value = False
+
+        application._classify_in_background('fly', 'pixels', {'frame_id': 5}, time.monotonic() + 10)
+
+        application.save_image.assert_called_once()
+        self.assertEqual(application.deadline_misses, 0)
+        self.assertEqual(application.cages[-1].numberUncertain, 1)
+        self.assertEqual(application._pending, {})
+
+
+class FrameClockTest(unittest.TestCase):
+
+    def test_calibration_outlasts_the_window(self):
+        # camera clock at 1 MHz, exposed at host time 100 + ticks / 1e6
+        clock = FrameClock(1000000, window=4)
+        clock.calibrate(0, 100.0)
+        # every frame delivered 50 ms late, e.g. while the USB link is saturated
+        for frame in range(10):
+            exposure = clock.exposure_time(frame * 10000, 100.05 + frame * 0.01)
+        self.assertAlmostEqual(exposure, 100.09)
+
+    def test_stale_calibration_is_not_used(self):
+        clock = FrameClock(1000000, window=4, calibration_age=1.0)
+        clock.calibrate(0, 100.0)
+        self.assertFalse(clock.needs_calibration(100.5))
+        self.assertTrue(clock.needs_calibration(101.5))
+        exposure = clock.exposure_time(2000000, 102.05)
+        self.assertAlmostEqual(exposure, 102.05)
+
+    def test_callback_frame_keeps_its_delivery_time(self):
+        application = make_application()
+        image = mock.Mock()
+        application.session = mock.MagicMock()
+        application.frame_queue = mock.Mock()
+        before = time.monotonic()
+        application._on_capture(image)
+        frame = application.frame_queue.put.call_args[0][0]
+        # taken off the queue later by the sorting loop
+        time.sleep(0.02)
+        application._take_frame(frame)
+        self.assertIs(application.rawImage, image.copy.return_value)
+        self.assertLess(application.received_time - before, 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import gxipy as gx
+from gxipy.gxwrapper import SIMULATED_BACKEND
+
+
+@unittest.skipUnless(SIMULATED_BACKEND, 'needs the simulated cameras of GXIPY_BACKEND=sim')
+class DeviceApplyTest(unittest.TestCase):
+
+    def setUp(self):
+        # the library is closed with the last DeviceManager
+        self.device_manager = gx.DeviceManager()
+        self.device_manager.update_device_list()
+        self.camera = self.device_manager.open_device_by_index(1)
+        self.addCleanup(self.camera.close_device)
+        self.width = self.camera.WidthMax.get()
+
+    def test_growing_offset_is_written_after_the_size(self):
+        written = self.camera.apply({'OffsetX': 1000, 'Width': self.width - 1496})
+
+        self.assertEqual(written, ['Width', 'OffsetX'])
+        self.assertEqual((self.camera.OffsetX.get(), self.camera.Width.get()), (1000, self.width - 1496))
+
+    def test_shrinking_offset_is_written_before_the_size(self):
+        self.camera.apply({'OffsetX': 1000, 'Width': self.width - 1496})
+
+        written = self.camera.apply({'OffsetX': 0, 'Width': self.width})
+
+        self.assertEqual(written, ['OffsetX', 'Width'])
+        self.assertEqual((self.camera.OffsetX.get(), self.camera.Width.get()), (0, self.width))
+
+    def test_unchanged_values_are_skipped(self):
+        self.camera.apply({'Width': self.width - 1496})
+
+        self.assertEqual(self.camera.apply({'Width': self.width - 1496}), [])
+
+    def test_failures_are_raised_together(self):
+        with self.assertRaises(gx.FeatureApplyError) as context:
+            self.camera.apply({'Nope': 1, 'OffsetX': self.width, 'Width': 64})
+
+        self.assertEqual(set(context.exception.errors), {'Nope', 'OffsetX'})
+        self.assertEqual(self.camera.Width.get(), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import ctypes
+import unittest
+
+import numpy
+
+from gxipy.gxiapi import GxFrameData, RawImage
+from gxipy.gxidef import PACKED_PIXEL_FORMATS, GxFrameStatusList, GxPixelFormatEntry
+
+
+def pack_gige(pixels, bits: int) -> bytes:
+    """
+    Mono10Packed / Mono12Packed: two pixels in three bytes, the high 8 bits of the pixels in the outer bytes
+    and their low bits in the nibbles of the middle byte
+    """
+    low = (1 << (bits - 8)) - 1
+    data = bytearray()
+    for first, second in zip(pixels[0::2], list(pixels[1::2]) + [0]):
+        data += bytes((first >> (bits - 8), (first & low) | (second & low) << 4, second >> (bits - 8)))
+    return bytes(data[:-(-len(pixels) * 3 // 2)])
+
+
+def pack_genicam(pixels, bits: int) -> bytes:
+    """
+    Mono10p / Mono12p: the pixels form one little-endian bit stream
+    """
+    stream = sum(int(pixel) << (bits * number) for number, pixel in enumerate(pixels))
+    return stream.to_bytes(-(-len(pixels) * bits // 8), 'little')
+
+
+FORMATS = {
+    GxPixelFormatEntry.MONO10_PACKED: (10, pack_gige),
+    GxPixelFormatEntry.MONO12_PACKED: (12, pack_gige),
+    GxPixelFormatEntry.MONO10_P: (10, pack_genicam),
+    GxPixelFormatEntry.MONO12_P: (12, pack_genicam),
+}
+
+
+def packed_image(pixel_format: int, pixels):
+    bits, pack = FORMATS[pixel_format]
+    payload = pack(pixels.reshape(-1).tolist(), bits)
+    frame_data = GxFrameData()
+    frame_data.status = GxFrameStatusList.SUCCESS
+    frame_data.width = pixels.shape[1]
+    frame_data.height = pixels.shape[0]
+    frame_data.pixel_format = pixel_format
+    frame_data.image_size = len(payload)
+    image = RawImage(frame_data)
+    ctypes.memmove(frame_data.image_buf, payload, len(payload))
+    return image
+
+
+class PackedPixelFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = numpy.random.default_rng(0)
+
+    def pixels(self, bits: int, shape):
+        return self.random.integers(0, 1 << bits, shape, dtype=numpy.uint16)
+
+    def test_all_packed_formats_are_covered(self):
+        self.assertEqual(set(FORMATS), set(PACKED_PIXEL_FORMATS))
+
+    def test_unpack(self):
+        # 15 pixels leave the last group incomplete for every format
+        for shape in ((4, 8), (3, 5)):
+            for pixel_format, (bits, _) in FORMATS.items():
+                with self.subTest(pixel_format=hex(pixel_format), shape=shape):
+                    pixels = self.pixels(bits, shape)
+                    image = packed_image(pixel_format, pixels)
+
+                    unpacked = image.get_numpy_array()
+
+                    self.assertEqual(unpacked.dtype, numpy.uint16)
+                    numpy.testing.assert_array_equal(unpacked, pixels)
+                    out = numpy.zeros(shape, dtype=numpy.uint16)
+                    numpy.testing.assert_array_equal(image.get_numpy_array(out), pixels)
+                    numpy.testing.assert_array_equal(out, pixels)
+
+    def test_unpack_image(self):
+        for pixel_format, (bits, _) in FORMATS.items():
+            with self.subTest(pixel_format=hex(pixel_format)):
+                pixels = self.pixels(bits, (3, 5))
+
+                image = packed_image(pixel_format, pixels).unpack()
+
+                self.assertEqual(image.frame_data.pixel_format, PACKED_PIXEL_FORMATS[pixel_format][0])
+                numpy.testing.assert_array_equal(image.get_numpy_array(), pixels)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy
+
+from application.archive import INDEX_FILE
+from application.encoders import ArchiveEncoder
+from application.storage import StorageManager
+
+
+class RetentionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name: str, size: int, age: float):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(bytes(size))
+        modified = time.time() - age
+        os.utime(path, (modified, modified))
+        return path
+
+    def test_only_images_are_deleted_oldest_first(self):
+        oldest = self.write('day1/a.jpg', 1000, 300)
+        newer = self.write('day1/b.png', 1000, 200)
+        log = self.write('Logs/sorting.log', 1000, 400)
+        notes = self.write('notes.txt', 1000, 400)
+        storage = StorageManager(self.directory, maxgb=1500 / (1 << 30), reservemb=0, minage=60)
+
+        storage.scan()
+
+        self.assertFalse(os.path.exists(oldest))
+        for path in (newer, log, notes):
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual(storage.get_statistics()['deleted'], 1)
+
+    def test_archive_is_deleted_as_a_whole(self):
+        encoder = ArchiveEncoder(chunksize=8192)
+        for frame_id in range(4):
+            encoder.encode(numpy.zeros((64, 64), dtype=numpy.uint8), os.path.join(self.directory, 'frame'),
+                           {'frame_id': frame_id})
+        encoder.close()
+        archive, = [name for name in os.listdir(self.directory)]
+        for name in os.listdir(os.path.join(self.directory, archive)):
+            path = os.path.join(self.directory, archive, name)
+            os.utime(path, (time.time() - 300, time.time() - 300))
+        image = self.write('a.jpg', 1000, 100)
+        storage = StorageManager(self.directory, maxgb=2000 / (1 << 30), reservemb=0, minage=60)
+
+        storage.scan()
+
+        self.assertEqual(os.listdir(self.directory), ['a.jpg'])
+        self.assertTrue(os.path.exists(image))
+
+    def test_recent_files_are_kept(self):
+        recent = self.write('a.jpg', 1000, 0)
+        storage = StorageManager(self.directory, maxgb=1 / (1 << 30), reservemb=0, minage=60)
+
+        storage.scan()
+
+        self.assertTrue(os.path.exists(recent))
+
+
+class ArchiveRotationTest(unittest.TestCase):
+
+    def test_new_archive_once_full_or_deleted(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        encoder = ArchiveEncoder(chunksize=4096, archivesize=8192)
+        frame = numpy.zeros((64, 64), dtype=numpy.uint8)
+        for frame_id in range(3):
+            encoder.encode(frame, os.path.join(directory, 'frame'), {'frame_id': frame_id})
+        self.assertEqual(len(os.listdir(directory)), 2)
+        # deleted by the storage manager between two frames
+        for name in os.listdir(directory):
+            shutil.rmtree(os.path.join(directory, name))
+        encoder.encode(frame, os.path.join(directory, 'frame'), {'frame_id': 3})
+        encoder.close()
+        archive, = os.listdir(directory)
+        self.assertTrue(os.path.exists(os.path.join(directory, archive, INDEX_FILE)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy
+
+from application.encoders import Encoder
+from application.writer import ImageWriter
+
+
+class BlockingEncoder(Encoder):
+    """
+    Holds every image until released, so the queue of the writer fills up
+    """
+    name = 'blocking'
+    extension = '.raw'
+    parallel = False
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.paths = []
+
+    def encode(self, pixels, path: str, metadata: dict = None):
+        self.started.set()
+        self.release.wait(5)
+        with open(path + self.extension, 'wb') as file:
+            file.write(pixels.tobytes())
+        self.paths.append(os.path.basename(path))
+
+
+class WriterPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.frame = numpy.zeros((8, 8), dtype=numpy.uint8)
+
+    def fill(self, policy: str, count: int, block_timeout: float = 0.05):
+        """
+        Submit count images to a writer with a queue of 2 whose only worker is busy with image 0
+        :return: (writer, encoder, [submit results], [released images])
+        """
+        encoder = BlockingEncoder()
+        writer = ImageWriter(2, policy, block_timeout=block_timeout, encoder=encoder)
+        self.addCleanup(writer.close, 5)
+        released, results = [], []
+        results.append(writer.submit(self.frame, os.path.join(self.directory, '0'), None,
+                                     lambda: released.append(0)))
+        encoder.started.wait(5)
+        for index in range(1, count):
+            results.append(writer.submit(self.frame, os.path.join(self.directory, str(index)), None,
+                                         lambda index=index: released.append(index)))
+        return writer, encoder, results, released
+
+    def test_drop_newest(self):
+        writer, encoder, results, released = self.fill('drop_newest', 4)
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(released, [3])
+        encoder.release.set()
+        writer.flush(5)
+        self.assertEqual(encoder.paths, ['0', '1', '2'])
+        self.assertEqual(sorted(released), [0, 1, 2, 3])
+        self.assertEqual(writer.get_statistics()['dropped'], 1)
+
+    def test_drop_oldest(self):
+        writer, encoder, results, released = self.fill('drop_oldest', 4)
+        self.assertEqual(results, [True, True, True, True])
+        self.assertEqual(released, [1])
+        encoder.release.set()
+        writer.flush(5)
+        self.assertEqual(encoder.paths, ['0', '2', '3'])
+        self.assertEqual(sorted(released), [0, 1, 2, 3])
+
+    def test_block_times_out(self):
+        writer, encoder, results, released = self.fill('block', 4)
+        self.assertEqual(results, [True, True, True, False])
+        encoder.release.set()
+        writer.flush(5)
+        self.assertEqual(encoder.paths, ['0', '1', '2'])
+        self.assertEqual(writer.get_statistics()['high_water_mark'], 2)
+
+    def test_directory_created_again_after_deletion(self):
+        writer = ImageWriter(4, 'block')
+        self.addCleanup(writer.close, 5)
+        day = os.path.join(self.directory, 'day')
+        writer.submit(self.frame, os.path.join(day, 'a'))
+        writer.flush(5)
+        shutil.rmtree(day)
+        writer.submit(self.frame, os.path.join(day, 'b'))
+        writer.flush(5)
+        self.assertEqual(os.listdir(day), ['b.jpg'])
+        self.assertEqual(writer.get_statistics()['failed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()